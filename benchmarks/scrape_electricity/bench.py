@@ -0,0 +1,444 @@
+"""Offline end-to-end benchmark and regression check of pyscript/scrape_electricity.py.
+
+Boots a throwaway Home Assistant instance with pyscript, a file based recorder and the scripts of this repository,
+pointed at the local OTE / CNB stand-ins of fake_sources.py. The recorder is seeded with export meter states at a
+realistic density plus their long-term statistics, and with the hourly price statistics the daily price scrapes
+would have stored. Then it runs:
+
+- daily:  pyscript.recompute_pv_income for one day at a time over the whole range, like the 04:00 run does
+- year:   the income statistics cleared and recomputed over the whole range in one call
+- price:  the scrape_electricity_price trigger
+- export: the adjust_electricity_export trigger re-arming the export controller
+
+For each run it reports the wall time, the tracemalloc peak and the recorder rows read and written, as counted by
+the instrumentation sensors. After the daily and the year phase the stored income is compared hour by hour with
+the income computed from the synthetic world directly, and the running sum is checked for consistency.
+
+Run from the Home Assistant virtualenv, with pyscript available as a custom integration:
+
+    python benchmarks/scrape_electricity/bench.py --pyscript ~/hacs/pyscript/custom_components/pyscript --days 365
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from sqlalchemy import insert
+
+from homeassistant import bootstrap, runner
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.db_schema import States, StatesMeta
+from homeassistant.components.recorder.models import StatisticData, StatisticMeanType, StatisticMetaData
+from homeassistant.components.recorder.statistics import (
+    async_add_external_statistics,
+    async_import_statistics,
+    statistics_during_period,
+)
+from homeassistant.components.recorder.util import session_scope
+from homeassistant.core import HomeAssistant, State
+
+sys.path.insert(0, str(Path(__file__).parent))
+from fake_sources import DAY, TIME_ZONE, FakeSources, SyntheticWorld  # noqa: E402
+
+REPO_DIR = Path(__file__).resolve().parents[2]
+EXPORT_ENTITY_ID = "sensor.meter_total_energy_export"
+ELE_PRICE_STAT_ID = "ote:electricity_price"
+PV_INCOME_STAT_ID = "ote:pv_income"
+CNB_RATE_LOOKBACK = 5
+INSERT_BATCH = 50_000
+RUN_TIMEOUT = 600
+TOLERANCE = 1e-6
+
+CONFIGURATION = """\
+homeassistant:
+  name: Benchmark
+  latitude: 50.08
+  longitude: 14.42
+  elevation: 200
+  unit_system: metric
+  time_zone: Europe/Prague
+  country: CZ
+recorder:
+  db_url: sqlite:///{db_path}
+  commit_interval: 1
+  purge_keep_days: 3650
+logger:
+  default: warning
+pyscript:
+  allow_all_imports: true
+  hass_is_global: true
+  scrape_electricity:
+    cnb_url: "{cnb_url}"
+    ote_url: "{ote_url}"
+"""
+
+
+@dataclass
+class RunResult:
+    wall_time: float
+    memory_peak: int | None = None
+    rows_read: int = 0
+    rows_written: int = 0
+    source_requests: int = 0
+    phases: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Summary:
+    runs: int
+    wall_time_total: float
+    wall_time_mean: float
+    wall_time_p95: float
+    wall_time_max: float
+    memory_peak_max: int | None
+    rows_read_mean: float
+    rows_written_mean: float
+
+
+@dataclass
+class IncomeCheck:
+    hours_expected: int
+    hours_stored: int
+    hours_wrong: int
+    max_error: float
+    sum_breaks: int
+    total_expected: float
+    total_stored: float
+
+
+@dataclass
+class BenchResult:
+    start: str
+    end: str
+    days: int
+    meter_states: int
+    statistics_seeded: int
+    seed_time: float
+    daily: Summary | None = None
+    year: RunResult | None = None
+    price: RunResult | None = None
+    export: RunResult | None = None
+    checks: dict[str, IncomeCheck] = field(default_factory=dict)
+    source_requests: dict[str, int] = field(default_factory=dict)
+
+
+def _percentile(values: list[float], percentile: int) -> float:
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[percentile - 1]
+
+
+def _summarize(runs: list[RunResult]) -> Summary:
+    times = [run.wall_time for run in runs]
+    peaks = [run.memory_peak for run in runs if run.memory_peak is not None]
+    return Summary(
+        runs=len(runs),
+        wall_time_total=round(sum(times), 4),
+        wall_time_mean=round(statistics.fmean(times), 4),
+        wall_time_p95=round(_percentile(times, 95), 4),
+        wall_time_max=round(max(times), 4),
+        memory_peak_max=max(peaks, default=None),
+        rows_read_mean=statistics.fmean(run.rows_read for run in runs),
+        rows_written_mean=statistics.fmean(run.rows_written for run in runs),
+    )
+
+
+def expected_income(world: SyntheticWorld, start: date, end: date) -> dict[float, float]:
+    """Income per hour start straight from the synthetic world, the reference scrape_electricity is checked against."""
+    income: dict[float, float] = {}
+    day = start
+    while day <= end:
+        rate = None
+        for back in range(1, CNB_RATE_LOOKBACK + 2):
+            if (rate := world.rate(day - timedelta(days=back))) is not None:
+                break
+        day_start, _ = world.day_bounds(day)
+        step = world.price_step(day)
+        for i, price in enumerate(world.prices(day)):
+            t = day_start + i * step
+            hour = t - (t - day_start) % 3600
+            energy = world.hourly_export(hour) * min(step, 3600) / 3600
+            if rate is not None:
+                income[hour] = income.get(hour, 0.0) + price * energy * rate / 1000
+        day += DAY
+    return income
+
+
+def _seed_states(hass: HomeAssistant, world: SyntheticWorld, start: float, end: float, interval: int) -> int:
+    """Export meter readings every interval seconds, written straight into the states table."""
+    hours = start + 3600.0 * np.arange(int(end - start) // 3600)
+    energy = np.array([world.hourly_export(t) for t in hours])
+    cumulative = np.concatenate(([0.0], np.cumsum(energy)))
+    times = np.arange(start, end, interval, dtype=float)
+    index = ((times - start) // 3600).astype(int)
+    readings = cumulative[index] + energy[index] * ((times - start) % 3600) / 3600
+    instance = get_instance(hass)
+    with session_scope(session=instance.get_session()) as session:
+        meta = StatesMeta(entity_id=EXPORT_ENTITY_ID)
+        session.add(meta)
+        session.flush()
+        for i in range(0, len(times), INSERT_BATCH):
+            session.execute(insert(States), [
+                {"metadata_id": meta.metadata_id, "state": f"{reading:.4f}", "last_updated_ts": t, "origin_idx": 0}
+                for t, reading in zip(times[i:i + INSERT_BATCH].tolist(), readings[i:i + INSERT_BATCH].tolist())
+            ])
+    return len(times)
+
+
+def _seed_statistics(hass: HomeAssistant, world: SyntheticWorld, start: float, end: float, price_days: list[date]) -> int:
+    hours = start + 3600.0 * np.arange(int(end - start) // 3600)
+    sums = np.cumsum([world.hourly_export(t) for t in hours])
+    async_import_statistics(
+        hass,
+        StatisticMetaData(
+            statistic_id=EXPORT_ENTITY_ID,
+            source="recorder",
+            name="Meter total energy export",
+            has_sum=True,
+            mean_type=StatisticMeanType.NONE,
+            unit_of_measurement="kWh",
+            unit_class="energy",
+        ),
+        [
+            StatisticData(start=datetime.fromtimestamp(t, timezone.utc), state=float(s), sum=float(s))
+            for t, s in zip(hours.tolist(), sums.tolist())
+        ],
+    )
+    prices = []
+    for day in price_days:
+        day_start, _ = world.day_bounds(day)
+        per_hour = 3600 // min(world.price_step(day), 3600)
+        values = np.array(world.prices(day)).reshape(-1, per_hour)
+        prices.extend(
+            StatisticData(start=datetime.fromtimestamp(day_start + 3600 * h, timezone.utc), mean=float(v.mean()), min=float(v.min()), max=float(v.max()))
+            for h, v in enumerate(values)
+        )
+    async_add_external_statistics(
+        hass,
+        StatisticMetaData(
+            statistic_id=ELE_PRICE_STAT_ID,
+            source="ote",
+            name="Electricity price",
+            has_sum=False,
+            mean_type=StatisticMeanType.ARITHMETIC,
+            unit_of_measurement="€/MWh",
+            unit_class=None,
+        ),
+        prices,
+    )
+    return len(hours) + len(prices)
+
+
+async def async_check_income(hass: HomeAssistant, world: SyntheticWorld, start: date, end: date) -> IncomeCheck:
+    expected = expected_income(world, start, end)
+    range_start, _ = world.day_bounds(start)
+    _, range_end = world.day_bounds(end)
+    stats = await get_instance(hass).async_add_executor_job(
+        statistics_during_period,
+        hass,
+        datetime.fromtimestamp(range_start, timezone.utc),
+        datetime.fromtimestamp(range_end, timezone.utc),
+        {PV_INCOME_STAT_ID},
+        "hour",
+        None,
+        {"state", "sum"},
+    )
+    rows = stats.get(PV_INCOME_STAT_ID, [])
+    stored = {row["start"]: row["state"] for row in rows}
+    errors = [abs(stored.get(hour, 0.0) - value) for hour, value in expected.items()]
+    sum_breaks = sum(
+        1 for previous, row in zip(rows, rows[1:])
+        if abs(row["sum"] - previous["sum"] - row["state"]) > TOLERANCE * max(1.0, abs(row["sum"]))
+    )
+    return IncomeCheck(
+        hours_expected=len(expected),
+        hours_stored=len(rows),
+        hours_wrong=sum(1 for error in errors if error > TOLERANCE * 100),
+        max_error=max(errors, default=0.0),
+        sum_breaks=sum_breaks,
+        total_expected=round(sum(expected.values()), 4),
+        total_stored=round(sum(stored.values()), 4),
+    )
+
+
+async def _async_run(
+        hass: HomeAssistant,
+        sources: FakeSources,
+        trigger: str,
+        action: Callable[[], Awaitable[Any]],
+        trace_memory: bool,
+        timeout: float = RUN_TIMEOUT,
+) -> RunResult:
+    """Run the action and wait for the instrumentation sensor of trigger to publish the run it caused."""
+    entity_id = f"sensor.pyscript_{trigger}_duration"
+    before = hass.states.get(entity_id)
+    runs = 0 if before is None else before.attributes.get("runs", 0)
+    phase_prefix = f"sensor.pyscript_{trigger}_"
+    requests_before = sum(sources.requests.values())
+    if trace_memory:
+        tracemalloc.reset_peak()
+    started = time.perf_counter()
+    started_at = datetime.now(timezone.utc)
+    await action()
+    deadline = started + timeout
+    state: State | None = None
+    while (state := hass.states.get(entity_id)) is None or state.attributes.get("runs", 0) == runs:
+        if time.perf_counter() > deadline:
+            raise TimeoutError(f"{trigger} did not finish")
+        await asyncio.sleep(0.01)
+    await get_instance(hass).async_block_till_done()
+    # the breakdown is published as one sensor per phase, those the run did not touch are from earlier runs
+    phases = {
+        phase.entity_id.removeprefix(phase_prefix).removesuffix("_duration"): {"seconds": float(phase.state), **phase.attributes}
+        for phase in hass.states.async_all("sensor")
+        if phase.entity_id.startswith(phase_prefix) and phase.entity_id != entity_id and phase.last_reported >= started_at
+    }
+    for phase in phases.values():
+        for key in ("friendly_name", "unit_of_measurement", "device_class", "state_class"):
+            phase.pop(key, None)
+    return RunResult(
+        wall_time=round(time.perf_counter() - started, 4),
+        memory_peak=tracemalloc.get_traced_memory()[1] if trace_memory else None,
+        rows_read=state.attributes.get("rows_read", 0),
+        rows_written=state.attributes.get("rows_written", 0),
+        source_requests=sum(sources.requests.values()) - requests_before,
+        phases=phases,
+    )
+
+
+async def _async_setup_hass(config_dir: str, sources: FakeSources, pyscript: Path) -> HomeAssistant:
+    Path(config_dir, "configuration.yaml").write_text(CONFIGURATION.format(
+        db_path=Path(config_dir, "home-assistant_v2.db"),
+        cnb_url=sources.cnb_url,
+        ote_url=sources.ote_url,
+    ))
+    Path(config_dir, "custom_components").mkdir()
+    os.symlink(pyscript.resolve(), Path(config_dir, "custom_components", "pyscript"))
+    os.symlink(REPO_DIR / "pyscript", Path(config_dir, "pyscript"))
+    hass = await bootstrap.async_setup_hass(runner.RuntimeConfig(config_dir=config_dir, skip_pip=True))
+    if hass is None:
+        raise RuntimeError("Home Assistant failed to start")
+    await hass.async_start()
+    await hass.async_block_till_done()
+    return hass
+
+
+async def async_main(args: argparse.Namespace) -> BenchResult:
+    end = args.end or datetime.now(TIME_ZONE).date() - 2 * DAY
+    start = end - (args.days - 1) * DAY
+    world = SyntheticWorld(seed=args.seed, quarter_hour_from=args.quarter_hour_from or start + args.days // 2 * DAY)
+    sources = FakeSources(world, args.recorded)
+    sources.start_in_thread()
+    trace_memory = not args.no_memory
+    log = logging.getLogger(__name__)
+    try:
+        with tempfile.TemporaryDirectory(prefix="scrape-electricity-bench-") as config_dir:
+            hass = await _async_setup_hass(config_dir, sources, args.pyscript)
+            try:
+                # a day of margin on both sides, for the first hourly change and the readings after the last hour
+                seed_start, _ = world.day_bounds(start - DAY)
+                _, seed_end = world.day_bounds(end + DAY)
+                log.warning(f"Seeding {start} - {end}")
+                seeding = time.perf_counter()
+                states = await get_instance(hass).async_add_executor_job(
+                    _seed_states, hass, world, seed_start, seed_end, args.meter_interval
+                )
+                price_days = [start + i * DAY for i in range(args.days)]
+                seeded = _seed_statistics(hass, world, seed_start, seed_end, price_days)
+                await get_instance(hass).async_block_till_done()
+                result = BenchResult(
+                    start=start.isoformat(),
+                    end=end.isoformat(),
+                    days=args.days,
+                    meter_states=states,
+                    statistics_seeded=seeded,
+                    seed_time=round(time.perf_counter() - seeding, 2),
+                )
+                if trace_memory:
+                    tracemalloc.start()
+
+                def recompute(first: date, last: date, from_scratch: bool = False) -> Callable[[], Awaitable[Any]]:
+                    async def call() -> None:
+                        await hass.services.async_call(
+                            "pyscript",
+                            "recompute_pv_income",
+                            {"start": first.isoformat(), "end": last.isoformat(), "from_scratch": from_scratch},
+                            blocking=True,
+                        )
+                    return call
+
+                log.warning("Running the daily recomputes")
+                daily = []
+                for i in range(args.days):
+                    day = start + i * DAY
+                    # only the very first day starts the running sum, like the first run on a fresh install
+                    daily.append(await _async_run(hass, sources, "recompute_pv_income", recompute(day, day, i == 0), trace_memory))
+                result.daily = _summarize(daily)
+                result.checks["daily"] = await async_check_income(hass, world, start, end)
+
+                log.warning("Recomputing the whole range")
+                await get_instance(hass).async_clear_statistics([PV_INCOME_STAT_ID])
+                await get_instance(hass).async_block_till_done()
+                result.year = await _async_run(hass, sources, "recompute_pv_income", recompute(start, end, True), trace_memory)
+                result.checks["year"] = await async_check_income(hass, world, start, end)
+
+                def fire(event: str) -> Callable[[], Awaitable[Any]]:
+                    async def call() -> None:
+                        hass.bus.async_fire(event)
+                    return call
+
+                log.warning("Running the price and export triggers")
+                result.price = await _async_run(hass, sources, "scrape_electricity_price", fire("scrape_electricity_price"), trace_memory)
+                # the controller publishes a run only when it knows the current price, from the prices fetched above
+                result.export = await _async_run(
+                    hass, sources, "adjust_electricity_export", fire("adjust_electricity_export"), trace_memory, timeout=60
+                )
+            finally:
+                if trace_memory:
+                    tracemalloc.stop()
+                await hass.async_stop()
+    finally:
+        sources.stop_thread()
+    result.source_requests = dict(sources.requests)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pyscript", type=Path, required=True, help="directory of the pyscript custom integration")
+    parser.add_argument("--days", type=int, default=365, help="simulated days")
+    parser.add_argument("--end", type=date.fromisoformat, help="last simulated day, two days ago by default")
+    parser.add_argument("--quarter-hour-from", type=date.fromisoformat, help="first day of 15 minute prices, mid-range by default")
+    parser.add_argument("--meter-interval", type=int, default=10, help="seconds between export meter states")
+    parser.add_argument("--recorded", type=Path, help="directory with recorded ote/<day>.json and cnb/<day>.txt responses")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc, it slows everything down")
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    result = asdict(asyncio.run(async_main(args)))
+    results = {"timestamp": int(time.time()), "python": sys.version.split()[0], **result}
+    failed = [name for name, check in result["checks"].items() if check["hours_wrong"] or check["sum_breaks"]]
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    if failed:
+        sys.exit(f"Income check failed: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""Local stand-ins for OTE and CNB, and the synthetic world they and the seeded recorder describe.
+
+Prices, EUR rates and the exported energy are deterministic functions of the seed and the day, so the benchmark
+can compute the expected income independently of scrape_electricity. OTE days switch from hourly to quarter-hour
+prices at a configurable date and follow the Europe/Prague DST days of 23 and 25 hours. Responses recorded from
+the real sites can be replayed instead, from <recorded>/ote/<YYYY-MM-DD>.json and <recorded>/cnb/<YYYY-MM-DD>.txt.
+"""
+import asyncio
+import json
+import math
+import random
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any
+from zoneinfo import ZoneInfo
+
+from aiohttp import web
+
+TIME_ZONE = ZoneInfo("Europe/Prague")
+DAY = timedelta(days=1)
+
+
+@dataclass
+class SyntheticWorld:
+    seed: int = 42
+    # the first day OTE publishes quarter-hour prices
+    quarter_hour_from: date = date(2025, 10, 1)
+    peak_export: float = 6.0
+
+    def day_bounds(self, day: date) -> tuple[float, float]:
+        start = datetime.combine(day, datetime.min.time(), TIME_ZONE).timestamp()
+        end = datetime.combine(day + DAY, datetime.min.time(), TIME_ZONE).timestamp()
+        return start, end
+
+    def price_step(self, day: date) -> int:
+        return 900 if day >= self.quarter_hour_from else 3600
+
+    def prices(self, day: date) -> list[float]:
+        """Day-ahead prices in €/MWh, negative around sunny weekend middays."""
+        start, end = self.day_bounds(day)
+        step = self.price_step(day)
+        rng = random.Random(self.seed * 1_000_003 + day.toordinal())
+        weekend = day.weekday() >= 5
+        prices = []
+        for i in range(int(end - start) // step):
+            hour = datetime.fromtimestamp(start + i * step, TIME_ZONE).hour + (i * step % 3600) / 3600
+            price = 95 + 45 * math.sin(2 * math.pi * (hour - 10) / 24) + rng.gauss(0, 8)
+            if weekend and 11 <= hour < 15:
+                price -= 130
+            prices.append(round(price, 2))
+        return prices
+
+    def rate(self, day: date) -> float | None:
+        """EUR/CZK rate, published on working days only."""
+        if day.weekday() >= 5:
+            return None
+        rng = random.Random(self.seed * 7_919 + day.toordinal())
+        return round(24.5 + 0.6 * math.sin(day.toordinal() / 40) + rng.uniform(-0.05, 0.05), 3)
+
+    def hourly_export(self, hour_start: float) -> float:
+        """kWh exported in the hour, at constant power within the hour."""
+        local = datetime.fromtimestamp(hour_start, TIME_ZONE)
+        daylight = math.sin(math.pi * (local.hour + 0.5 - 6) / 14)
+        if daylight <= 0:
+            return 0.0
+        clouds = random.Random(self.seed * 104_729 + local.date().toordinal()).uniform(0.3, 1.0)
+        seasonal = 0.55 + 0.45 * math.cos(2 * math.pi * (local.timetuple().tm_yday - 172) / 365)
+        return round(self.peak_export * daylight * clouds * seasonal, 4)
+
+
+def ote_body(world: SyntheticWorld, day: date) -> dict[str, Any]:
+    points = [{"x": str(i + 1), "y": price} for i, price in enumerate(world.prices(day))]
+    return {
+        "data": {
+            "dataLine": [
+                {"title": "Množství (MWh)", "point": [{"x": p["x"], "y": 1000.0} for p in points]},
+                {"title": "Cena (EUR/MWh)", "point": points},
+            ]
+        }
+    }
+
+
+def cnb_body(world: SyntheticWorld, start: date, end: date) -> str:
+    lines = ["Měna: EUR|Množství: 1", "Datum|Kurz"]
+    day = start
+    while day <= end:
+        if (rate := world.rate(day)) is not None:
+            decimal_comma = f"{rate:.3f}".replace(".", ",")
+            lines.append(f"{day.strftime('%d.%m.%Y')}|{decimal_comma}")
+        day += DAY
+    return "\n".join(lines) + "\n"
+
+
+class FakeSources:
+    """Serves /chart-data?report_date= like OTE and /vybrane.txt?od=&do= like CNB."""
+
+    def __init__(self, world: SyntheticWorld, recorded: Path | None = None) -> None:
+        self.world = world
+        self.recorded = recorded
+        self.requests: Counter[str] = Counter()
+        self.payload_bytes = 0
+        self.url = ""
+        self._runner: web.AppRunner | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def ote_url(self) -> str:
+        return f"{self.url}chart-data?report_date={{}}"
+
+    @property
+    def cnb_url(self) -> str:
+        return f"{self.url}vybrane.txt?od={{}}&do={{}}"
+
+    async def async_start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        app = web.Application()
+        app.router.add_get("/chart-data", self._ote)
+        app.router.add_get("/vybrane.txt", self._cnb)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        self.url = f"http://{host}:{self._runner.addresses[0][1]}/"
+        return self.url
+
+    async def async_stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def start_in_thread(self) -> str:
+        """Serve from a thread with its own event loop, so that the fake does not load the loop being measured."""
+        started = threading.Event()
+        self._loop = asyncio.new_event_loop()
+
+        def run() -> None:
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self.async_start())
+            started.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self.async_stop())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="fake-sources", daemon=True)
+        self._thread.start()
+        started.wait()
+        return self.url
+
+    def stop_thread(self) -> None:
+        if self._loop is not None and self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop = None
+            self._thread = None
+
+    def _recorded(self, source: str, day: date, suffix: str) -> str | None:
+        if self.recorded is None:
+            return None
+        path = self.recorded / source / f"{day.isoformat()}{suffix}"
+        return path.read_text(encoding="utf-8") if path.exists() else None
+
+    def _respond(self, source: str, body: str, content_type: str) -> web.Response:
+        self.requests[source] += 1
+        self.payload_bytes += len(body.encode())
+        return web.Response(text=body, content_type=content_type)
+
+    async def _ote(self, request: web.Request) -> web.Response:
+        day = date.fromisoformat(request.query["report_date"])
+        body = self._recorded("ote", day, ".json") or json.dumps(ote_body(self.world, day))
+        return self._respond("ote", body, "application/json")
+
+    async def _cnb(self, request: web.Request) -> web.Response:
+        start = datetime.strptime(request.query["od"], "%d.%m.%Y").date()
+        end = datetime.strptime(request.query["do"], "%d.%m.%Y").date()
+        body = self._recorded("cnb", start, ".txt") if start == end else None
+        return self._respond("cnb", body or cnb_body(self.world, start, end), "text/plain")
+
+
+async def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8098)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--quarter-hour-from", type=date.fromisoformat, default=date(2025, 10, 1))
+    parser.add_argument("--recorded", type=Path)
+    args = parser.parse_args()
+    sources = FakeSources(SyntheticWorld(seed=args.seed, quarter_hour_from=args.quarter_hour_from), args.recorded)
+    await sources.async_start(port=args.port)
+    print(f"OTE at {sources.ote_url}\nCNB at {sources.cnb_url}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
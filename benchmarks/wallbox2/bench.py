@@ -0,0 +1,330 @@
+"""Benchmarks wallbox2 against the local stand-in Wallbox API.
+
+Every scenario boots a throwaway Home Assistant instance with a file based recorder, adds one wallbox2 config
+entry per charger pointed at the fake API and then measures:
+
+- setup:  adding the entries, including the first refresh of every charger
+- import:   the first poll with sessions, importing the sessions of the last day into the recorder
+- steady:   further polls, where nothing changed since the import
+- backfill: the wallbox2.backfill_sessions service importing the whole history before that day, which is the
+            phase the session count scales
+- writes: a burst of setpoint writes on every charger, coalesced by the command queue
+
+For each phase it reports the wall time, the per-charger poll latency, the longest and the total event loop
+lag seen by a heartbeat task, the tracemalloc peak and the recorder rows written. The results are printed, or
+written with --output, as JSON, one object per scenario.
+
+Run from the Home Assistant virtualenv, with the wallbox2 requirements installed:
+
+    python benchmarks/wallbox2/bench.py --chargers 1,10,50 --sessions 0,1000,100000 --output bench.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any
+
+from homeassistant import bootstrap, runner
+from homeassistant.components.recorder import get_instance
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+
+sys.path.insert(0, str(Path(__file__).parent))
+from fake_api import FakeWallboxApi, FakeWallboxConfig  # noqa: E402
+
+REPO_DIR = Path(__file__).resolve().parents[2]
+DOMAIN = "wallbox2"
+SERVICE_BACKFILL_SESSIONS = "backfill_sessions"
+BACKFILL_POLL_INTERVAL = 0.05
+PHASE_POLL = "poll"
+HEARTBEAT_INTERVAL = 0.005
+LAG_THRESHOLD = 0.01
+
+CONFIGURATION = """\
+homeassistant:
+  name: Benchmark
+  latitude: 50.08
+  longitude: 14.42
+  elevation: 200
+  unit_system: metric
+  time_zone: UTC
+  country: CZ
+recorder:
+  db_url: sqlite:///{db_path}
+  commit_interval: 1
+logger:
+  default: warning
+"""
+
+
+@dataclass
+class PhaseResult:
+    wall_time: float
+    poll_latency_p50: float | None = None
+    poll_latency_p95: float | None = None
+    poll_latency_max: float | None = None
+    loop_lag_max: float = 0.0
+    loop_blocked: float = 0.0
+    memory_peak: int | None = None
+    rows_written: int = 0
+    api_requests: int = 0
+    api_payload_bytes: int = 0
+
+
+@dataclass
+class ScenarioResult:
+    chargers: int
+    sessions: int
+    latency: float
+    error_rate: float
+    rate_limit_rate: float
+    phases: dict[str, PhaseResult] = field(default_factory=dict)
+    fake_requests: dict[str, int] = field(default_factory=dict)
+    errors: list[str] = field(default_factory=list)
+
+
+class Heartbeat:
+    """Measures how late a task sleeping in short steps wakes up, i.e. how long the event loop was blocked."""
+
+    def __init__(self) -> None:
+        self.max_lag = 0.0
+        self.blocked = 0.0
+        self._task: asyncio.Task[None] | None = None
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            lag = time.perf_counter() - start - HEARTBEAT_INTERVAL
+            self.max_lag = max(self.max_lag, lag)
+            if lag > LAG_THRESHOLD:
+                self.blocked += lag
+
+    def start(self) -> None:
+        self.max_lag = 0.0
+        self.blocked = 0.0
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def _percentile(values: list[float], percentile: int) -> float | None:
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[percentile - 1]
+
+
+def _poll_counts(entries: list[ConfigEntry]) -> dict[str, int]:
+    counts = {}
+    for entry in entries:
+        if hasattr(entry, "runtime_data"):
+            histogram = entry.runtime_data.metrics.latency.get(PHASE_POLL)
+            counts[entry.entry_id] = 0 if histogram is None else histogram.count
+    return counts
+
+
+def _rows_written(entries: list[ConfigEntry]) -> int:
+    return sum(entry.runtime_data.metrics.rows_written for entry in entries if hasattr(entry, "runtime_data"))
+
+
+async def _measure(
+        hass: HomeAssistant,
+        entries: list[ConfigEntry],
+        fake: FakeWallboxApi,
+        action: Callable[[], Awaitable[Any]],
+        trace_memory: bool,
+) -> PhaseResult:
+    polls_before = _poll_counts(entries)
+    rows_before = _rows_written(entries)
+    requests_before = sum(fake.requests.values())
+    payload_before = fake.payload_bytes
+
+    heartbeat = Heartbeat()
+    if trace_memory:
+        tracemalloc.reset_peak()
+    heartbeat.start()
+    start = time.perf_counter()
+    await action()
+    await hass.async_block_till_done()
+    await get_instance(hass).async_block_till_done()
+    wall_time = time.perf_counter() - start
+    await heartbeat.stop()
+
+    latencies = [
+        entry.runtime_data.metrics.latency[PHASE_POLL].last
+        for entry in entries
+        if _poll_counts([entry]).get(entry.entry_id, 0) > polls_before.get(entry.entry_id, 0)
+    ]
+    return PhaseResult(
+        wall_time=round(wall_time, 4),
+        poll_latency_p50=_percentile(latencies, 50),
+        poll_latency_p95=_percentile(latencies, 95),
+        poll_latency_max=max(latencies, default=None),
+        loop_lag_max=round(heartbeat.max_lag, 4),
+        loop_blocked=round(heartbeat.blocked, 4),
+        memory_peak=tracemalloc.get_traced_memory()[1] if trace_memory else None,
+        rows_written=_rows_written(entries) - rows_before,
+        api_requests=sum(fake.requests.values()) - requests_before,
+        api_payload_bytes=fake.payload_bytes - payload_before,
+    )
+
+
+def _config_entry(charger_id: int, url: str) -> ConfigEntry:
+    return ConfigEntry(
+        data={
+            "station": str(charger_id),
+            CONF_USERNAME: "bench",
+            CONF_PASSWORD: "bench",
+            "api_url": url,
+            "auth_url": url,
+        },
+        discovery_keys=MappingProxyType({}),
+        domain=DOMAIN,
+        minor_version=1,
+        options={},
+        source="user",
+        title=f"Bench {charger_id}",
+        unique_id=str(charger_id),
+        version=1,
+    )
+
+
+async def _async_setup_hass(config_dir: str) -> HomeAssistant:
+    Path(config_dir, "configuration.yaml").write_text(CONFIGURATION.format(db_path=Path(config_dir, "home-assistant_v2.db")))
+    os.symlink(REPO_DIR / "custom_components", Path(config_dir, "custom_components"))
+    hass = await bootstrap.async_setup_hass(runner.RuntimeConfig(config_dir=config_dir, skip_pip=True))
+    if hass is None:
+        raise RuntimeError("Home Assistant failed to start")
+    await hass.async_start()
+    return hass
+
+
+async def async_run_scenario(args: argparse.Namespace, chargers: int, sessions: int) -> ScenarioResult:
+    result = ScenarioResult(chargers, sessions, args.latency, args.error_rate, args.rate_limit_rate)
+    fake = FakeWallboxApi(FakeWallboxConfig(
+        chargers=chargers,
+        sessions=sessions,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed,
+    ))
+    url = fake.start_in_thread()
+    trace_memory = not args.no_memory
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        with tempfile.TemporaryDirectory(prefix="wallbox2-bench-") as config_dir:
+            hass = await _async_setup_hass(config_dir)
+            try:
+                entries = [_config_entry(charger_id, url) for charger_id in fake.chargers]
+
+                async def setup() -> None:
+                    for entry in entries:
+                        await hass.config_entries.async_add(entry)
+
+                async def refresh() -> None:
+                    await asyncio.gather(*(entry.runtime_data.async_refresh() for entry in entries))
+
+                async def backfill() -> None:
+                    for entry in entries:
+                        try:
+                            await hass.services.async_call(
+                                DOMAIN, SERVICE_BACKFILL_SESSIONS, {"config_entry_id": entry.entry_id}, blocking=True
+                            )
+                        except HomeAssistantError as err:
+                            result.errors.append(f"{entry.title}: backfill {err}")
+                    # the service only starts the backfills, they run as background tasks of the entries
+                    while any(entry.runtime_data.backfill.running for entry in entries):
+                        await asyncio.sleep(BACKFILL_POLL_INTERVAL)
+
+                async def writes() -> None:
+                    await asyncio.gather(*(
+                        entry.runtime_data.async_set_charging_current(current)
+                        for entry in entries
+                        for current in (10, 12, 14)
+                    ))
+
+                result.phases["setup"] = await _measure(hass, entries, fake, setup, trace_memory)
+                result.errors.extend(f"{entry.title}: {entry.state}" for entry in entries if not hasattr(entry, "runtime_data"))
+                entries = [entry for entry in entries if hasattr(entry, "runtime_data")]
+                result.phases["import"] = await _measure(hass, entries, fake, refresh, trace_memory)
+                for i in range(args.rounds):
+                    result.phases[f"steady_{i + 1}"] = await _measure(hass, entries, fake, refresh, trace_memory)
+                if not args.no_backfill:
+                    result.phases["backfill"] = await _measure(hass, entries, fake, backfill, trace_memory)
+                if not args.no_writes:
+                    result.phases["writes"] = await _measure(hass, entries, fake, writes, trace_memory)
+            finally:
+                await hass.async_stop()
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+        fake.stop_thread()
+    result.fake_requests = dict(fake.requests)
+    return result
+
+
+async def async_main(args: argparse.Namespace) -> list[dict[str, Any]]:
+    results = []
+    for chargers in args.chargers:
+        for sessions in args.sessions:
+            logging.getLogger(__name__).warning(f"Running {chargers} chargers with {sessions} sessions")
+            results.append(asdict(await async_run_scenario(args, chargers, sessions)))
+    return results
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",")]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chargers", type=_int_list, default=[1, 10, 50], help="comma separated charger counts")
+    parser.add_argument("--sessions", type=_int_list, default=[0, 1000, 100000], help="comma separated session counts")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake API latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--rounds", type=int, default=3, help="steady state polls after the import")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc, it slows everything down")
+    parser.add_argument("--no-backfill", action="store_true", help="skip the backfill of the session history")
+    parser.add_argument("--no-writes", action="store_true", help="skip the setpoint write burst")
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    results = {
+        "timestamp": int(time.time()),
+        "python": sys.version.split()[0],
+        "scenarios": asyncio.run(async_main(args)),
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
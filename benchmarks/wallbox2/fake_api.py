@@ -0,0 +1,311 @@
+"""Local stand-in for the Wallbox cloud, serving the endpoints used by wallbox2."""
+import asyncio
+import json
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any
+
+from aiohttp import web
+
+from homeassistant.components.wallbox.const import (
+    CHARGER_CURRENCY_KEY,
+    CHARGER_CURRENT_VERSION_KEY,
+    CHARGER_DATA_KEY,
+    CHARGER_ENERGY_PRICE_KEY,
+    CHARGER_FEATURES_KEY,
+    CHARGER_LOCKED_UNLOCKED_KEY,
+    CHARGER_MAX_CHARGING_CURRENT_KEY,
+    CHARGER_MAX_ICP_CURRENT_KEY,
+    CHARGER_NAME_KEY,
+    CHARGER_PART_NUMBER_KEY,
+    CHARGER_PLAN_KEY,
+    CHARGER_SERIAL_NUMBER_KEY,
+    CHARGER_SOFTWARE_KEY,
+    CHARGER_STATUS_ID_KEY,
+    CODE_KEY,
+)
+
+FIRST_SESSION_TIME = 1704063600
+TOKEN_TTL = 3600
+STATUS_CHARGING = 194
+STATUS_READY = 161
+
+
+@dataclass
+class FakeWallboxConfig:
+    chargers: int = 1
+    sessions: int = 0
+    latency: float = 0.05
+    jitter: float = 0.02
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    charging_share: float = 0.2
+    group_id: int = 1
+    first_charger_id: int = 100000
+    seed: int = 42
+
+
+@dataclass
+class FakeSession:
+    id: int
+    charger_id: int
+    start_time: int
+    end_time: int
+    energy: float
+    green_energy: float
+    cost: float
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "type": "charger_charging_session",
+            "id": self.id,
+            "attributes": {
+                "charger_id": self.charger_id,
+                "start_time": self.start_time,
+                "end_time": self.end_time,
+                "energy": self.energy,
+                "green_energy": self.green_energy,
+                "grid_energy": round(self.energy - self.green_energy, 3),
+                "cost": self.cost,
+            },
+        }
+
+
+@dataclass
+class FakeCharger:
+    id: int
+    charging: bool
+    max_charging_current: float = 16
+    max_icp_current: float = 25
+    locked: int = 0
+    energy_price: float = 0.2
+    eco_smart: dict[str, Any] = field(default_factory=lambda: {"enabled": False, "mode": 0})
+
+
+class FakeWallboxApi:
+    """aiohttp application answering like api.wall-box.com and user-api.wall-box.com.
+
+    Both hosts are served from the same port, the base URL is used as API and auth URL alike.
+    """
+
+    def __init__(self, config: FakeWallboxConfig) -> None:
+        self.config = config
+        self.requests: Counter[str] = Counter()
+        self.payload_bytes = 0
+        self._random = random.Random(config.seed)
+        self.chargers = {
+            config.first_charger_id + i: FakeCharger(config.first_charger_id + i, self._random.random() < config.charging_share)
+            for i in range(config.chargers)
+        }
+        self.sessions = self._generate_sessions()
+        self._session_starts = [session.start_time for session in self.sessions]
+        self._query: tuple[str, list[FakeSession]] | None = None
+        self._runner: web.AppRunner | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self.url = ""
+
+    def _generate_sessions(self) -> list[FakeSession]:
+        end = int(time.time()) // 3600 * 3600 - 3600
+        charger_ids = list(self.chargers)
+        sessions = []
+        for i in range(self.config.sessions):
+            start = self._random.randrange(FIRST_SESSION_TIME, end)
+            duration = self._random.randrange(600, 12 * 3600)
+            energy = round(self._random.uniform(500, 60000), 3)
+            green = round(energy * self._random.random(), 3)
+            sessions.append(FakeSession(i + 1, charger_ids[i % len(charger_ids)], start, start + duration, energy, green, round(energy / 1000 * 0.2, 2)))
+        sessions.sort(key=lambda session: session.start_time)
+        return sessions
+
+    async def async_start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_get("/users/signin", self._signin)
+        app.router.add_get("/users/refresh-token", self._signin)
+        app.router.add_get("/chargers/status/{charger_id}", self._status)
+        app.router.add_get("/v4/groups/{group_id}/charger-charging-sessions", self._sessions)
+        app.router.add_put("/v2/charger/{charger_id}", self._put_charger)
+        app.router.add_post("/chargers/config/{charger_id}", self._post_config)
+        app.router.add_post("/v3/chargers/{charger_id}/remote-action", self._remote_action)
+        app.router.add_put("/v4/chargers/{charger_id}/eco-smart", self._eco_smart)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        self.url = f"http://{host}:{self._runner.addresses[0][1]}/"
+        return self.url
+
+    async def async_stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def start_in_thread(self) -> str:
+        """Serve from a thread with its own event loop, so that the fake does not load the loop being measured."""
+        started = threading.Event()
+        self._loop = asyncio.new_event_loop()
+
+        def run() -> None:
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self.async_start())
+            started.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self.async_stop())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="fake-wallbox-api", daemon=True)
+        self._thread.start()
+        started.wait()
+        return self.url
+
+    def stop_thread(self) -> None:
+        if self._loop is not None and self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop = None
+            self._thread = None
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler: Any) -> web.StreamResponse:
+        resource = request.match_info.route.resource
+        self.requests[f"{request.method} {request.path if resource is None else resource.canonical}"] += 1
+        await asyncio.sleep(max(0.0, self.config.latency + self._random.uniform(-self.config.jitter, self.config.jitter)))
+        roll = self._random.random()
+        if roll < self.config.rate_limit_rate:
+            self.requests["429"] += 1
+            return web.json_response({"error": "too many requests"}, status=429)
+        if roll < self.config.rate_limit_rate + self.config.error_rate:
+            self.requests["503"] += 1
+            return web.json_response({"error": "unavailable"}, status=503)
+        response = await handler(request)
+        if isinstance(response, web.Response) and response.body is not None:
+            self.payload_bytes += len(response.body)
+        return response
+
+    def _charger(self, request: web.Request) -> FakeCharger:
+        if (charger := self.chargers.get(int(request.match_info["charger_id"]))) is None:
+            raise web.HTTPNotFound
+        return charger
+
+    async def _signin(self, request: web.Request) -> web.Response:
+        expires = int((time.time() + TOKEN_TTL) * 1000)
+        return web.json_response({
+            "data": {
+                "attributes": {
+                    "token": f"token-{expires}",
+                    "refresh_token": f"refresh-{expires}",
+                    "ttl": expires,
+                    "refresh_token_ttl": expires + TOKEN_TTL * 1000,
+                }
+            }
+        })
+
+    async def _status(self, request: web.Request) -> web.Response:
+        charger = self._charger(request)
+        return web.json_response({
+            CHARGER_NAME_KEY: f"Bench SN {charger.id}",
+            CHARGER_STATUS_ID_KEY: STATUS_CHARGING if charger.charging else STATUS_READY,
+            "charging_power": 7.4 if charger.charging else 0,
+            "added_energy": 0,
+            CHARGER_DATA_KEY: {
+                "id": charger.id,
+                "group_id": self.config.group_id,
+                CHARGER_SERIAL_NUMBER_KEY: str(charger.id),
+                CHARGER_PART_NUMBER_KEY: "PLP1-0-2-4-9-002-E",
+                CHARGER_SOFTWARE_KEY: {CHARGER_CURRENT_VERSION_KEY: "6.6.9"},
+                CHARGER_MAX_CHARGING_CURRENT_KEY: charger.max_charging_current,
+                CHARGER_MAX_ICP_CURRENT_KEY: charger.max_icp_current,
+                CHARGER_LOCKED_UNLOCKED_KEY: charger.locked,
+                CHARGER_ENERGY_PRICE_KEY: charger.energy_price,
+                CHARGER_CURRENCY_KEY: {CODE_KEY: "EUR"},
+                CHARGER_PLAN_KEY: {CHARGER_FEATURES_KEY: ["POWER_BOOST"]},
+                "ecosmart": charger.eco_smart,
+            },
+        })
+
+    async def _sessions(self, request: web.Request) -> web.Response:
+        start_time = 0
+        end_time = 2 ** 63
+        charger_ids: set[int] | None = None
+        for flt in json.loads(request.query["filters"])["filters"]:
+            if flt["field"] == "start_time" and flt["operator"] == "gte":
+                start_time = flt["value"]
+            elif flt["field"] == "start_time" and flt["operator"] == "lt":
+                end_time = flt["value"]
+            elif flt["field"] == "charger_id" and flt["operator"] == "in":
+                charger_ids = set(flt["value"])
+        limit = int(request.query.get("limit", 1000))
+        offset = int(request.query.get("offset", 0))
+
+        # the client pages through the same filter, select the matching sessions once
+        if self._query is None or self._query[0] != request.query["filters"]:
+            selected = []
+            for i in range(bisect_left(self._session_starts, start_time), len(self.sessions)):
+                session = self.sessions[i]
+                if session.start_time >= end_time:
+                    break
+                if charger_ids is None or session.charger_id in charger_ids:
+                    selected.append(session)
+            self._query = (request.query["filters"], selected)
+        page = [session.as_dict() for session in self._query[1][offset:offset + limit]]
+        return web.json_response({"data": page, "meta": {"count": len(self._query[1])}})
+
+    async def _put_charger(self, request: web.Request) -> web.Response:
+        charger = self._charger(request)
+        body = await request.json()
+        if "maxChargingCurrent" in body:
+            charger.max_charging_current = body["maxChargingCurrent"]
+        if "locked" in body:
+            charger.locked = body["locked"]
+        return web.json_response({
+            "data": {"chargerData": {"maxChargingCurrent": charger.max_charging_current, "locked": charger.locked}}
+        })
+
+    async def _post_config(self, request: web.Request) -> web.Response:
+        charger = self._charger(request)
+        body = await request.json()
+        if "maxAvailableCurrent" in body:
+            charger.max_icp_current = body["maxAvailableCurrent"]
+        if "energyCost" in body:
+            charger.energy_price = body["energyCost"]
+        return web.json_response({"maxAvailableCurrent": charger.max_icp_current, "energyCost": charger.energy_price})
+
+    async def _remote_action(self, request: web.Request) -> web.Response:
+        charger = self._charger(request)
+        charger.charging = (await request.json())["action"] == 1
+        return web.json_response({})
+
+    async def _eco_smart(self, request: web.Request) -> web.Response:
+        charger = self._charger(request)
+        attributes = (await request.json())["data"]["attributes"]
+        charger.eco_smart = {"enabled": bool(attributes["enabled"]), "mode": attributes["mode"]}
+        return web.json_response({})
+
+
+async def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--chargers", type=int, default=1)
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    api = FakeWallboxApi(FakeWallboxConfig(
+        chargers=args.chargers,
+        sessions=args.sessions,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+    ))
+    print(f"Serving {args.chargers} chargers with {args.sessions} sessions at {await api.async_start(port=args.port)}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
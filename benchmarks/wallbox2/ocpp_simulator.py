@@ -0,0 +1,112 @@
+"""OCPP 1.6 charge point simulator, plays charging sessions against the wallbox2 local OCPP endpoint."""
+import asyncio
+import itertools
+import json
+import time
+from datetime import datetime, timezone
+from typing import Any
+
+import aiohttp
+
+OCPP_PROTOCOL = "ocpp1.6"
+CALL = 2
+CALL_RESULT = 3
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class OcppChargePointSimulator:
+    """Connects like a charger would and sends its calls one at a time, waiting for each result."""
+
+    def __init__(self, url: str, password: str, power: float = 7400.0, meter_interval: float = 10.0) -> None:
+        self._url = url
+        # security profile 1, the charge point id is the last path segment
+        self._auth = aiohttp.BasicAuth(url.rstrip("/").rsplit("/", 1)[-1], password)
+        self._power = power
+        self._meter_interval = meter_interval
+        self._meter = 0.0
+        self._ids = itertools.count(1)
+        self._ws: aiohttp.ClientWebSocketResponse | None = None
+        self.round_trips: list[float] = []
+
+    async def async_call(self, action: str, payload: dict[str, Any]) -> dict[str, Any]:
+        message_id = str(next(self._ids))
+        started = time.perf_counter()
+        await self._ws.send_str(json.dumps([CALL, message_id, action, payload]))
+        message_type, response_id, *rest = json.loads(await self._ws.receive_str())
+        self.round_trips.append(time.perf_counter() - started)
+        if message_type != CALL_RESULT or response_id != message_id:
+            raise RuntimeError(f"{action} failed: {rest}")
+        return rest[0]
+
+    async def async_status(self, status: str) -> None:
+        await self.async_call("StatusNotification", {
+            "connectorId": 1, "errorCode": "NoError", "status": status, "timestamp": _now(),
+        })
+
+    async def async_session(self, duration: float) -> None:
+        """Plug in, charge at constant power for duration seconds and unplug."""
+        await self.async_status("Preparing")
+        result = await self.async_call("StartTransaction", {
+            "connectorId": 1, "idTag": "simulator", "meterStart": round(self._meter), "timestamp": _now(),
+        })
+        transaction_id = result["transactionId"]
+        await self.async_status("Charging")
+        end = time.monotonic() + duration
+        while (remaining := end - time.monotonic()) > 0:
+            await asyncio.sleep(min(self._meter_interval, remaining))
+            self._meter += self._power * min(self._meter_interval, remaining) / 3600
+            await self.async_call("MeterValues", {
+                "connectorId": 1,
+                "transactionId": transaction_id,
+                "meterValue": [{
+                    "timestamp": _now(),
+                    "sampledValue": [
+                        {"measurand": "Energy.Active.Import.Register", "unit": "Wh", "value": f"{self._meter:.0f}"},
+                        {"measurand": "Power.Active.Import", "unit": "W", "value": f"{self._power:.0f}"},
+                    ],
+                }],
+            })
+        await self.async_call("StopTransaction", {
+            "transactionId": transaction_id, "meterStop": round(self._meter), "timestamp": _now(),
+        })
+        await self.async_status("Finishing")
+        await self.async_status("Available")
+
+    async def async_run(self, sessions: int, duration: float, pause: float) -> None:
+        async with aiohttp.ClientSession() as session, session.ws_connect(self._url, protocols=(OCPP_PROTOCOL,), auth=self._auth) as ws:
+            self._ws = ws
+            await self.async_call("BootNotification", {"chargePointVendor": "Wall Box Chargers", "chargePointModel": "Simulator"})
+            await self.async_status("Available")
+            for _ in range(sessions):
+                await self.async_session(duration)
+                await asyncio.sleep(pause)
+            self._ws = None
+
+
+async def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("url", help="ws://<home assistant>:<port>/<charge point id>")
+    parser.add_argument("--password", required=True, help="OCPP password configured in the wallbox2 options")
+    parser.add_argument("--sessions", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=60.0)
+    parser.add_argument("--pause", type=float, default=10.0)
+    parser.add_argument("--power", type=float, default=7400.0)
+    parser.add_argument("--meter-interval", type=float, default=10.0)
+    args = parser.parse_args()
+    simulator = OcppChargePointSimulator(args.url, args.password, args.power, args.meter_interval)
+    await simulator.async_run(args.sessions, args.duration, args.pause)
+    round_trips = sorted(simulator.round_trips)
+    print(json.dumps({
+        "calls": len(round_trips),
+        "round_trip_p50": round_trips[len(round_trips) // 2],
+        "round_trip_max": round_trips[-1],
+    }))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
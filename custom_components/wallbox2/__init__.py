@@ -1,49 +1,123 @@
+import logging
+
 from homeassistant.const import CONF_PASSWORD, CONF_USERNAME, Platform
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.typing import ConfigType
+from homeassistant.helpers.storage import Store
 
-from homeassistant.components.wallbox.coordinator import check_token_validity
+from .api import API_BASE_URL, AUTH_BASE_URL, Wallbox2Api
 from .coordinator import Wallbox2Coordinator, Wallbox2ConfigEntry
+from .ocpp import async_get_ocpp_server, async_release_ocpp_server
+from .scheduler import async_get_poll_scheduler
+from .services import async_setup_services
 
 from .const import (
     CHARGER_JWT_REFRESH_TOKEN,
     CHARGER_JWT_REFRESH_TTL,
     CHARGER_JWT_TOKEN,
     CHARGER_JWT_TTL,
-    UPDATE_INTERVAL,
+    CONF_API_URL,
+    CONF_AUTH_URL,
+    CONF_OCPP_CHARGE_POINT_ID,
+    CONF_OCPP_ENABLED,
+    CONF_OCPP_HOST,
+    CONF_OCPP_PASSWORD,
+    CONF_OCPP_PORT,
+    DEFAULT_OCPP_PORT,
 )
 
-from wallbox import Wallbox
-from .const import DOMAIN, UPDATE_INTERVAL
+from .const import CONF_STATION, DOMAIN, STORAGE_VERSION
+
+_LOGGER = logging.getLogger(__name__)
 
 PLATFORMS = [Platform.LOCK, Platform.NUMBER, Platform.SELECT, Platform.SENSOR, Platform.SWITCH]
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    async_setup_services(hass)
+    return True
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: Wallbox2ConfigEntry) -> bool:
-    wallbox = Wallbox(
+    # all entries share Home Assistant's client session and so a single keep-alive pool
+    api = Wallbox2Api(
+        async_get_clientsession(hass),
         entry.data[CONF_USERNAME],
         entry.data[CONF_PASSWORD],
-        jwtTokenDrift=UPDATE_INTERVAL,
+        # not offered by the config flow, only entries created by the benchmarks point elsewhere
+        entry.data.get(CONF_API_URL, API_BASE_URL),
+        entry.data.get(CONF_AUTH_URL, AUTH_BASE_URL),
     )
-    if CHARGER_JWT_TOKEN in entry.data and check_token_validity(
-            jwt_token_ttl=entry.data.get(CHARGER_JWT_TTL, 0),
-            jwt_token_drift=UPDATE_INTERVAL,
-    ):
-        wallbox.jwtToken = entry.data.get(CHARGER_JWT_TOKEN)
-        wallbox.jwtRefreshToken = entry.data.get(CHARGER_JWT_REFRESH_TOKEN)
-        wallbox.jwtTokenTtl = entry.data.get(CHARGER_JWT_TTL)
-        wallbox.jwtRefreshTokenTtl = entry.data.get(CHARGER_JWT_REFRESH_TTL)
-        wallbox.headers["Authorization"] = f"Bearer {entry.data.get(CHARGER_JWT_TOKEN)}"
-
-    wallbox_coordinator = Wallbox2Coordinator(hass, entry, wallbox)
-    await wallbox_coordinator.async_config_entry_first_refresh()
+    if CHARGER_JWT_TOKEN in entry.data:
+        api.set_tokens(
+            entry.data[CHARGER_JWT_TOKEN],
+            entry.data.get(CHARGER_JWT_REFRESH_TOKEN),
+            entry.data.get(CHARGER_JWT_TTL, 0),
+            entry.data.get(CHARGER_JWT_REFRESH_TTL, 0),
+        )
+
+    wallbox_coordinator = Wallbox2Coordinator(hass, entry, api)
+    await wallbox_coordinator.async_load_ledger()
+    scheduler = async_get_poll_scheduler(hass)
+    if await wallbox_coordinator.async_restore_snapshot():
+        # JWT tokens are restored from the entry data above, the first live refresh does not block the startup
+        # and is spread out by the scheduler together with those of the other entries
+        scheduler.async_add(wallbox_coordinator, 0)
+    else:
+        await scheduler.async_acquire_setup()
+        await wallbox_coordinator.async_config_entry_first_refresh()
+        scheduler.async_add(wallbox_coordinator)
 
     entry.runtime_data = wallbox_coordinator
 
+    if entry.options.get(CONF_OCPP_ENABLED, False):
+        await _async_setup_ocpp(hass, entry, wallbox_coordinator)
+    options = dict(entry.options)
+
+    async def _async_update_listener(hass: HomeAssistant, entry: Wallbox2ConfigEntry) -> None:
+        # the data changes with every token refresh, which must not drop the OCPP connection and the running backfill
+        if entry.options != options:
+            await hass.config_entries.async_reload(entry.entry_id)
+
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
+
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
     return True
 
 
+async def _async_setup_ocpp(hass: HomeAssistant, entry: Wallbox2ConfigEntry, coordinator: Wallbox2Coordinator) -> None:
+    """Let the charger push its live data over OCPP, writes still go through the cloud API."""
+    host = entry.options.get(CONF_OCPP_HOST) or None
+    port = entry.options.get(CONF_OCPP_PORT, DEFAULT_OCPP_PORT)
+    charge_point_id = entry.options.get(CONF_OCPP_CHARGE_POINT_ID) or entry.data[CONF_STATION]
+    if not (password := entry.options.get(CONF_OCPP_PASSWORD)):
+        # pushed values override the cloud data, never take them from anyone on the network
+        _LOGGER.error(f"No OCPP password configured for {charge_point_id}, staying with the cloud API only")
+        return
+    try:
+        await async_get_ocpp_server(hass, host, port).async_register(charge_point_id, coordinator, password)
+    except OSError as err:
+        _LOGGER.error(f"Cannot listen for OCPP on {host or '*'}:{port}, staying with the cloud API only: {err}")
+        return
+
+    async def _async_release() -> None:
+        await async_release_ocpp_server(hass, host, port, charge_point_id)
+
+    entry.async_on_unload(_async_release)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: Wallbox2ConfigEntry) -> bool:
     """Unload a config entry."""
     return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: Wallbox2ConfigEntry) -> None:
+    """Remove the persisted energy ledger, data snapshot and backfill checkpoint."""
+    await Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}").async_remove()
+    await Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.snapshot").async_remove()
+    await Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.backfill").async_remove()
@@ -0,0 +1,131 @@
+import json
+import logging
+from http import HTTPStatus
+from typing import Any
+
+from aiohttp import BasicAuth, ClientResponseError, ClientSession, ClientTimeout
+
+from homeassistant.components.wallbox.coordinator import check_token_validity
+
+from .metrics import Wallbox2Metrics
+
+_LOGGER = logging.getLogger(__name__)
+
+API_BASE_URL = "https://api.wall-box.com/"
+AUTH_BASE_URL = "https://user-api.wall-box.com/"
+REQUEST_TIMEOUT = ClientTimeout(total=30)
+
+
+class Wallbox2Api:
+    """Asynchronous counterpart of the wallbox library, running on a shared aiohttp session."""
+
+    def __init__(
+            self,
+            session: ClientSession,
+            username: str,
+            password: str,
+            base_url: str = API_BASE_URL,
+            auth_url: str = AUTH_BASE_URL,
+    ) -> None:
+        self._session = session
+        self._auth = BasicAuth(username, password)
+        self.base_url = base_url
+        self.auth_url = auth_url
+        self.jwt_token: str | None = None
+        self.jwt_refresh_token: str | None = None
+        self.jwt_token_ttl = 0
+        self.jwt_refresh_token_ttl = 0
+        self.headers = {"Accept": "application/json", "Content-Type": "application/json;charset=UTF-8"}
+        self.metrics = Wallbox2Metrics()
+
+    def set_tokens(self, token: str, refresh_token: str, token_ttl: int, refresh_token_ttl: int) -> None:
+        self.jwt_token = token
+        self.jwt_refresh_token = refresh_token
+        self.jwt_token_ttl = token_ttl
+        self.jwt_refresh_token_ttl = refresh_token_ttl
+        self.headers["Authorization"] = f"Bearer {token}"
+
+    def token_valid(self, drift: int) -> bool:
+        return self.jwt_token is not None and check_token_validity(jwt_token_ttl=self.jwt_token_ttl, jwt_token_drift=drift)
+
+    async def async_authenticate(self) -> None:
+        """Refresh the JWT token, signing in again once the refresh token expired too."""
+        headers = self.headers | {"Partner": "wallbox"}
+        if self.jwt_refresh_token is not None and check_token_validity(jwt_token_ttl=self.jwt_refresh_token_ttl, jwt_token_drift=0):
+            path = "users/refresh-token"
+            auth = None
+            headers["Authorization"] = f"Bearer {self.jwt_refresh_token}"
+        else:
+            path = "users/signin"
+            auth = self._auth
+            headers.pop("Authorization", None)
+        _LOGGER.debug(f"Authenticating with {path}")
+        async with self._session.get(
+                f"{self.auth_url}{path}", auth=auth, headers=headers, timeout=REQUEST_TIMEOUT, raise_for_status=True
+        ) as response:
+            attributes = (await response.json(content_type=None))["data"]["attributes"]
+        self.set_tokens(attributes["token"], attributes["refresh_token"], attributes["ttl"], attributes["refresh_token_ttl"])
+
+    async def _async_request(self, method: str, path: str, **kwargs: Any) -> Any:
+        try:
+            async with self._session.request(
+                    method, f"{self.base_url}{path}", headers=self.headers, timeout=REQUEST_TIMEOUT, raise_for_status=True, **kwargs
+            ) as response:
+                # decoded whole: session pages are bounded by SESSIONS_PAGE_SIZE, and the size feeds the metrics
+                body = await response.read()
+        except ClientResponseError as err:
+            if err.status == HTTPStatus.TOO_MANY_REQUESTS:
+                self.metrics.rate_limit_hits += 1
+            raise
+        self.metrics.record_response(len(body))
+        return json.loads(body)
+
+    async def async_get_charger_status(self, charger_id: str) -> dict[str, Any]:
+        return await self._async_request("GET", f"chargers/status/{charger_id}")
+
+    async def async_get_sessions_page(self, group_id: str, filters: str, limit: int, offset: int) -> dict[str, Any]:
+        return await self._async_request(
+            "GET",
+            f"v4/groups/{group_id}/charger-charging-sessions",
+            params={
+                "filters": filters,
+                "fields[charger_charging_session]": "",
+                "limit": limit,
+                "offset": offset,
+            },
+        )
+
+    async def async_set_max_charging_current(self, charger_id: str, current: float) -> dict[str, Any]:
+        return await self._async_request("PUT", f"v2/charger/{charger_id}", json={"maxChargingCurrent": current})
+
+    async def async_lock_charger(self, charger_id: str) -> dict[str, Any]:
+        return await self._async_request("PUT", f"v2/charger/{charger_id}", json={"locked": 1})
+
+    async def async_unlock_charger(self, charger_id: str) -> dict[str, Any]:
+        return await self._async_request("PUT", f"v2/charger/{charger_id}", json={"locked": 0})
+
+    async def async_pause_charging_session(self, charger_id: str) -> dict[str, Any]:
+        return await self._async_request("POST", f"v3/chargers/{charger_id}/remote-action", json={"action": 2})
+
+    async def async_resume_charging_session(self, charger_id: str) -> dict[str, Any]:
+        return await self._async_request("POST", f"v3/chargers/{charger_id}/remote-action", json={"action": 1})
+
+    async def async_set_energy_cost(self, charger_id: str, energy_cost: float) -> dict[str, Any]:
+        return await self._async_request("POST", f"chargers/config/{charger_id}", json={"energyCost": energy_cost})
+
+    async def async_set_icp_max_current(self, charger_id: str, current: float) -> dict[str, Any]:
+        return await self._async_request("POST", f"chargers/config/{charger_id}", json={"maxAvailableCurrent": current})
+
+    async def async_enable_eco_smart(self, charger_id: str, mode: int) -> dict[str, Any]:
+        return await self._async_request(
+            "PUT",
+            f"v4/chargers/{charger_id}/eco-smart",
+            json={"data": {"attributes": {"percentage": 100, "enabled": 1, "mode": mode}, "type": "eco_smart"}},
+        )
+
+    async def async_disable_eco_smart(self, charger_id: str) -> dict[str, Any]:
+        return await self._async_request(
+            "PUT",
+            f"v4/chargers/{charger_id}/eco-smart",
+            json={"data": {"attributes": {"percentage": 100, "enabled": 0, "mode": 0}, "type": "eco_smart"}},
+        )
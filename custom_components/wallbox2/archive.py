@@ -0,0 +1,185 @@
+import logging
+import sqlite3
+import threading
+from datetime import datetime, tzinfo
+from typing import Any
+
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import Event, HomeAssistant
+from homeassistant.util.dt import get_default_time_zone
+from homeassistant.util.hass_dict import HassKey
+
+from .const import ARCHIVE_FILE, DOMAIN, GroupBy
+from .sessions import ChargerSessions
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_ARCHIVE: HassKey["Wallbox2Archive"] = HassKey(f"{DOMAIN}_archive")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    charger_id INTEGER NOT NULL,
+    session_id TEXT NOT NULL,
+    start_time INTEGER NOT NULL,
+    end_time INTEGER NOT NULL,
+    energy REAL NOT NULL,
+    green_energy REAL NOT NULL,
+    grid_energy REAL NOT NULL,
+    cost REAL NOT NULL,
+    PRIMARY KEY (charger_id, session_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS sessions_charger_start ON sessions (charger_id, start_time);
+CREATE INDEX IF NOT EXISTS sessions_start ON sessions (start_time);
+"""
+
+UPSERT = """
+INSERT INTO sessions (charger_id, session_id, start_time, end_time, energy, green_energy, grid_energy, cost)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (charger_id, session_id) DO UPDATE SET
+    start_time = excluded.start_time,
+    end_time = excluded.end_time,
+    energy = excluded.energy,
+    green_energy = excluded.green_energy,
+    grid_energy = excluded.grid_energy,
+    cost = excluded.cost
+WHERE (start_time, end_time, energy, green_energy, grid_energy, cost)
+    IS NOT (excluded.start_time, excluded.end_time, excluded.energy, excluded.green_energy, excluded.grid_energy, excluded.cost)
+"""
+
+PERIOD_FORMATS = {
+    GroupBy.DAY: "%Y-%m-%d",
+    GroupBy.WEEK: "%G-W%V",
+    GroupBy.MONTH: "%Y-%m",
+}
+
+
+class Wallbox2Archive:
+    """Local SQLite archive of the sessions of all chargers, so that aggregates need no round trip to the cloud.
+
+    Sessions are only ever inserted or updated, never deleted. All methods block and run in the executor, a single
+    connection is shared between the executor threads behind a lock.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(self._path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def add(self, charger_id: int, sessions: ChargerSessions) -> int:
+        """Insert new sessions and update changed ones, returns the number of rows written."""
+        rows = zip(
+            [charger_id] * len(sessions.ids),
+            [str(session_id) for session_id in sessions.ids],
+            sessions.start,
+            sessions.end,
+            sessions.energy,
+            sessions.green_energy,
+            sessions.grid_energy,
+            sessions.cost,
+        )
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                before = connection.total_changes
+                connection.executemany(UPSERT, rows)
+                return connection.total_changes - before
+
+    def query(self, charger_ids: list[int] | None, start: int | None, end: int | None, group_by: GroupBy, time_zone: tzinfo) -> list[dict[str, Any]]:
+        """Count and sum up the sessions starting within [start, end), per local day, ISO week or month."""
+        conditions = []
+        params: list[Any] = []
+        if charger_ids is not None:
+            conditions.append(f"charger_id IN ({', '.join('?' * len(charger_ids))})")
+            params.extend(charger_ids)
+        if start is not None:
+            conditions.append("start_time >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append("start_time < ?")
+            params.append(end)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        period = "NULL" if group_by == GroupBy.NONE else "wallbox2_period(start_time)"
+
+        with self._lock:
+            connection = self._connect()
+            if group_by != GroupBy.NONE:
+                period_format = PERIOD_FORMATS[group_by]
+                connection.create_function(
+                    "wallbox2_period",
+                    1,
+                    lambda timestamp: datetime.fromtimestamp(timestamp, time_zone).strftime(period_format),
+                    deterministic=True,
+                )
+            cursor = connection.execute(
+                f"""
+                SELECT {period} AS period, COUNT(*), SUM(energy), SUM(green_energy), SUM(grid_energy), SUM(cost),
+                       SUM(end_time - start_time), MIN(start_time), MAX(start_time)
+                FROM sessions {where}
+                GROUP BY period ORDER BY period
+                """,
+                params,
+            )
+            rows = cursor.fetchall()
+        return [
+            {
+                "period": period,
+                "count": count,
+                "energy": energy or 0.0,
+                "green_energy": green_energy or 0.0,
+                "grid_energy": grid_energy or 0.0,
+                "cost": cost or 0.0,
+                "duration": duration or 0,
+                "first_start": first_start,
+                "last_start": last_start,
+            }
+            for period, count, energy, green_energy, grid_energy, cost, duration, first_start, last_start in rows
+            if count > 0
+        ]
+
+
+def async_get_archive(hass: HomeAssistant) -> Wallbox2Archive:
+    """Return the archive shared by all config entries, it is closed when Home Assistant stops."""
+    if (archive := hass.data.get(DATA_ARCHIVE)) is None:
+        archive = hass.data[DATA_ARCHIVE] = Wallbox2Archive(hass.config.path(ARCHIVE_FILE))
+
+        async def _async_close(_event: Event) -> None:
+            await hass.async_add_executor_job(archive.close)
+
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, _async_close)
+    return archive
+
+
+async def async_archive_sessions(hass: HomeAssistant, charger_id: int, sessions: ChargerSessions) -> None:
+    """Archive fetched sessions, failing to do so does not fail the fetch."""
+    if len(sessions.ids) == 0:
+        return
+    try:
+        written = await hass.async_add_executor_job(async_get_archive(hass).add, charger_id, sessions)
+    except sqlite3.Error as err:
+        _LOGGER.warning(f"Failed to archive sessions of charger {charger_id}: {err}")
+        return
+    if written > 0:
+        _LOGGER.debug(f"Archived {written} new or changed sessions of charger {charger_id}")
+
+
+async def async_query_archive(
+        hass: HomeAssistant, charger_ids: list[int] | None, start: int | None, end: int | None, group_by: GroupBy
+) -> list[dict[str, Any]]:
+    return await hass.async_add_executor_job(
+        async_get_archive(hass).query, charger_ids, start, end, group_by, get_default_time_zone()
+    )
@@ -0,0 +1,210 @@
+import asyncio
+import logging
+from collections import deque
+from collections.abc import Iterator
+from dataclasses import asdict, dataclass, field
+from datetime import UTC, datetime
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from homeassistant.components.recorder import get_instance
+from aiohttp import ClientError
+
+from homeassistant.components.recorder.models import StatisticData
+from homeassistant.components.recorder.statistics import async_import_statistics, statistic_during_period
+from homeassistant.components.wallbox.const import CHARGER_DATA_KEY
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from homeassistant.helpers.storage import Store
+from homeassistant.util.dt import utc_from_timestamp
+
+from .archive import async_archive_sessions
+from .const import BACKFILL_BATCH_SIZE, BACKFILL_CONCURRENCY, CHARGER_GROUP_ID, CONF_STATION, DOMAIN, STORAGE_VERSION
+from .energy import HOUR, hourly_energy
+from .ledger import energy_statistic_metadata
+from .sessions import ChargerSessions, async_fetch_sessions
+
+if TYPE_CHECKING:
+    from .coordinator import Wallbox2Coordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class BackfillCheckpoint:
+    """Progress of a backfill, persisted after every imported month so that an interrupted backfill can resume.
+
+    base_sum is the recorded sum before start and existing the change already recorded within the range, both
+    read before anything was written. sum is the sum of the hours imported so far, carry the energy of fetched
+    sessions falling into hours after the last imported month.
+    """
+
+    entity_id: str
+    start: int
+    end: int
+    base_sum: float
+    existing: float
+    next: int
+    sum: float
+    carry: dict[int, float] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "BackfillCheckpoint":
+        return cls(**(data | {"carry": {int(hour): energy for hour, energy in data["carry"].items()}}))
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def month_windows(start: int, end: int) -> Iterator[tuple[int, int]]:
+    """Split [start, end) at UTC month boundaries."""
+    while start < end:
+        month = datetime.fromtimestamp(start, UTC)
+        next_month = datetime(month.year + month.month // 12, month.month % 12 + 1, 1, tzinfo=UTC)
+        window_end = min(int(next_month.timestamp()), end)
+        yield start, window_end
+        start = window_end
+
+
+def _window_energy(sessions: ChargerSessions, carry: dict[int, float], window_start: int, window_end: int, end: int) -> tuple[np.ndarray, dict[int, float]]:
+    """Energy of every hour of the window, together with the energy left for later hours.
+
+    Sessions of the last window running past the end of the range are counted in its last hour, as the hours
+    after it belong to the ledger.
+    """
+    hours, energy = hourly_energy(sessions.start, sessions.end, sessions.energy)
+    carry_hours = np.fromiter(carry.keys(), dtype=np.int64, count=len(carry))
+    hours = np.concatenate((hours, carry_hours))
+    energy = np.concatenate((energy, np.fromiter(carry.values(), dtype=np.float64, count=len(carry))))
+    if window_end == end:
+        hours = np.minimum(hours, end - HOUR)
+    window = np.zeros((window_end - window_start) // HOUR)
+    inside = hours < window_end
+    np.add.at(window, (hours[inside] - window_start) // HOUR, energy[inside])
+    later: dict[int, float] = {}
+    for hour, e in zip(hours[~inside].tolist(), energy[~inside].tolist()):
+        later[hour] = later.get(hour, 0) + e
+    return window, later
+
+
+class Wallbox2Backfill:
+    """Imports the energy statistics of a past date range, a month at a time, next to the regular polling.
+
+    Months are fetched ahead with bounded concurrency but imported strictly in order, each one in batches of
+    fixed size, waiting for the recorder between them. Once the range is imported, the sums of the statistics
+    following it are shifted by the energy added and the ledger is rebased accordingly.
+    """
+
+    def __init__(self, hass: HomeAssistant, coordinator: "Wallbox2Coordinator", entry_id: str) -> None:
+        self._hass = hass
+        self._coordinator = coordinator
+        self._store: Store[dict[str, Any]] = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.backfill")
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def async_start(self, start: int, end: int) -> None:
+        if self.running:
+            raise ServiceValidationError(translation_domain=DOMAIN, translation_key="backfill_running")
+        entity_id = self._coordinator.energy_entity_id
+        ledger = self._coordinator.ledger
+        if entity_id is None or ledger is None:
+            raise ServiceValidationError(translation_domain=DOMAIN, translation_key="backfill_not_ready")
+        # the ledger owns the hours from its start on
+        end = min(end, ledger.start) // HOUR * HOUR
+        start = start // HOUR * HOUR
+        if start >= end:
+            raise ServiceValidationError(translation_domain=DOMAIN, translation_key="backfill_empty_range")
+        self._task = self._coordinator.config_entry.async_create_background_task(
+            self._hass, self._async_run(entity_id, start, end), f"{DOMAIN}_backfill"
+        )
+
+    async def async_shutdown(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _async_run(self, entity_id: str, start: int, end: int) -> None:
+        checkpoint = await self._async_load_checkpoint(entity_id, start, end)
+        windows = month_windows(checkpoint.next, end)
+        pending: deque[tuple[int, int, asyncio.Task[ChargerSessions]]] = deque()
+
+        def fetch_ahead() -> None:
+            while len(pending) < BACKFILL_CONCURRENCY and (window := next(windows, None)) is not None:
+                pending.append((*window, self._hass.async_create_task(self._async_fetch(*window))))
+
+        fetch_ahead()
+        try:
+            while pending:
+                window_start, window_end, task = pending.popleft()
+                sessions = await task
+                fetch_ahead()
+                await self._async_import(checkpoint, sessions, window_start, window_end)
+                checkpoint.next = window_end
+                await self._store.async_save(checkpoint.as_dict())
+                _LOGGER.info(
+                    f"Backfilled {len(sessions.ids)} sessions until {utc_from_timestamp(window_end)}, "
+                    f"{100 * (window_end - start) // (end - start)}% of {utc_from_timestamp(start)} - {utc_from_timestamp(end)}"
+                )
+        except (ClientError, TimeoutError, HomeAssistantError) as err:
+            _LOGGER.error(f"Backfill stopped at {utc_from_timestamp(checkpoint.next)}, calling the service again resumes it: {err}")
+            return
+        finally:
+            for _, _, task in pending:
+                task.cancel()
+
+        delta = checkpoint.sum - checkpoint.base_sum - checkpoint.existing
+        await self._coordinator.async_rebase_ledger(end, delta)
+        await self._store.async_remove()
+        _LOGGER.info(f"Backfill of {utc_from_timestamp(start)} - {utc_from_timestamp(end)} done, added {delta} Wh")
+
+    async def _async_load_checkpoint(self, entity_id: str, start: int, end: int) -> BackfillCheckpoint:
+        if (data := await self._store.async_load()) is not None:
+            checkpoint = BackfillCheckpoint.from_dict(data)
+            if (checkpoint.entity_id, checkpoint.start, checkpoint.end) == (entity_id, start, end):
+                _LOGGER.info(f"Resuming backfill from {utc_from_timestamp(checkpoint.next)}")
+                return checkpoint
+            _LOGGER.warning(f"Dropping checkpoint of unfinished backfill {utc_from_timestamp(checkpoint.start)} - {utc_from_timestamp(checkpoint.end)}")
+        base_sum, existing = await get_instance(self._hass).async_add_executor_job(self._recorded_sums, entity_id, start, end)
+        checkpoint = BackfillCheckpoint(entity_id, start, end, base_sum, existing, start, base_sum)
+        await self._store.async_save(checkpoint.as_dict())
+        return checkpoint
+
+    def _recorded_sums(self, entity_id: str, start: int, end: int) -> tuple[float, float]:
+        """Sum recorded before start and the change recorded within the range, so that the backfill is repeatable."""
+        before = statistic_during_period(self._hass, None, utc_from_timestamp(start), entity_id, {"change"}, None)
+        within = statistic_during_period(self._hass, utc_from_timestamp(start), utc_from_timestamp(end), entity_id, {"change"}, None)
+        return before.get("change") or 0.0, within.get("change") or 0.0
+
+    async def _async_fetch(self, window_start: int, window_end: int) -> ChargerSessions:
+        await self._coordinator._async_authenticate()
+        charger_id = int(self._coordinator.config_entry.data[CONF_STATION])
+        group_id = self._coordinator.data[CHARGER_DATA_KEY][CHARGER_GROUP_ID]
+        sessions = (await async_fetch_sessions(self._coordinator.api, group_id, [charger_id], window_start, window_end))[charger_id]
+        await async_archive_sessions(self._hass, charger_id, sessions)
+        return sessions
+
+    async def _async_import(self, checkpoint: BackfillCheckpoint, sessions: ChargerSessions, window_start: int, window_end: int) -> None:
+        window, checkpoint.carry = await self._hass.async_add_executor_job(
+            _window_energy, sessions, checkpoint.carry, window_start, window_end, checkpoint.end
+        )
+        # every hour is written, also the empty ones, so that a repeated backfill overwrites all earlier rows
+        sums = checkpoint.sum + np.cumsum(window)
+        meta = energy_statistic_metadata(checkpoint.entity_id)
+        for batch_start in range(0, len(window), BACKFILL_BATCH_SIZE):
+            stats = [
+                StatisticData(start=utc_from_timestamp(window_start + i * HOUR), state=float(window[i]), sum=float(sums[i]))
+                for i in range(batch_start, min(batch_start + BACKFILL_BATCH_SIZE, len(window)))
+            ]
+            async_import_statistics(self._hass, meta, stats)
+            self._coordinator.metrics.rows_written += len(stats)
+            await get_instance(self._hass).async_block_till_done()
+        if len(window) > 0:
+            checkpoint.sum = float(sums[-1])
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.event import async_call_later
+
+from .const import COMMAND_DEBOUNCE
+
+if TYPE_CHECKING:
+    from .coordinator import Wallbox2Coordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class PendingCommand:
+    value: Any
+    original: Any
+    send: Callable[[Any], Awaitable[None]]
+    futures: list[asyncio.Future[None]] = field(default_factory=list)
+
+
+class Wallbox2CommandQueue:
+    """Coalesces setpoint writes of one charger arriving within a short window.
+
+    Writes are keyed by the coordinator data key they change: only the last value per key is sent, and not at all
+    when several writes within the window ended up back at the previous value. Entities see the new value right away, a single poll
+    confirms all writes at the end.
+    """
+
+    def __init__(self, hass: HomeAssistant, coordinator: "Wallbox2Coordinator") -> None:
+        self._hass = hass
+        self._coordinator = coordinator
+        self._pending: dict[str, PendingCommand] = {}
+        self._unsub_flush: CALLBACK_TYPE | None = None
+
+    async def async_enqueue(self, key: str, value: Any, send: Callable[[Any], Awaitable[None]]) -> None:
+        """Queue a write and wait until it was sent."""
+        data = self._coordinator.data
+        if (command := self._pending.get(key)) is None:
+            command = self._pending[key] = PendingCommand(value, data.get(key), send)
+        command.value = value
+        command.send = send
+        future: asyncio.Future[None] = self._hass.loop.create_future()
+        command.futures.append(future)
+
+        self._coordinator.async_push_data({key: value})
+        if self._unsub_flush is None:
+            self._unsub_flush = async_call_later(self._hass, COMMAND_DEBOUNCE, self._async_flush)
+        await future
+
+    async def _async_flush(self, _now: datetime) -> None:
+        self._unsub_flush = None
+        pending, self._pending = self._pending, {}
+        try:
+            for key, command in pending.items():
+                try:
+                    if len(command.futures) > 1 and command.value == command.original:
+                        _LOGGER.debug(f"Skipping {key}, it is back at {command.original}")
+                    else:
+                        await command.send(command.value)
+                except Exception as err:
+                    # any failure, also an unexpected response, belongs to this command only, the others are still sent
+                    if not isinstance(err, HomeAssistantError):
+                        _LOGGER.exception(f"Sending {key} failed")
+                    # the charger never took the value shown since the enqueue
+                    self._coordinator.async_push_data({key: command.original})
+                    for future in command.futures:
+                        if not future.done():
+                            future.set_exception(err)
+                else:
+                    for future in command.futures:
+                        if not future.done():
+                            future.set_result(None)
+            _LOGGER.debug(f"Sent {len(pending)} coalesced writes")
+        finally:
+            self._coordinator.async_request_poll()
+
+    @property
+    def pending(self) -> bool:
+        return len(self._pending) > 0
+
+    def async_shutdown(self) -> None:
+        if self._unsub_flush is not None:
+            self._unsub_flush()
+            self._unsub_flush = None
+        for command in self._pending.values():
+            for future in command.futures:
+                future.cancel()
+        self._pending = {}
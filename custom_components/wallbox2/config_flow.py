@@ -1,12 +1,57 @@
-from homeassistant.config_entries import ConfigFlow
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.config_entries import ConfigEntry, ConfigFlow, ConfigFlowResult, OptionsFlow
+from homeassistant.core import callback
+from homeassistant.helpers.selector import TextSelector, TextSelectorConfig, TextSelectorType
 
 from homeassistant.components.wallbox.config_flow import STEP_USER_DATA_SCHEMA as ORIG_STEP_USER_DATA_SCHEMA, WallboxConfigFlow
-from .const import DOMAIN
+from .const import (
+    CONF_OCPP_CHARGE_POINT_ID,
+    CONF_OCPP_ENABLED,
+    CONF_OCPP_HOST,
+    CONF_OCPP_PASSWORD,
+    CONF_OCPP_PORT,
+    DEFAULT_OCPP_PORT,
+    DOMAIN,
+)
 
 COMPONENT_DOMAIN = DOMAIN
 
 STEP_USER_DATA_SCHEMA = ORIG_STEP_USER_DATA_SCHEMA
 
+OPTIONS_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_OCPP_ENABLED, default=False): bool,
+        vol.Required(CONF_OCPP_PORT, default=DEFAULT_OCPP_PORT): vol.All(vol.Coerce(int), vol.Range(min=1, max=65535)),
+        vol.Optional(CONF_OCPP_CHARGE_POINT_ID): str,
+        vol.Optional(CONF_OCPP_PASSWORD): TextSelector(TextSelectorConfig(type=TextSelectorType.PASSWORD)),
+        vol.Optional(CONF_OCPP_HOST): str,
+    }
+)
+
 
 class Wallbox2ConfigFlow(WallboxConfigFlow, ConfigFlow, domain=COMPONENT_DOMAIN):
-    pass
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: ConfigEntry) -> OptionsFlow:
+        return Wallbox2OptionsFlow()
+
+
+class Wallbox2OptionsFlow(OptionsFlow):
+    """Local OCPP push mode, the charger has to be pointed at ws://<home assistant>:<port>/<charge point id>."""
+
+    async def async_step_init(self, user_input: dict[str, Any] | None = None) -> ConfigFlowResult:
+        errors: dict[str, str] = {}
+        if user_input is not None:
+            if user_input[CONF_OCPP_ENABLED] and not user_input.get(CONF_OCPP_PASSWORD):
+                errors[CONF_OCPP_PASSWORD] = "password_required"
+            else:
+                return self.async_create_entry(data=user_input)
+        return self.async_show_form(
+            step_id="init",
+            data_schema=self.add_suggested_values_to_schema(OPTIONS_SCHEMA, user_input or self.config_entry.options),
+            errors=errors,
+        )
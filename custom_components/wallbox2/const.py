@@ -2,15 +2,79 @@ from enum import StrEnum
 
 DOMAIN = "wallbox2"
 UPDATE_INTERVAL = 120
+UPDATE_INTERVAL_CHARGING = 30
+UPDATE_INTERVAL_MAX = 3600
+WRITE_FAST_POLL_DURATION = 300
+COMMAND_DEBOUNCE = 1.5
+# polls per second shared by all config entries
+POLL_RATE_MAX = 0.2
+POLL_RATE_MIN = 1 / 120
+POLL_RATE_STEP = 0.005
+POLL_BURST = 2
+# seconds between the first refreshes of entries set up together once the burst is used up
+POLL_SETUP_SPREAD = 0.5
+
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 10
+SNAPSHOT_SAVE_DELAY = 60
 
 CONF_STATION = "station"
+CONF_API_URL = "api_url"
+CONF_AUTH_URL = "auth_url"
+CONF_OCPP_ENABLED = "ocpp_enabled"
+CONF_OCPP_PORT = "ocpp_port"
+CONF_OCPP_CHARGE_POINT_ID = "ocpp_charge_point_id"
+CONF_OCPP_HOST = "ocpp_host"
+CONF_OCPP_PASSWORD = "ocpp_password"
+DEFAULT_OCPP_PORT = 9000
+OCPP_HEARTBEAT_INTERVAL = 300
+# the cloud is still polled for settings and sessions, which OCPP does not push
+OCPP_UPDATE_INTERVAL = 900
 
 SESSIONS_DATA = "data"
+SESSIONS_PAGE_SIZE = 1000
 SESSION_ATTRIBUTES = "attributes"
 SESSION_ENERGY = "energy"
+# coordinator data key of the ledger the session energy rows were computed with
+SESSION_ENERGY_LEDGER = "energy_ledger"
+SESSION_GREEN_ENERGY = "green_energy"
+SESSION_GRID_ENERGY = "grid_energy"
+SESSION_COST = "cost"
 SESSION_TIME = "start_time"
+SESSION_END_TIME = "end_time"
+SESSION_CHARGER_ID = "charger_id"
+SESSION_ID = "id"
 CHARGER_GROUP_ID = "group_id"
 
+FIRST_SESSION_TIME = 1704063600
+SESSION_LOOKBACK = 86400
+
+SERVICE_BACKFILL_SESSIONS = "backfill_sessions"
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_START_DATE = "start_date"
+ATTR_END_DATE = "end_date"
+BACKFILL_CONCURRENCY = 3
+BACKFILL_BATCH_SIZE = 500
+
+SERVICE_QUERY_SESSIONS = "query_sessions"
+ATTR_GROUP_BY = "group_by"
+ARCHIVE_FILE = "wallbox2_sessions.db"
+
+
+class GroupBy(StrEnum):
+    """Periods the session archive is aggregated by."""
+
+    NONE = "none"
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+LEDGER_ENTITY_ID = "entity_id"
+LEDGER_START = "start"
+LEDGER_BASE_SUM = "base_sum"
+LEDGER_HOURS = "hours"
+LEDGER_SESSIONS = "sessions"
+
 CHARGER_DATA_POST_L1_KEY = "data"
 CHARGER_DATA_POST_L2_KEY = "chargerData"
 
@@ -1,131 +1,488 @@
 from homeassistant.helpers import issue_registry as ir
+import asyncio
+from collections.abc import Awaitable, Callable
+from http import HTTPStatus
 from typing import Any
-import requests
-import json
 import logging
 from datetime import timedelta, datetime
+from time import monotonic
 
-from homeassistant.components.wallbox.coordinator import WallboxCoordinator, _require_authentication
+from aiohttp import ClientError, ClientResponseError
+
+from homeassistant.components.wallbox.coordinator import WallboxCoordinator, CHARGER_STATUS
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
-from homeassistant.components.wallbox.const import CHARGER_DATA_KEY, CHARGER_NAME_KEY
-from homeassistant.exceptions import HomeAssistantError
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.components.wallbox.const import (
+    CHARGER_CURRENCY_KEY,
+    CHARGER_DATA_KEY,
+    CHARGER_ENERGY_PRICE_KEY,
+    CHARGER_FEATURES_KEY,
+    CHARGER_LOCKED_UNLOCKED_KEY,
+    CHARGER_MAX_CHARGING_CURRENT_KEY,
+    CHARGER_MAX_ICP_CURRENT_KEY,
+    CHARGER_NAME_KEY,
+    CHARGER_PLAN_KEY,
+    CHARGER_POWER_BOOST_KEY,
+    CHARGER_STATUS_DESCRIPTION_KEY,
+    CHARGER_STATUS_ID_KEY,
+    CODE_KEY,
+    ChargerStatus,
+)
+from homeassistant.exceptions import ConfigEntryAuthFailed, HomeAssistantError
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.translation import async_get_cached_translations
+from homeassistant.helpers.update_coordinator import UpdateFailed
 from homeassistant.util.dt import utcnow, utc_from_timestamp
 from homeassistant.components.recorder import get_instance
-from homeassistant.components.recorder.statistics import get_last_statistics
-
-from wallbox import Wallbox
+from homeassistant.components.recorder.statistics import async_adjust_statistics, get_last_statistics
+from homeassistant.const import UnitOfEnergy
 
-from .const import SESSIONS_DATA, SESSION_ENERGY, CHARGER_GROUP_ID, DOMAIN, UPDATE_INTERVAL, CONF_STATION
+from .api import Wallbox2Api
+from .archive import async_archive_sessions
+from .backfill import Wallbox2Backfill
+from .commands import Wallbox2CommandQueue
+from .ledger import ENERGY_EPSILON, EnergyLedger, session_contributions
+from .scheduler import async_get_poll_scheduler
+from .metrics import PHASE_AUTHENTICATE, PHASE_LAST_STATISTICS, PHASE_POLL, PHASE_SESSIONS, PHASE_STATUS
+from .sessions import Wallbox2SessionFetcher, async_get_session_fetcher, async_release_session_fetcher
+from .const import (
+    SESSION_ENERGY,
+    SESSION_ENERGY_LEDGER,
+    CHARGER_GROUP_ID,
+    CHARGER_DATA_POST_L1_KEY,
+    CHARGER_DATA_POST_L2_KEY,
+    CHARGER_ECO_SMART_KEY,
+    CHARGER_ECO_SMART_MODE_KEY,
+    CHARGER_ECO_SMART_STATUS_KEY,
+    CHARGER_JWT_REFRESH_TOKEN,
+    CHARGER_JWT_REFRESH_TTL,
+    CHARGER_JWT_TOKEN,
+    CHARGER_JWT_TTL,
+    CHARGER_MAX_CHARGING_CURRENT_POST_KEY,
+    CHARGER_MAX_ICP_CURRENT_POST_KEY,
+    DOMAIN,
+    UPDATE_INTERVAL,
+    UPDATE_INTERVAL_CHARGING,
+    UPDATE_INTERVAL_MAX,
+    WRITE_FAST_POLL_DURATION,
+    CONF_STATION,
+    STORAGE_VERSION,
+    STORAGE_SAVE_DELAY,
+    SNAPSHOT_SAVE_DELAY,
+    SESSION_LOOKBACK,
+    SERVICE_BACKFILL_SESSIONS,
+    OCPP_UPDATE_INTERVAL,
+    EcoSmartMode,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
+CHARGING_STATUSES = {ChargerStatus.CHARGING, ChargerStatus.DISCHARGING}
+CONNECTED_STATUSES = {
+    ChargerStatus.PAUSED,
+    ChargerStatus.SCHEDULED,
+    ChargerStatus.WAITING_FOR_CAR,
+    ChargerStatus.WAITING,
+    ChargerStatus.LOCKED_CAR_CONNECTED,
+}
+
 type Wallbox2ConfigEntry = ConfigEntry[Wallbox2Coordinator]
 
 class Wallbox2Coordinator(WallboxCoordinator):
 
-    def __init__(self, hass: HomeAssistant, config_entry: ConfigEntry, wallbox: Wallbox) -> None:
+    def __init__(self, hass: HomeAssistant, config_entry: ConfigEntry, api: Wallbox2Api) -> None:
         self._hass = hass
         # self._station = station
         self._station = config_entry.data[CONF_STATION]
-        self._wallbox = wallbox
+        self._api = api
+        self.metrics = api.metrics
+        self._store: Store[dict[str, Any]] = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{config_entry.entry_id}")
+        self._snapshot_store: Store[dict[str, Any]] = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{config_entry.entry_id}.snapshot")
+        self._ledger: EnergyLedger | None = None
+        self._ledger_verified = False
+        self._energy_entity_id: str | None = None
+        self._session_fetcher: Wallbox2SessionFetcher | None = None
+        self._idle_polls = 0
+        self._error_polls = 0
+        self._last_write = -WRITE_FAST_POLL_DURATION
+        self._commands = Wallbox2CommandQueue(hass, self)
+        self._poll_lock = asyncio.Lock()
+        # polls are triggered by the domain wide scheduler, the coordinator only tells how often it wants them
+        self.desired_interval = timedelta(seconds=UPDATE_INTERVAL)
+        self._ocpp_connected = False
+        self._ocpp_data: dict[str, Any] = {}
+        self.backfill = Wallbox2Backfill(hass, self, config_entry.entry_id)
 
         super(WallboxCoordinator, self).__init__(
             hass,
             _LOGGER,
             config_entry=config_entry,
             name=DOMAIN,
-            update_interval=timedelta(seconds=UPDATE_INTERVAL),
+            update_interval=None,
         )
 
-    @_require_authentication
-    async def _async_update_data(self) -> dict[str, Any]:
-        self.update_interval = timedelta(
-            seconds=UPDATE_INTERVAL
-                    * max(len(self.hass.config_entries.async_loaded_entries(DOMAIN)), 1)
+    async def async_load_ledger(self) -> None:
+        """Load the persisted energy ledger, it is verified against the recorder on the first poll."""
+        if (data := await self._store.async_load()) is not None:
+            self._ledger = EnergyLedger.from_dict(data)
+        self._ledger_verified = False
+
+    async def async_restore_snapshot(self) -> bool:
+        """Start from the last good data, so that entities come up without waiting for the cloud."""
+        if (snapshot := await self._snapshot_store.async_load()) is None:
+            return False
+        _LOGGER.info("Restored data snapshot, refreshing in the background")
+        self.data = snapshot
+        return True
+
+    @property
+    def ledger(self) -> EnergyLedger | None:
+        return self._ledger
+
+    @property
+    def energy_entity_id(self) -> str | None:
+        return self._energy_entity_id
+
+    @property
+    def api(self) -> Wallbox2Api:
+        return self._api
+
+    @property
+    def prioritised(self) -> bool:
+        """Whether fresh data matters most, the charger is charging or was just written to."""
+        return (
+                self._commands.pending
+                or monotonic() - self._last_write < WRITE_FAST_POLL_DURATION
+                or (
+                        not self._ocpp_connected
+                        and self.data is not None
+                        and self.data.get(CHARGER_STATUS_DESCRIPTION_KEY) in CHARGING_STATUSES
+                )
         )
 
-        if self.data is not None and CHARGER_NAME_KEY in self.data:
-            translations = async_get_cached_translations(self._hass, self._hass.config.language, "entity_component")
-            energy_name = translations[f"component.sensor.entity_component.{SESSION_ENERGY}.name"]
-            energy_entity_id = f"sensor.{DOMAIN}_{self.data[CHARGER_NAME_KEY]}_{energy_name}_4".lower().replace(' ', '_')
+    @callback
+    def async_push_data(self, update: dict[str, Any]) -> None:
+        """Update entities from data that did not come with a poll, without importing statistics again."""
+        if self.data is None:
+            return
+        data = {key: value for key, value in self.data.items() if key != SESSION_ENERGY_LEDGER}
+        self.async_set_updated_data(data | update | {SESSION_ENERGY: []})
+
+    @callback
+    def async_push_ocpp(self, update: dict[str, Any]) -> None:
+        """Take values pushed by the charger over OCPP, they win over the cloud data until it disconnects."""
+        self._ocpp_data.update(update)
+        self.async_push_data(update)
+
+    @callback
+    def async_set_ocpp_connected(self, connected: bool) -> None:
+        self._ocpp_connected = connected
+        if not connected:
+            self._ocpp_data = {}
+            # fall back to the cloud for live data right away
+            self.async_request_poll()
 
+    @callback
+    def async_request_poll(self) -> None:
+        """Poll ahead of the schedule, e.g. to confirm a write."""
+        async_get_poll_scheduler(self.hass).async_request(self)
+
+    @staticmethod
+    def _snapshot(data: dict[str, Any]) -> dict[str, Any]:
+        snapshot = {key: value for key, value in data.items() if key not in (SESSION_ENERGY, SESSION_ENERGY_LEDGER)}
+        snapshot[SESSION_ENERGY] = []
+        return snapshot
+
+    @callback
+    def async_commit_ledger(self, ledger: EnergyLedger) -> None:
+        """Keep the ledger once its rows were handed over to the recorder."""
+        if ledger != self._ledger:
+            self._ledger = ledger
+            self._store.async_delay_save(self._ledger.as_dict, STORAGE_SAVE_DELAY)
+
+    async def async_rebase_ledger(self, start: int, delta: float) -> None:
+        """Shift the sums of all statistics from start on by delta, after energy was imported before them."""
+        async with self._poll_lock:
+            if self._ledger is None or self._energy_entity_id is None:
+                return
+            if abs(delta) > ENERGY_EPSILON:
+                async_adjust_statistics(self._hass, self._energy_entity_id, utc_from_timestamp(start), delta, UnitOfEnergy.WATT_HOUR)
+            self._ledger.base_sum += delta
+            self._store.async_delay_save(self._ledger.as_dict, STORAGE_SAVE_DELAY)
+
+    async def _async_verify_ledger(self) -> None:
+        with self.metrics.timed(PHASE_LAST_STATISTICS):
             last_energy_stats = await get_instance(self._hass).async_add_executor_job(
                 get_last_statistics,
                 self._hass,
                 1,
-                energy_entity_id,
+                self._energy_entity_id,
                 False,
                 {"sum"},
             )
-            if len(last_energy_stats) == 0:
-                last_energy_stats_date = None
-                last_energy_stats_sum = None
-                _LOGGER.warning(f"Energy stats not available, starting from zero")
-            else:
-                les = last_energy_stats[energy_entity_id][0]
-                last_energy_stats_date = utc_from_timestamp(les['end'])
-                last_energy_stats_sum = les['sum']
-                _LOGGER.info(f'Last energy stats: {les}')
+        if len(last_energy_stats) == 0:
+            _LOGGER.warning(f"Energy stats not available, dropping ledger and starting from zero")
+            self._ledger = None
+        else:
+            les = last_energy_stats[self._energy_entity_id][0]
+            _LOGGER.info(f'Last energy stats: {les}')
+            ledger = self._ledger
+            if (
+                    ledger is None
+                    or ledger.entity_id != self._energy_entity_id
+                    or abs(ledger.total - les['sum']) > ENERGY_EPSILON
+            ):
+                _LOGGER.warning(f"Ledger drifted from recorder, continuing from {les['sum']} @ {utc_from_timestamp(les['end'])}")
+                self._ledger = EnergyLedger(self._energy_entity_id, int(les['end']), les['sum'])
+                self._store.async_delay_save(self._ledger.as_dict, STORAGE_SAVE_DELAY)
+        self._ledger_verified = True
+
+    async def _async_authenticate(self) -> None:
+        if self._api.token_valid(UPDATE_INTERVAL):
+            return
+        try:
+            with self.metrics.timed(PHASE_AUTHENTICATE):
+                await self._api.async_authenticate()
+        except ClientResponseError as wallbox_connection_error:
+            if wallbox_connection_error.status == HTTPStatus.FORBIDDEN:
+                raise ConfigEntryAuthFailed(
+                    translation_domain=DOMAIN, translation_key="invalid_auth"
+                ) from wallbox_connection_error
+            raise UpdateFailed(
+                translation_domain=DOMAIN, translation_key="api_failed"
+            ) from wallbox_connection_error
+        except (ClientError, TimeoutError) as wallbox_connection_error:
+            raise UpdateFailed(
+                translation_domain=DOMAIN, translation_key="api_failed"
+            ) from wallbox_connection_error
+        data = dict(self.config_entry.data)
+        data[CHARGER_JWT_TOKEN] = self._api.jwt_token
+        data[CHARGER_JWT_REFRESH_TOKEN] = self._api.jwt_refresh_token
+        data[CHARGER_JWT_TTL] = self._api.jwt_token_ttl
+        data[CHARGER_JWT_REFRESH_TTL] = self._api.jwt_refresh_token_ttl
+        self.hass.config_entries.async_update_entry(self.config_entry, data=data)
+
+    async def async_shutdown(self) -> None:
+        await super().async_shutdown()
+        self._commands.async_shutdown()
+        await self.backfill.async_shutdown()
+        async_get_poll_scheduler(self.hass).async_remove(self)
+        if self._session_fetcher is not None and self.data is not None:
+            async_release_session_fetcher(self.hass, self.data[CHARGER_DATA_KEY][CHARGER_GROUP_ID], int(self._station))
+            self._session_fetcher = None
+
+    async def _async_update_data(self) -> dict[str, Any]:
+        # the ledger is rebased by the backfill only in between polls, never under rows still to be imported
+        async with self._poll_lock:
+            with self.metrics.timed(PHASE_POLL):
+                return await self._async_poll()
+
+    async def _async_poll(self) -> dict[str, Any]:
+        if self.data is not None and CHARGER_NAME_KEY in self.data:
+            if self._energy_entity_id is None:
+                translations = async_get_cached_translations(self._hass, self._hass.config.language, "entity_component")
+                energy_name = translations[f"component.sensor.entity_component.{SESSION_ENERGY}.name"]
+                self._energy_entity_id = f"sensor.{DOMAIN}_{self.data[CHARGER_NAME_KEY]}_{energy_name}_4".lower().replace(' ', '_')
+            if not self._ledger_verified:
+                await self._async_verify_ledger()
         else:
-            energy_entity_id = None
-            last_energy_stats_date = None
-            last_energy_stats_sum = None
             _LOGGER.info("Skipping, as data not ready yet")
-        return await self.hass.async_add_executor_job(self._get_data, energy_entity_id, last_energy_stats_date, last_energy_stats_sum)
 
-    def _get_energy_sessions(self, group_id: str, start_time: int) -> list[dict[str, Any]]:
-        last_hour_end = utcnow().replace(minute=0, second=0, microsecond=0)
-        end_time = int(last_hour_end.timestamp())
+        await self._async_authenticate()
         try:
-            response = requests.get(
-                f"{self._wallbox.baseUrl}v4/groups/{group_id}/charger-charging-sessions",
-                params={
-                    "filters": json.dumps({
-                        "filters":[
-                            {"field": "start_time", "operator": "gte", "value": start_time},
-                            {"field": "start_time", "operator": "lt", "value": end_time},
-                            {"field": "charger_id", "operator": "eq", "value": int(self._station)}          ,
-                        ]
-                    }),
-                    "fields[charger_charging_session]": "",
-                    "limit": 10000,
-                    "offset": 0,
-                },
-                headers=self._wallbox.headers,
-                timeout=self._wallbox._requestGetTimeout,
-            )
-            response.raise_for_status()
-        except requests.exceptions.HTTPError as err:
-            raise err
+            data = await self._async_get_data()
+        except ClientResponseError as wallbox_connection_error:
+            if (
+                    wallbox_connection_error.status == HTTPStatus.TOO_MANY_REQUESTS
+                    or wallbox_connection_error.status >= HTTPStatus.INTERNAL_SERVER_ERROR
+            ):
+                self._error_polls += 1
+                self.metrics.retries += 1
+                self.desired_interval = self._backoff_interval(self._error_polls)
+                _LOGGER.warning(f"API returned {wallbox_connection_error.status}, backing off to {self.desired_interval}")
+            if wallbox_connection_error.status == HTTPStatus.TOO_MANY_REQUESTS:
+                async_get_poll_scheduler(self.hass).async_throttle()
+            if wallbox_connection_error.status == HTTPStatus.FORBIDDEN:
+                raise ConfigEntryAuthFailed(
+                    translation_domain=DOMAIN, translation_key="invalid_auth"
+                ) from wallbox_connection_error
+            if wallbox_connection_error.status == HTTPStatus.TOO_MANY_REQUESTS:
+                raise UpdateFailed(
+                    translation_domain=DOMAIN, translation_key="too_many_requests"
+                ) from wallbox_connection_error
+            raise UpdateFailed(
+                translation_domain=DOMAIN, translation_key="api_failed"
+            ) from wallbox_connection_error
+        except (ClientError, TimeoutError) as wallbox_connection_error:
+            raise UpdateFailed(
+                translation_domain=DOMAIN, translation_key="api_failed"
+            ) from wallbox_connection_error
+        self._error_polls = 0
+        self.desired_interval = self._next_update_interval(data)
+        self._snapshot_store.async_delay_save(lambda: self._snapshot(data), SNAPSHOT_SAVE_DELAY)
+        return data
+
+    @staticmethod
+    def _backoff_interval(polls: int) -> timedelta:
+        return timedelta(seconds=min(UPDATE_INTERVAL * 2 ** polls, UPDATE_INTERVAL_MAX))
 
-        r = json.loads(response.text)
-        return r[SESSIONS_DATA]
+    def _next_update_interval(self, data: dict[str, Any]) -> timedelta:
+        """Poll quickly while the charger is busy, back off exponentially while it stays idle."""
+        status = data[CHARGER_STATUS_DESCRIPTION_KEY]
+        previous_status = None if self.data is None else self.data.get(CHARGER_STATUS_DESCRIPTION_KEY)
+        if monotonic() - self._last_write < WRITE_FAST_POLL_DURATION or (status in CHARGING_STATUSES and not self._ocpp_connected):
+            self._idle_polls = 0
+            return timedelta(seconds=UPDATE_INTERVAL_CHARGING)
+        if self._ocpp_connected:
+            self._idle_polls = 0
+            return timedelta(seconds=OCPP_UPDATE_INTERVAL)
+        if status in CONNECTED_STATUSES or status != previous_status:
+            self._idle_polls = 0
+            return timedelta(seconds=UPDATE_INTERVAL)
+        self._idle_polls += 1
+        return self._backoff_interval(self._idle_polls)
 
+    @staticmethod
+    def _parse_status(data: dict[str, Any]) -> dict[str, Any]:
+        """Flatten the charger status the same way the core Wallbox coordinator does."""
+        data[CHARGER_MAX_CHARGING_CURRENT_KEY] = data[CHARGER_DATA_KEY][CHARGER_MAX_CHARGING_CURRENT_KEY]
+        data[CHARGER_LOCKED_UNLOCKED_KEY] = data[CHARGER_DATA_KEY][CHARGER_LOCKED_UNLOCKED_KEY]
+        data[CHARGER_ENERGY_PRICE_KEY] = data[CHARGER_DATA_KEY][CHARGER_ENERGY_PRICE_KEY]
+        # Only show max_icp_current if power_boost is available in the wallbox unit:
+        if (
+                data[CHARGER_DATA_KEY].get(CHARGER_MAX_ICP_CURRENT_KEY, 0) > 0
+                and CHARGER_POWER_BOOST_KEY in data[CHARGER_DATA_KEY][CHARGER_PLAN_KEY][CHARGER_FEATURES_KEY]
+        ):
+            data[CHARGER_MAX_ICP_CURRENT_KEY] = data[CHARGER_DATA_KEY][CHARGER_MAX_ICP_CURRENT_KEY]
+        data[CHARGER_CURRENCY_KEY] = f"{data[CHARGER_DATA_KEY][CHARGER_CURRENCY_KEY][CODE_KEY]}/kWh"
+        data[CHARGER_STATUS_DESCRIPTION_KEY] = CHARGER_STATUS.get(data[CHARGER_STATUS_ID_KEY], ChargerStatus.UNKNOWN)
 
-    def _get_data(self, energy_entity_id: str|None, last_energy_stats_date: datetime|None, last_energy_stats_sum: int|None) -> dict[str, Any]:
-        data = super()._get_data()
+        eco_smart = data[CHARGER_DATA_KEY].get(CHARGER_ECO_SMART_KEY, {})
+        eco_smart_enabled = eco_smart.get(CHARGER_ECO_SMART_STATUS_KEY)
+        eco_smart_mode = eco_smart.get(CHARGER_ECO_SMART_MODE_KEY)
+        if eco_smart_mode is None:
+            data[CHARGER_ECO_SMART_KEY] = EcoSmartMode.DISABLED
+        elif eco_smart_enabled is False:
+            data[CHARGER_ECO_SMART_KEY] = EcoSmartMode.OFF
+        elif eco_smart_mode == 0:
+            data[CHARGER_ECO_SMART_KEY] = EcoSmartMode.ECO_MODE
+        elif eco_smart_mode == 1:
+            data[CHARGER_ECO_SMART_KEY] = EcoSmartMode.FULL_SOLAR
+        return data
+
+    async def _async_get_data(self) -> dict[str, Any]:
+        with self.metrics.timed(PHASE_STATUS):
+            data = self._parse_status(await self._api.async_get_charger_status(self._station))
+        if self._ocpp_connected:
+            data.update(self._ocpp_data)
         group_id = data[CHARGER_DATA_KEY][CHARGER_GROUP_ID]
+        if self._session_fetcher is None:
+            self._session_fetcher = async_get_session_fetcher(self.hass, group_id, int(self._station))
         data[SESSION_ENERGY] = []
-        if energy_entity_id is None:
+        if self._energy_entity_id is None:
             return data
-        data[SESSION_ENERGY + "_entity_id"] = energy_entity_id
 
-        if last_energy_stats_sum is None:
-            start_time = 1704063600
-            data[SESSION_ENERGY + "_total"] = 0
-            _LOGGER.warning("Empty last state, starting from zero")
+        end_time = int(utcnow().replace(minute=0, second=0, microsecond=0).timestamp())
+        if self._ledger is None:
+            _LOGGER.warning(f"Empty ledger, starting from zero, older sessions can be imported with {DOMAIN}.{SERVICE_BACKFILL_SESSIONS}")
+            ledger = EnergyLedger(self._energy_entity_id, end_time - SESSION_LOOKBACK, 0)
         else:
-            start_time = int(last_energy_stats_date.timestamp())
-            data[SESSION_ENERGY + "_total"] = int(last_energy_stats_sum)
-            _LOGGER.info(f"Init stats: {last_energy_stats_sum} @ {last_energy_stats_date}")
-        energy_sessions = self._get_energy_sessions(group_id, start_time)
-        if len(energy_sessions) > 0:
-            _LOGGER.info(f"Received {len(energy_sessions)} sessions")
-        data[SESSION_ENERGY] = energy_sessions
+            ledger = self._ledger.copy()
+
+        with self.metrics.timed(PHASE_SESSIONS):
+            sessions = await self._session_fetcher.async_get_sessions(self._api, int(self._station), ledger.start, end_time)
+        self.metrics.record_sessions(len(sessions.ids))
+        await async_archive_sessions(self.hass, int(self._station), sessions)
+        contributions = await self.hass.async_add_executor_job(session_contributions, sessions)
+        rows = ledger.merge(contributions)
+        ledger.prune(end_time - SESSION_LOOKBACK)
+        if len(rows) > 0:
+            _LOGGER.info(f"Received {len(sessions.ids)} sessions changing {len(rows)} hours from {utc_from_timestamp(rows[0][0])}")
+        data[SESSION_ENERGY] = rows
+        data[SESSION_ENERGY_LEDGER] = ledger
         return data
 
+    async def _async_write(self, request: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        """Send a setpoint write to the API, translating its errors the same way as the core Wallbox coordinator."""
+        await self._async_authenticate()
+        self._last_write = monotonic()
+        try:
+            return await request(self._station, *args)
+        except ClientResponseError as wallbox_connection_error:
+            if wallbox_connection_error.status == HTTPStatus.FORBIDDEN:
+                raise InsufficientRights(
+                    translation_domain=DOMAIN, translation_key="insufficient_rights", hass=self.hass
+                ) from wallbox_connection_error
+            if wallbox_connection_error.status == HTTPStatus.TOO_MANY_REQUESTS:
+                async_get_poll_scheduler(self.hass).async_throttle()
+                raise HomeAssistantError(
+                    translation_domain=DOMAIN, translation_key="too_many_requests"
+                ) from wallbox_connection_error
+            raise HomeAssistantError(
+                translation_domain=DOMAIN, translation_key="api_failed"
+            ) from wallbox_connection_error
+        except (ClientError, TimeoutError) as wallbox_connection_error:
+            raise HomeAssistantError(
+                translation_domain=DOMAIN, translation_key="api_failed"
+            ) from wallbox_connection_error
+
+    async def async_set_charging_current(self, charging_current: float) -> None:
+        await self._commands.async_enqueue(CHARGER_MAX_CHARGING_CURRENT_KEY, charging_current, self._async_send_charging_current)
+
+    async def _async_send_charging_current(self, charging_current: float) -> None:
+        res = await self._async_write(self._api.async_set_max_charging_current, charging_current)
+        if res[CHARGER_DATA_POST_L1_KEY][CHARGER_DATA_POST_L2_KEY][CHARGER_MAX_CHARGING_CURRENT_POST_KEY] != charging_current:
+            raise InsufficientRights(translation_domain=DOMAIN, translation_key="insufficient_rights", hass=self.hass)
+
+    async def async_set_icp_current(self, icp_current: float) -> None:
+        await self._commands.async_enqueue(CHARGER_MAX_ICP_CURRENT_KEY, icp_current, self._async_send_icp_current)
+
+    async def _async_send_icp_current(self, icp_current: float) -> None:
+        res = await self._async_write(self._api.async_set_icp_max_current, icp_current)
+        if res[CHARGER_MAX_ICP_CURRENT_POST_KEY] != icp_current:
+            raise InsufficientRights(translation_domain=DOMAIN, translation_key="insufficient_rights", hass=self.hass)
+
+    async def async_set_energy_cost(self, energy_cost: float) -> None:
+        await self._commands.async_enqueue(CHARGER_ENERGY_PRICE_KEY, energy_cost, self._async_send_energy_cost)
+
+    async def _async_send_energy_cost(self, energy_cost: float) -> None:
+        await self._async_write(self._api.async_set_energy_cost, energy_cost)
+
+    async def async_set_lock_unlock(self, lock: bool) -> None:
+        await self._commands.async_enqueue(CHARGER_LOCKED_UNLOCKED_KEY, lock, self._async_send_lock_unlock)
+
+    async def _async_send_lock_unlock(self, lock: bool) -> None:
+        if lock:
+            res = await self._async_write(self._api.async_lock_charger)
+        else:
+            res = await self._async_write(self._api.async_unlock_charger)
+        if res[CHARGER_DATA_POST_L1_KEY][CHARGER_DATA_POST_L2_KEY][CHARGER_LOCKED_UNLOCKED_KEY] != lock:
+            raise InsufficientRights(translation_domain=DOMAIN, translation_key="insufficient_rights", hass=self.hass)
+
+    async def async_pause_charger(self, pause: bool) -> None:
+        await self._commands.async_enqueue(
+            CHARGER_STATUS_DESCRIPTION_KEY,
+            ChargerStatus.PAUSED if pause else ChargerStatus.CHARGING,
+            self._async_send_pause_charger,
+        )
+
+    async def _async_send_pause_charger(self, status: ChargerStatus) -> None:
+        if status == ChargerStatus.PAUSED:
+            await self._async_write(self._api.async_pause_charging_session)
+        else:
+            await self._async_write(self._api.async_resume_charging_session)
+
+    async def async_set_eco_smart(self, option: str) -> None:
+        await self._commands.async_enqueue(CHARGER_ECO_SMART_KEY, option, self._async_send_eco_smart)
+
+    async def _async_send_eco_smart(self, option: str) -> None:
+        if option == EcoSmartMode.ECO_MODE:
+            await self._async_write(self._api.async_enable_eco_smart, 0)
+        elif option == EcoSmartMode.FULL_SOLAR:
+            await self._async_write(self._api.async_enable_eco_smart, 1)
+        else:
+            await self._async_write(self._api.async_disable_eco_smart)
+
 
 class InsufficientRights(HomeAssistantError):
     """Error to indicate there are insufficient right for the user."""
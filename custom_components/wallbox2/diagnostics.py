@@ -0,0 +1,38 @@
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+
+from .const import (
+    CHARGER_JWT_REFRESH_TOKEN,
+    CHARGER_JWT_TOKEN,
+    SESSION_ENERGY,
+    SESSION_ENERGY_LEDGER,
+)
+from .coordinator import Wallbox2ConfigEntry
+from .scheduler import async_get_poll_scheduler
+
+TO_REDACT = {CONF_USERNAME, CONF_PASSWORD, CHARGER_JWT_TOKEN, CHARGER_JWT_REFRESH_TOKEN}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: Wallbox2ConfigEntry) -> dict[str, Any]:
+    """Return the raw charger data together with the integration's own performance counters."""
+    coordinator = entry.runtime_data
+    data = {key: value for key, value in (coordinator.data or {}).items() if key not in (SESSION_ENERGY, SESSION_ENERGY_LEDGER)}
+    ledger = coordinator.ledger
+    return {
+        "entry": async_redact_data(dict(entry.data), TO_REDACT),
+        "desired_interval": coordinator.desired_interval.total_seconds(),
+        "scheduler": async_get_poll_scheduler(hass).as_dict(),
+        "data": data,
+        "ledger": None if ledger is None else {
+            "entity_id": ledger.entity_id,
+            "start": ledger.start,
+            "base_sum": ledger.base_sum,
+            "total": ledger.total,
+            "hours": len(ledger.hours),
+            "sessions": len(ledger.sessions),
+        },
+        "metrics": coordinator.metrics.as_dict(),
+    }
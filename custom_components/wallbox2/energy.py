@@ -0,0 +1,39 @@
+import numpy as np
+
+HOUR = 3600
+
+
+def session_hours(start: np.ndarray, end: np.ndarray, energy: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Spread the energy of each session over the hours it covers, proportionally to the time spent in each hour.
+
+    Sessions are given as columns of start and end timestamps (seconds) and energy, sessions without a known end
+    are counted in their start hour. Returns one row per covered (session, hour) pair: the session index, the hour
+    start timestamp and the energy of the session within that hour.
+    """
+    if len(start) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    start = np.asarray(start, dtype=np.int64)
+    end = np.maximum(np.asarray(end, dtype=np.int64), start)
+    energy = np.asarray(energy, dtype=np.float64)
+
+    first = start // HOUR
+    last = np.where(end > start, (end - 1) // HOUR, first)
+    counts = last - first + 1
+
+    session = np.repeat(np.arange(len(start)), counts)
+    hour = first[session] + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    overlap = np.minimum(end[session], (hour + 1) * HOUR) - np.maximum(start[session], hour * HOUR)
+    duration = (end - start)[session]
+    share = np.divide(overlap, duration, out=np.ones(len(session)), where=duration > 0)
+    return session, hour * HOUR, energy[session] * share
+
+
+def hourly_energy(start: np.ndarray, end: np.ndarray, energy: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Total energy of the sessions per covered hour, returns the hour start timestamps and their energy."""
+    _, hour, session_energy = session_hours(start, end, energy)
+    if len(hour) == 0:
+        return hour, session_energy
+    base = hour.min()
+    covered = np.bincount((hour - base) // HOUR) > 0
+    energy_per_hour = np.bincount((hour - base) // HOUR, weights=session_energy)
+    return np.flatnonzero(covered) * HOUR + base, energy_per_hour[covered]
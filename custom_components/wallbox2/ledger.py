@@ -0,0 +1,123 @@
+from dataclasses import dataclass, field
+from typing import Any
+
+from homeassistant.components.recorder.models import StatisticMeanType, StatisticMetaData
+from homeassistant.components.recorder.statistics import DOMAIN as RECORDER_DOMAIN
+from homeassistant.const import UnitOfEnergy
+from homeassistant.util.unit_conversion import EnergyConverter
+
+from .const import LEDGER_BASE_SUM, LEDGER_ENTITY_ID, LEDGER_HOURS, LEDGER_SESSIONS, LEDGER_START
+from .energy import session_hours
+from .sessions import ChargerSessions
+
+ENERGY_EPSILON = 1e-6
+
+
+def energy_statistic_metadata(statistic_id: str) -> StatisticMetaData:
+    return StatisticMetaData(
+        statistic_id=statistic_id,
+        source=RECORDER_DOMAIN,
+        name="Total energy",
+        has_sum=True,
+        mean_type=StatisticMeanType.NONE,
+        unit_of_measurement=UnitOfEnergy.WATT_HOUR,
+        unit_class=EnergyConverter.UNIT_CLASS,
+    )
+
+
+def session_contributions(sessions: ChargerSessions) -> dict[str, dict[int, float]]:
+    """Energy of every session per hour it covers, keyed by the session id."""
+    index, hours, energy = session_hours(sessions.start, sessions.end, sessions.energy)
+    contributions: dict[str, dict[int, float]] = {}
+    for i, hour, e in zip(index.tolist(), hours.tolist(), energy.tolist()):
+        contributions.setdefault(str(sessions.ids[i]), {})[hour] = e
+    return contributions
+
+
+@dataclass
+class EnergyLedger:
+    """Tracks which session contributes how much energy to which hour, for the hours that may still change.
+
+    Hours before start are final and summed up in base_sum, only sessions starting at or after start are
+    fetched and compared against what was already imported.
+    """
+
+    entity_id: str
+    start: int
+    base_sum: float
+    hours: dict[int, float] = field(default_factory=dict)
+    sessions: dict[str, dict[int, float]] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "EnergyLedger | None":
+        if LEDGER_START not in data:
+            return None
+        return cls(
+            data[LEDGER_ENTITY_ID],
+            data[LEDGER_START],
+            data[LEDGER_BASE_SUM],
+            {hour: energy for hour, energy in data[LEDGER_HOURS]},
+            {session_id: {hour: energy for hour, energy in hours} for session_id, hours in data[LEDGER_SESSIONS].items()},
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            LEDGER_ENTITY_ID: self.entity_id,
+            LEDGER_START: self.start,
+            LEDGER_BASE_SUM: self.base_sum,
+            LEDGER_HOURS: sorted(self.hours.items()),
+            LEDGER_SESSIONS: {session_id: sorted(hours.items()) for session_id, hours in self.sessions.items()},
+        }
+
+    def copy(self) -> "EnergyLedger":
+        return EnergyLedger(
+            self.entity_id,
+            self.start,
+            self.base_sum,
+            dict(self.hours),
+            {session_id: dict(hours) for session_id, hours in self.sessions.items()},
+        )
+
+    @property
+    def total(self) -> float:
+        return self.base_sum + sum(self.hours.values())
+
+    def merge(self, contributions: dict[str, dict[int, float]]) -> list[tuple[int, float, float]]:
+        """Apply the contributions of fetched sessions.
+
+        Returns the (hour, energy, sum) rows to be written: every hour from the first changed one onward, as
+        their sums move along with it. Sessions that did not change produce no rows.
+        """
+        deltas: dict[int, float] = {}
+        for session_id, hours in contributions.items():
+            previous = self.sessions.get(session_id, {})
+            if previous == hours:
+                continue
+            for hour in previous.keys() | hours.keys():
+                deltas[hour] = deltas.get(hour, 0) + hours.get(hour, 0) - previous.get(hour, 0)
+            self.sessions[session_id] = hours
+        changed = [hour for hour, delta in deltas.items() if abs(delta) > ENERGY_EPSILON]
+        if not changed:
+            return []
+        for hour in changed:
+            self.hours[hour] = self.hours.get(hour, 0) + deltas[hour]
+
+        first_changed = min(changed)
+        total = self.base_sum
+        rows = []
+        for hour in sorted(self.hours):
+            total += self.hours[hour]
+            if hour >= first_changed:
+                rows.append((hour, self.hours[hour], total))
+        return rows
+
+    def prune(self, start: int) -> None:
+        """Stop tracking sessions starting before start, their hours become final."""
+        if start <= self.start:
+            return
+        self.sessions = {
+            session_id: hours for session_id, hours in self.sessions.items() if min(hours, default=start) >= start
+        }
+        for hour in [hour for hour in self.hours if hour < start]:
+            self.base_sum += self.hours.pop(hour)
+        self.start = start
@@ -0,0 +1,73 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from time import monotonic
+from typing import Any
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+PHASE_POLL = "poll"
+PHASE_AUTHENTICATE = "authenticate"
+PHASE_STATUS = "status"
+PHASE_SESSIONS = "sessions"
+PHASE_LAST_STATISTICS = "last_statistics"
+PHASE_IMPORT_STATISTICS = "import_statistics"
+
+
+@dataclass
+class LatencyHistogram:
+    """Cumulative latency histogram of one phase, in seconds."""
+
+    buckets: list[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+    count: int = 0
+    total: float = 0.0
+    last: float | None = None
+    max: float = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.buckets[next((i for i, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound), len(LATENCY_BUCKETS))] += 1
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        self.max = max(self.max, seconds)
+
+
+@dataclass
+class Wallbox2Metrics:
+    """Performance counters of one charger, exposed as diagnostic sensors and in the diagnostics download."""
+
+    latency: dict[str, LatencyHistogram] = field(default_factory=dict)
+    requests: int = 0
+    payload_bytes: int = 0
+    last_payload_bytes: int = 0
+    sessions_fetched: int = 0
+    last_sessions_fetched: int = 0
+    rows_written: int = 0
+    retries: int = 0
+    rate_limit_hits: int = 0
+
+    @contextmanager
+    def timed(self, phase: str) -> Iterator[None]:
+        start = monotonic()
+        try:
+            yield
+        finally:
+            self.latency.setdefault(phase, LatencyHistogram()).observe(monotonic() - start)
+
+    def last_latency(self, phase: str) -> float | None:
+        histogram = self.latency.get(phase)
+        return None if histogram is None or histogram.last is None else round(histogram.last, 3)
+
+    def record_response(self, size: int) -> None:
+        self.requests += 1
+        self.payload_bytes += size
+        self.last_payload_bytes = size
+
+    def record_sessions(self, count: int) -> None:
+        self.sessions_fetched += count
+        self.last_sessions_fetched = count
+
+    def as_dict(self) -> dict[str, Any]:
+        metrics = asdict(self)
+        metrics["latency_buckets"] = LATENCY_BUCKETS
+        return metrics
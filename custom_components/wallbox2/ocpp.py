@@ -0,0 +1,262 @@
+import hmac
+import json
+import logging
+from collections.abc import Awaitable, Callable
+from typing import TYPE_CHECKING, Any
+
+from aiohttp import BasicAuth, WSMsgType, hdrs, web
+
+from homeassistant.components.wallbox.const import (
+    CHARGER_ADDED_ENERGY_KEY,
+    CHARGER_CHARGING_POWER_KEY,
+    CHARGER_STATE_OF_CHARGE_KEY,
+    CHARGER_STATUS_DESCRIPTION_KEY,
+    ChargerStatus,
+)
+from homeassistant.core import HomeAssistant
+from homeassistant.util.dt import utcnow
+from homeassistant.util.hass_dict import HassKey
+
+from .const import DOMAIN, OCPP_HEARTBEAT_INTERVAL
+
+if TYPE_CHECKING:
+    from .coordinator import Wallbox2Coordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_OCPP_SERVERS: HassKey[dict[tuple[str | None, int], "Wallbox2OcppServer"]] = HassKey(f"{DOMAIN}_ocpp_servers")
+
+OCPP_PROTOCOL = "ocpp1.6"
+WEBSOCKET_HEARTBEAT = 60
+CALL = 2
+CALL_RESULT = 3
+CALL_ERROR = 4
+
+# status of connector 1, connector 0 is the charger as a whole and only reported for errors
+CONNECTOR_STATUS = {
+    "Available": ChargerStatus.READY,
+    "Preparing": ChargerStatus.WAITING_FOR_CAR,
+    "Charging": ChargerStatus.CHARGING,
+    "SuspendedEV": ChargerStatus.WAITING_FOR_CAR,
+    "SuspendedEVSE": ChargerStatus.PAUSED,
+    "Finishing": ChargerStatus.WAITING,
+    "Reserved": ChargerStatus.SCHEDULED,
+    "Unavailable": ChargerStatus.DISCONNECTED,
+    "Faulted": ChargerStatus.ERROR,
+}
+
+MEASURAND_ENERGY = "Energy.Active.Import.Register"
+MEASURAND_POWER = "Power.Active.Import"
+MEASURAND_SOC = "SoC"
+
+
+def _accepted() -> dict[str, Any]:
+    return {"idTagInfo": {"status": "Accepted"}}
+
+
+def _to_kilo(value: float, unit: str | None, base_unit: str) -> float:
+    """Meter values come in W / Wh unless stated otherwise, the Wallbox data is in kW / kWh."""
+    return value if unit == f"k{base_unit}" else value / 1000
+
+
+class OcppChargePoint:
+    """One websocket connection of a charger, translating its OCPP 1.6 messages into coordinator data."""
+
+    def __init__(self, charge_point_id: str, coordinator: "Wallbox2Coordinator") -> None:
+        self.charge_point_id = charge_point_id
+        self._coordinator = coordinator
+        self._meter_start: float | None = None
+        self._handlers: dict[str, Callable[[dict[str, Any]], Awaitable[dict[str, Any]]]] = {
+            "BootNotification": self._boot_notification,
+            "Heartbeat": self._heartbeat,
+            "Authorize": self._authorize,
+            "StatusNotification": self._status_notification,
+            "MeterValues": self._meter_values,
+            "StartTransaction": self._start_transaction,
+            "StopTransaction": self._stop_transaction,
+            "DataTransfer": self._data_transfer,
+        }
+
+    async def async_handle(self, message: str) -> list[Any] | None:
+        try:
+            message_type, message_id, *rest = json.loads(message)
+        except (ValueError, TypeError):
+            _LOGGER.warning(f"Ignoring malformed OCPP message from {self.charge_point_id}: {message}")
+            return None
+        if message_type != CALL:
+            # the central system sends no calls of its own, results and errors cannot belong to anything
+            return None
+        try:
+            action, payload = rest
+        except ValueError:
+            _LOGGER.warning(f"Malformed OCPP call from {self.charge_point_id}: {message}")
+            return [CALL_ERROR, message_id, "FormationViolation", "A call has an action and a payload", {}]
+        if (handler := self._handlers.get(action)) is None:
+            return [CALL_ERROR, message_id, "NotImplemented", f"{action} is not supported", {}]
+        try:
+            return [CALL_RESULT, message_id, await handler(payload)]
+        except (KeyError, TypeError, ValueError) as err:
+            _LOGGER.warning(f"Invalid {action} from {self.charge_point_id}: {err}")
+            return [CALL_ERROR, message_id, "FormationViolation", str(err), {}]
+
+    async def _boot_notification(self, payload: dict[str, Any]) -> dict[str, Any]:
+        _LOGGER.info(f"Charge point {self.charge_point_id} booted: {payload.get('chargePointModel')} {payload.get('firmwareVersion')}")
+        return {"status": "Accepted", "currentTime": utcnow().isoformat(), "interval": OCPP_HEARTBEAT_INTERVAL}
+
+    async def _heartbeat(self, payload: dict[str, Any]) -> dict[str, Any]:
+        return {"currentTime": utcnow().isoformat()}
+
+    async def _authorize(self, payload: dict[str, Any]) -> dict[str, Any]:
+        return _accepted()
+
+    async def _data_transfer(self, payload: dict[str, Any]) -> dict[str, Any]:
+        return {"status": "UnknownVendorId"}
+
+    async def _status_notification(self, payload: dict[str, Any]) -> dict[str, Any]:
+        connector_id = payload["connectorId"]
+        status = payload["status"]
+        if connector_id == 1 or (connector_id == 0 and status == "Faulted"):
+            self._coordinator.async_push_ocpp({CHARGER_STATUS_DESCRIPTION_KEY: CONNECTOR_STATUS.get(status, ChargerStatus.UNKNOWN)})
+        return {}
+
+    async def _meter_values(self, payload: dict[str, Any]) -> dict[str, Any]:
+        if payload["connectorId"] != 1:
+            return {}
+        update: dict[str, Any] = {}
+        for meter_value in payload["meterValue"]:
+            for sampled in meter_value["sampledValue"]:
+                measurand = sampled.get("measurand", MEASURAND_ENERGY)
+                if sampled.get("phase") is not None:
+                    continue
+                value = float(sampled["value"])
+                if measurand == MEASURAND_POWER:
+                    update[CHARGER_CHARGING_POWER_KEY] = _to_kilo(value, sampled.get("unit"), "W")
+                elif measurand == MEASURAND_ENERGY and self._meter_start is not None:
+                    update[CHARGER_ADDED_ENERGY_KEY] = _to_kilo(value, sampled.get("unit"), "Wh") - self._meter_start / 1000
+                elif measurand == MEASURAND_SOC:
+                    update[CHARGER_STATE_OF_CHARGE_KEY] = value
+        if update:
+            self._coordinator.async_push_ocpp(update)
+        return {}
+
+    async def _start_transaction(self, payload: dict[str, Any]) -> dict[str, Any]:
+        self._meter_start = float(payload["meterStart"])
+        self._coordinator.async_push_ocpp({CHARGER_ADDED_ENERGY_KEY: 0.0})
+        # unique across reconnects, the charger keeps it for the StopTransaction
+        return {"transactionId": int(utcnow().timestamp())} | _accepted()
+
+    async def _stop_transaction(self, payload: dict[str, Any]) -> dict[str, Any]:
+        if self._meter_start is not None:
+            self._coordinator.async_push_ocpp({
+                CHARGER_ADDED_ENERGY_KEY: (float(payload["meterStop"]) - self._meter_start) / 1000,
+                CHARGER_CHARGING_POWER_KEY: 0.0,
+            })
+        self._meter_start = None
+        # the finished session and its cost only come from the cloud
+        self._coordinator.async_request_poll()
+        return _accepted()
+
+
+class Wallbox2OcppServer:
+    """OCPP 1.6 JSON central system, shared by all config entries listening on the same port.
+
+    Chargers connect to ws://<home assistant>:<port>/<charge point id>, only registered charge point ids
+    authenticating with HTTP Basic as their id and password (OCPP 1.6 security profile 1) are accepted.
+    """
+
+    def __init__(self, host: str | None, port: int) -> None:
+        self._host = host
+        self._port = port
+        self._coordinators: dict[str, "Wallbox2Coordinator"] = {}
+        self._passwords: dict[str, str] = {}
+        self._sockets: dict[str, web.WebSocketResponse] = {}
+        self._runner: web.AppRunner | None = None
+
+    @property
+    def registered(self) -> bool:
+        return len(self._coordinators) > 0
+
+    async def async_register(self, charge_point_id: str, coordinator: "Wallbox2Coordinator", password: str) -> None:
+        self._coordinators[charge_point_id] = coordinator
+        self._passwords[charge_point_id] = password
+        if self._runner is None:
+            app = web.Application()
+            app.router.add_get("/{charge_point_id}", self._handle)
+            app.router.add_get("/ocpp/{charge_point_id}", self._handle)
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            try:
+                await web.TCPSite(runner, host=self._host, port=self._port).start()
+            except OSError:
+                del self._coordinators[charge_point_id]
+                del self._passwords[charge_point_id]
+                await runner.cleanup()
+                raise
+            self._runner = runner
+            _LOGGER.info(f"OCPP central system listening on {self._host or '*'}:{self._port}")
+
+    async def async_unregister(self, charge_point_id: str) -> None:
+        self._passwords.pop(charge_point_id, None)
+        if (coordinator := self._coordinators.pop(charge_point_id, None)) is not None:
+            coordinator.async_set_ocpp_connected(False)
+        # the charger reconnects, to the coordinator registered after a reload
+        if (ws := self._sockets.pop(charge_point_id, None)) is not None:
+            await ws.close()
+        if not self._coordinators and self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        charge_point_id = request.match_info["charge_point_id"]
+        if (coordinator := self._coordinators.get(charge_point_id)) is None:
+            _LOGGER.warning(f"Rejecting unknown charge point {charge_point_id}")
+            raise web.HTTPNotFound
+        if not self._authorized(charge_point_id, request):
+            _LOGGER.warning(f"Rejecting charge point {charge_point_id} from {request.remote}, wrong credentials")
+            raise web.HTTPUnauthorized(headers={hdrs.WWW_AUTHENTICATE: 'Basic realm="OCPP"'})
+        ws = web.WebSocketResponse(protocols=(OCPP_PROTOCOL,), heartbeat=WEBSOCKET_HEARTBEAT)
+        await ws.prepare(request)
+        _LOGGER.info(f"Charge point {charge_point_id} connected")
+        charge_point = OcppChargePoint(charge_point_id, coordinator)
+        if (previous := self._sockets.get(charge_point_id)) is not None:
+            # a charger reconnecting before its stale connection timed out
+            await previous.close()
+        self._sockets[charge_point_id] = ws
+        coordinator.async_set_ocpp_connected(True)
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                if (response := await charge_point.async_handle(msg.data)) is not None:
+                    await ws.send_str(json.dumps(response))
+        finally:
+            if self._sockets.get(charge_point_id) is ws:
+                del self._sockets[charge_point_id]
+                if self._coordinators.get(charge_point_id) is coordinator:
+                    coordinator.async_set_ocpp_connected(False)
+            _LOGGER.info(f"Charge point {charge_point_id} disconnected")
+        return ws
+
+    def _authorized(self, charge_point_id: str, request: web.Request) -> bool:
+        try:
+            auth = BasicAuth.decode(request.headers.get(hdrs.AUTHORIZATION, ""))
+        except ValueError:
+            return False
+        if (password := self._passwords.get(charge_point_id)) is None:
+            return False
+        return auth.login == charge_point_id and hmac.compare_digest(auth.password.encode(), password.encode())
+
+
+def async_get_ocpp_server(hass: HomeAssistant, host: str | None, port: int) -> Wallbox2OcppServer:
+    servers = hass.data.setdefault(DATA_OCPP_SERVERS, {})
+    if (server := servers.get((host, port))) is None:
+        server = servers[host, port] = Wallbox2OcppServer(host, port)
+    return server
+
+
+async def async_release_ocpp_server(hass: HomeAssistant, host: str | None, port: int, charge_point_id: str) -> None:
+    servers = hass.data.get(DATA_OCPP_SERVERS, {})
+    if (server := servers.get((host, port))) is not None:
+        await server.async_unregister(charge_point_id)
+        if not server.registered:
+            del servers[host, port]
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from time import monotonic
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util.hass_dict import HassKey
+
+from .const import DOMAIN, POLL_BURST, POLL_RATE_MAX, POLL_RATE_MIN, POLL_RATE_STEP, POLL_SETUP_SPREAD
+
+if TYPE_CHECKING:
+    from .coordinator import Wallbox2Coordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_POLL_SCHEDULER: HassKey["Wallbox2PollScheduler"] = HassKey(f"{DOMAIN}_poll_scheduler")
+
+
+@dataclass
+class ScheduledPoll:
+    coordinator: "Wallbox2Coordinator"
+    due: float
+    requested: bool = False
+    task: asyncio.Task[None] | None = None
+
+
+class Wallbox2PollScheduler:
+    """Polls the coordinators of all config entries within a single request budget.
+
+    The budget is a token bucket refilled at a rate that halves on every 429 and slowly recovers with successful
+    polls, so the total request rate stays constant however many chargers there are. Each coordinator tells how
+    often it would like to be polled, out of the polls that are due the ones of charging chargers and chargers
+    with fresh writes go first. Polls start one token apart and run concurrently, a slow charger delays no other.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self._hass = hass
+        self._polls: dict[str, ScheduledPoll] = {}
+        self._rate = POLL_RATE_MAX
+        self._tokens = float(POLL_BURST)
+        self._refilled = monotonic()
+        self._setup_slot = 0.0
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    @callback
+    def async_add(self, coordinator: "Wallbox2Coordinator", delay: float | None = None) -> None:
+        """Take over polling the coordinator, first after delay or after its desired interval."""
+        if delay is None:
+            delay = coordinator.desired_interval.total_seconds()
+        self._polls[coordinator.config_entry.entry_id] = ScheduledPoll(coordinator, monotonic() + delay)
+        if self._task is None:
+            self._task = self._hass.async_create_background_task(self._async_run(), f"{DOMAIN}_poll_scheduler")
+        self._wakeup.set()
+
+    @callback
+    def async_remove(self, coordinator: "Wallbox2Coordinator") -> None:
+        if (poll := self._polls.pop(coordinator.config_entry.entry_id, None)) is not None and poll.task is not None:
+            poll.task.cancel()
+        if not self._polls and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    @callback
+    def async_request(self, coordinator: "Wallbox2Coordinator") -> None:
+        """Poll the coordinator as soon as the budget allows, ahead of everything else."""
+        if (poll := self._polls.get(coordinator.config_entry.entry_id)) is not None:
+            poll.requested = True
+            poll.due = min(poll.due, monotonic())
+            self._wakeup.set()
+
+    @callback
+    def async_throttle(self) -> None:
+        """Shrink the budget after the API answered 429."""
+        self._rate = max(POLL_RATE_MIN, self._rate / 2)
+        self._tokens = min(self._tokens, 0)
+        _LOGGER.warning(f"Rate limited, polling at most every {1 / self._rate:.0f} s")
+
+    async def async_acquire_setup(self) -> None:
+        """Take a token for the first refresh of an entry without waiting for the refill.
+
+        Setup must not queue behind the steady rate, 50 chargers would take minutes. First refreshes use up the
+        burst and then only start POLL_SETUP_SPREAD apart, borrowing against the tokens of the later polls.
+        """
+        now = monotonic()
+        if self._token_wait(now) > 0:
+            slot = max(now, self._setup_slot)
+            self._setup_slot = slot + POLL_SETUP_SPREAD
+            await asyncio.sleep(slot - now)
+        self._tokens -= 1
+
+    def as_dict(self) -> dict[str, Any]:
+        now = monotonic()
+        return {
+            "rate": self._rate,
+            "tokens": self._tokens,
+            "polls": {
+                entry_id: {"due_in": round(poll.due - now, 1), "running": poll.task is not None, "prioritised": poll.coordinator.prioritised}
+                for entry_id, poll in self._polls.items()
+            },
+        }
+
+    def _token_wait(self, now: float) -> float:
+        self._tokens = min(POLL_BURST, self._tokens + (now - self._refilled) * self._rate)
+        self._refilled = now
+        return 0.0 if self._tokens >= 1 else (1 - self._tokens) / self._rate
+
+    def _next(self, now: float) -> ScheduledPoll | None:
+        idle = [poll for poll in self._polls.values() if poll.task is None]
+        due = [poll for poll in idle if poll.due <= now]
+        if due:
+            return min(due, key=lambda poll: (not (poll.requested or poll.coordinator.prioritised), poll.due))
+        return min(idle, key=lambda poll: poll.due, default=None)
+
+    async def _async_run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            now = monotonic()
+            if (poll := self._next(now)) is None:
+                await self._wakeup.wait()
+                continue
+            if (delay := max(poll.due - now, self._token_wait(now))) > 0:
+                try:
+                    async with asyncio.timeout(delay):
+                        await self._wakeup.wait()
+                except TimeoutError:
+                    pass
+                continue
+            self._tokens -= 1
+            poll.task = self._hass.async_create_background_task(self._async_poll(poll), f"{DOMAIN}_poll")
+
+    async def _async_poll(self, poll: ScheduledPoll) -> None:
+        coordinator = poll.coordinator
+        # a request made while this poll runs, e.g. to confirm a write flushed meanwhile, needs a poll of its own
+        poll.requested = False
+        try:
+            await coordinator.async_refresh()
+        finally:
+            poll.task = None
+            if not poll.requested:
+                poll.due = monotonic() + coordinator.desired_interval.total_seconds()
+            if coordinator.last_update_success:
+                self._rate = min(POLL_RATE_MAX, self._rate + POLL_RATE_STEP)
+            self._wakeup.set()
+
+
+def async_get_poll_scheduler(hass: HomeAssistant) -> Wallbox2PollScheduler:
+    if (scheduler := hass.data.get(DATA_POLL_SCHEDULER)) is None:
+        scheduler = hass.data[DATA_POLL_SCHEDULER] = Wallbox2PollScheduler(hass)
+    return scheduler
@@ -1,22 +1,23 @@
 import logging
-
-from homeassistant.util.unit_conversion import EnergyConverter
-from itertools import groupby
-from datetime import datetime, time
+from collections.abc import Callable
+from dataclasses import dataclass
 
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddConfigEntryEntitiesCallback
 from homeassistant.components.wallbox.sensor import WallboxSensor, SENSOR_TYPES
 from homeassistant.components.sensor import SensorEntity, SensorEntityDescription, SensorStateClass, SensorDeviceClass
-from homeassistant.components.recorder.statistics import async_import_statistics, DOMAIN as RECORDER_DOMAIN
-from homeassistant.components.recorder.models import StatisticMetaData, StatisticData, StatisticMeanType
-from homeassistant.const import UnitOfEnergy
-from homeassistant.util.dt import utc_from_timestamp, UTC
+from homeassistant.components.recorder.statistics import async_import_statistics
+from homeassistant.components.recorder.models import StatisticData
+from homeassistant.const import EntityCategory, UnitOfEnergy, UnitOfInformation, UnitOfTime
+from homeassistant.helpers.typing import StateType
+from homeassistant.util.dt import utc_from_timestamp
 
 from homeassistant.components.wallbox.const import CHARGER_DATA_KEY, CHARGER_SERIAL_NUMBER_KEY
 from .coordinator import Wallbox2Coordinator, Wallbox2ConfigEntry
 from .entity import Wallbox2Entity
-from .const import SESSION_ENERGY, SESSION_ATTRIBUTES, SESSION_TIME
+from .const import SESSION_ENERGY, SESSION_ENERGY_LEDGER
+from .ledger import energy_statistic_metadata
+from .metrics import PHASE_IMPORT_STATISTICS, PHASE_POLL, PHASE_SESSIONS, Wallbox2Metrics
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -32,13 +33,107 @@ async def async_setup_entry(
         if (description := SENSOR_TYPES.get(ent))
     ]
     sensors.append(WallboxEnergySensor(coordinator))
+    sensors.extend(Wallbox2MetricSensor(coordinator, description) for description in METRIC_SENSOR_TYPES)
     async_add_entities(sensors)
 
 
+@dataclass(frozen=True, kw_only=True)
+class Wallbox2MetricSensorEntityDescription(SensorEntityDescription):
+    value_fn: Callable[[Wallbox2Metrics], StateType]
+    entity_category: EntityCategory = EntityCategory.DIAGNOSTIC
+    entity_registry_enabled_default: bool = False
+
+
+METRIC_SENSOR_TYPES: tuple[Wallbox2MetricSensorEntityDescription, ...] = (
+    Wallbox2MetricSensorEntityDescription(
+        key="poll_duration",
+        translation_key="poll_duration",
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda metrics: metrics.last_latency(PHASE_POLL),
+    ),
+    Wallbox2MetricSensorEntityDescription(
+        key="sessions_fetch_duration",
+        translation_key="sessions_fetch_duration",
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda metrics: metrics.last_latency(PHASE_SESSIONS),
+    ),
+    Wallbox2MetricSensorEntityDescription(
+        key="statistics_import_duration",
+        translation_key="statistics_import_duration",
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda metrics: metrics.last_latency(PHASE_IMPORT_STATISTICS),
+    ),
+    Wallbox2MetricSensorEntityDescription(
+        key="api_requests",
+        translation_key="api_requests",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.requests,
+    ),
+    Wallbox2MetricSensorEntityDescription(
+        key="api_payload",
+        translation_key="api_payload",
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        device_class=SensorDeviceClass.DATA_SIZE,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.payload_bytes,
+    ),
+    Wallbox2MetricSensorEntityDescription(
+        key="sessions_fetched",
+        translation_key="sessions_fetched",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda metrics: metrics.last_sessions_fetched,
+    ),
+    Wallbox2MetricSensorEntityDescription(
+        key="statistics_rows_written",
+        translation_key="statistics_rows_written",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.rows_written,
+    ),
+    Wallbox2MetricSensorEntityDescription(
+        key="api_retries",
+        translation_key="api_retries",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.retries,
+    ),
+    Wallbox2MetricSensorEntityDescription(
+        key="api_rate_limit_hits",
+        translation_key="api_rate_limit_hits",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.rate_limit_hits,
+    ),
+)
+
+
 class Wallbox2Sensor(Wallbox2Entity, WallboxSensor):
     pass
 
 
+class Wallbox2MetricSensor(Wallbox2Entity, SensorEntity):
+    """Performance counter of the integration itself, disabled by default."""
+
+    entity_description: Wallbox2MetricSensorEntityDescription
+
+    def __init__(self, coordinator: Wallbox2Coordinator, description: Wallbox2MetricSensorEntityDescription) -> None:
+        super().__init__(coordinator)
+        self.entity_description = description
+        self._attr_unique_id = f"{description.key}-{coordinator.data[CHARGER_DATA_KEY][CHARGER_SERIAL_NUMBER_KEY]}"
+
+    @property
+    def available(self) -> bool:
+        # counters stay meaningful while the API is failing, that is when they are most interesting
+        return True
+
+    @property
+    def native_value(self) -> StateType:
+        return self.entity_description.value_fn(self.coordinator.metrics)
+
+
 class WallboxEnergySensor(Wallbox2Entity, SensorEntity):
 
     def __init__(self, coordinator: Wallbox2Coordinator) -> None:
@@ -60,27 +155,21 @@ class WallboxEnergySensor(Wallbox2Entity, SensorEntity):
     def native_unit_of_measurement(self) -> str | None:
         return self.entity_description.native_unit_of_measurement
 
-    @staticmethod
-    def _date_and_hour(timestamp: int):
-        dt = utc_from_timestamp(timestamp)
-        return dt.date(), dt.hour
-
     def _handle_coordinator_update(self) -> None:
-        energy_sessions = self.coordinator.data[SESSION_ENERGY]
-        if len(energy_sessions) > 0:
-            total_energy = self.coordinator.data[SESSION_ENERGY + "_total"]
-            entity_id = self.coordinator.data[SESSION_ENERGY + "_entity_id"]
-            _LOGGER.warning(f"Saving {len(energy_sessions)} sessions from {total_energy}")
+        rows = self.coordinator.data[SESSION_ENERGY]
+        ledger = self.coordinator.data.get(SESSION_ENERGY_LEDGER)
+        if len(rows) > 0 and ledger is not None:
+            entity_id = ledger.entity_id
+            _LOGGER.warning(f"Saving {len(rows)} hours from {utc_from_timestamp(rows[0][0])}")
 
             stats = []
-            for (day, hour), sessions in groupby(
-                    sorted(energy_sessions, key=lambda s: s[SESSION_ATTRIBUTES][SESSION_TIME]),
-                    key=lambda s: self._date_and_hour(s[SESSION_ATTRIBUTES][SESSION_TIME])
-            ):
-                energy = sum(s[SESSION_ATTRIBUTES][SESSION_ENERGY] for s in sessions)
-                total_energy += energy
-                stats.append(StatisticData(start=datetime.combine(day, time(hour, 0, 0), tzinfo=UTC), state=energy, sum=total_energy))
-                _LOGGER.info(f"Stats @ {day}/{hour} = +{energy} -> {total_energy}")
-
-            meta = StatisticMetaData(statistic_id=entity_id, source=RECORDER_DOMAIN, name='Total energy', has_sum=True, mean_type=StatisticMeanType.NONE, unit_of_measurement=UnitOfEnergy.WATT_HOUR, unit_class=EnergyConverter.UNIT_CLASS)
-            async_import_statistics(self.coordinator._hass, meta, stats)
+            for hour, energy, total_energy in rows:
+                stats.append(StatisticData(start=utc_from_timestamp(hour), state=energy, sum=total_energy))
+                _LOGGER.info(f"Stats @ {utc_from_timestamp(hour)} = +{energy} -> {total_energy}")
+
+            meta = energy_statistic_metadata(entity_id)
+            with self.coordinator.metrics.timed(PHASE_IMPORT_STATISTICS):
+                async_import_statistics(self.coordinator._hass, meta, stats)
+            self.coordinator.metrics.rows_written += len(stats)
+        if ledger is not None:
+            self.coordinator.async_commit_ledger(ledger)
@@ -0,0 +1,87 @@
+from datetime import date
+
+import voluptuous as vol
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse, callback
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.util.dt import as_timestamp, start_of_local_day, utcnow
+
+from .archive import async_query_archive
+from .const import (
+    ATTR_CONFIG_ENTRY_ID,
+    ATTR_END_DATE,
+    ATTR_GROUP_BY,
+    ATTR_START_DATE,
+    CONF_STATION,
+    DOMAIN,
+    FIRST_SESSION_TIME,
+    SERVICE_BACKFILL_SESSIONS,
+    SERVICE_QUERY_SESSIONS,
+    GroupBy,
+)
+from .coordinator import Wallbox2ConfigEntry
+
+SERVICE_BACKFILL_SESSIONS_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_START_DATE): cv.date,
+        vol.Optional(ATTR_END_DATE): cv.date,
+    }
+)
+
+SERVICE_QUERY_SESSIONS_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_START_DATE): cv.date,
+        vol.Optional(ATTR_END_DATE): cv.date,
+        vol.Optional(ATTR_GROUP_BY, default=GroupBy.MONTH): vol.Coerce(GroupBy),
+    }
+)
+
+
+def _get_entry(hass: HomeAssistant, entry_id: str) -> Wallbox2ConfigEntry:
+    entry = hass.config_entries.async_get_entry(entry_id)
+    if entry is None or entry.domain != DOMAIN or entry.state is not ConfigEntryState.LOADED:
+        raise ServiceValidationError(
+            translation_domain=DOMAIN, translation_key="entry_not_loaded", translation_placeholders={"entry_id": entry_id}
+        )
+    return entry
+
+
+def _day_start(day: date) -> int:
+    return int(as_timestamp(start_of_local_day(day)))
+
+
+async def _async_backfill_sessions(call: ServiceCall) -> None:
+    entry = _get_entry(call.hass, call.data[ATTR_CONFIG_ENTRY_ID])
+    start = _day_start(call.data[ATTR_START_DATE]) if ATTR_START_DATE in call.data else FIRST_SESSION_TIME
+    # the end date is included
+    end = _day_start(call.data[ATTR_END_DATE]) + 86400 if ATTR_END_DATE in call.data else int(utcnow().timestamp())
+    entry.runtime_data.backfill.async_start(start, end)
+
+
+async def _async_query_sessions(call: ServiceCall) -> ServiceResponse:
+    """Aggregate the archived sessions of one charger, or of all of them, without asking the cloud."""
+    charger_ids = None
+    if ATTR_CONFIG_ENTRY_ID in call.data:
+        charger_ids = [int(_get_entry(call.hass, call.data[ATTR_CONFIG_ENTRY_ID]).data[CONF_STATION])]
+    start = _day_start(call.data[ATTR_START_DATE]) if ATTR_START_DATE in call.data else None
+    end = _day_start(call.data[ATTR_END_DATE]) + 86400 if ATTR_END_DATE in call.data else None
+    periods = await async_query_archive(call.hass, charger_ids, start, end, call.data[ATTR_GROUP_BY])
+    return {"periods": periods}
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    hass.services.async_register(
+        DOMAIN, SERVICE_BACKFILL_SESSIONS, _async_backfill_sessions, schema=SERVICE_BACKFILL_SESSIONS_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_QUERY_SESSIONS,
+        _async_query_sessions,
+        schema=SERVICE_QUERY_SESSIONS_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
@@ -0,0 +1,153 @@
+import asyncio
+from array import array
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util.hass_dict import HassKey
+
+from .api import Wallbox2Api
+from .const import (
+    DOMAIN,
+    SESSIONS_DATA,
+    SESSIONS_PAGE_SIZE,
+    SESSION_ATTRIBUTES,
+    SESSION_CHARGER_ID,
+    SESSION_COST,
+    SESSION_END_TIME,
+    SESSION_ENERGY,
+    SESSION_GREEN_ENERGY,
+    SESSION_GRID_ENERGY,
+    SESSION_ID,
+    SESSION_TIME,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_SESSION_FETCHERS: HassKey[dict[str, "Wallbox2SessionFetcher"]] = HassKey(f"{DOMAIN}_session_fetchers")
+
+
+@dataclass
+class ChargerSessions:
+    """Sessions of one charger kept as compact columns."""
+
+    ids: list[Any] = field(default_factory=list)
+    start: array = field(default_factory=lambda: array("q"))
+    end: array = field(default_factory=lambda: array("q"))
+    energy: array = field(default_factory=lambda: array("d"))
+    green_energy: array = field(default_factory=lambda: array("d"))
+    grid_energy: array = field(default_factory=lambda: array("d"))
+    cost: array = field(default_factory=lambda: array("d"))
+
+    def add(self, session: dict[str, Any]) -> None:
+        attributes = session[SESSION_ATTRIBUTES]
+        self.ids.append(session[SESSION_ID])
+        self.start.append(attributes[SESSION_TIME])
+        self.end.append(attributes.get(SESSION_END_TIME) or attributes[SESSION_TIME])
+        self.energy.append(attributes[SESSION_ENERGY])
+        self.green_energy.append(attributes.get(SESSION_GREEN_ENERGY) or 0)
+        self.grid_energy.append(attributes.get(SESSION_GRID_ENERGY) or 0)
+        self.cost.append(attributes.get(SESSION_COST) or 0)
+
+    def since(self, start_time: int) -> "ChargerSessions":
+        selected = np.flatnonzero(np.asarray(self.start) >= start_time)
+        return ChargerSessions(
+            [self.ids[i] for i in selected],
+            *(array(column.typecode, np.asarray(column)[selected].tobytes()) for column in self._columns()),
+        )
+
+    def _columns(self) -> tuple[array, ...]:
+        return self.start, self.end, self.energy, self.green_energy, self.grid_energy, self.cost
+
+
+class Wallbox2SessionFetcher:
+    """Fetches the charging sessions of all chargers in a Wallbox group with a single request per hour.
+
+    Sessions are requested up to the last full hour, so every coordinator polling within the same hour is
+    served from the same fetch.
+    """
+
+    def __init__(self, group_id: str) -> None:
+        self._group_id = group_id
+        self._start_times: dict[int, int | None] = {}
+        self._lock = asyncio.Lock()
+        self._fetched_start: int | None = None
+        self._fetched_end: int | None = None
+        self._fetched: dict[int, ChargerSessions] = {}
+
+    def register(self, charger_id: int) -> None:
+        self._start_times.setdefault(charger_id, None)
+
+    def unregister(self, charger_id: int) -> bool:
+        """Forget the charger, returns whether the fetcher is still used."""
+        self._start_times.pop(charger_id, None)
+        self._fetched.pop(charger_id, None)
+        return len(self._start_times) > 0
+
+    async def async_get_sessions(self, api: Wallbox2Api, charger_id: int, start_time: int, end_time: int) -> ChargerSessions:
+        self._start_times[charger_id] = start_time
+        async with self._lock:
+            if (
+                    self._fetched_end != end_time
+                    or self._fetched_start is None
+                    or self._fetched_start > start_time
+                    or charger_id not in self._fetched
+            ):
+                await self._async_fetch(api, end_time)
+            return self._fetched[charger_id].since(start_time)
+
+    async def _async_fetch(self, api: Wallbox2Api, end_time: int) -> None:
+        start_time = min(t for t in self._start_times.values() if t is not None)
+        charger_ids = list(self._start_times)
+        self._fetched = await async_fetch_sessions(api, self._group_id, charger_ids, start_time, end_time)
+        self._fetched_start = start_time
+        self._fetched_end = end_time
+
+
+async def async_fetch_sessions(
+        api: Wallbox2Api, group_id: str, charger_ids: list[int], start_time: int, end_time: int
+) -> dict[int, ChargerSessions]:
+    """Page through the sessions of the given chargers in the group starting within [start_time, end_time).
+
+    Only one page of decoded JSON is held at a time, bounded by SESSIONS_PAGE_SIZE: each is folded into the compact
+    per charger sessions before the next one is requested.
+    """
+    filters = json.dumps({
+        "filters": [
+            {"field": "start_time", "operator": "gte", "value": start_time},
+            {"field": "start_time", "operator": "lt", "value": end_time},
+            {"field": "charger_id", "operator": "in", "value": charger_ids},
+        ]
+    })
+    fetched = {charger_id: ChargerSessions() for charger_id in charger_ids}
+    offset = 0
+    while True:
+        page = (await api.async_get_sessions_page(group_id, filters, SESSIONS_PAGE_SIZE, offset))[SESSIONS_DATA]
+        _LOGGER.debug(f"Received page of {len(page)} sessions of group {group_id} at offset {offset}")
+        for session in page:
+            if (charger_sessions := fetched.get(session[SESSION_ATTRIBUTES][SESSION_CHARGER_ID])) is not None:
+                charger_sessions.add(session)
+        if len(page) < SESSIONS_PAGE_SIZE:
+            break
+        offset += len(page)
+    _LOGGER.info(f"Fetched sessions of chargers {charger_ids} in group {group_id} from {start_time} to {end_time}")
+    return fetched
+
+
+def async_get_session_fetcher(hass: HomeAssistant, group_id: str, charger_id: int) -> Wallbox2SessionFetcher:
+    """Return the fetcher shared by all config entries of the group."""
+    fetchers = hass.data.setdefault(DATA_SESSION_FETCHERS, {})
+    if (fetcher := fetchers.get(group_id)) is None:
+        fetcher = fetchers[group_id] = Wallbox2SessionFetcher(group_id)
+    fetcher.register(charger_id)
+    return fetcher
+
+
+def async_release_session_fetcher(hass: HomeAssistant, group_id: str, charger_id: int) -> None:
+    fetchers = hass.data.get(DATA_SESSION_FETCHERS, {})
+    if (fetcher := fetchers.get(group_id)) is not None and not fetcher.unregister(charger_id):
+        del fetchers[group_id]
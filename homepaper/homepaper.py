@@ -5,47 +5,118 @@
 #cp e-Paper/RaspberryPi_JetsonNano/python/pic/100x100.bmp .
 #waveshare_epd/epd3in52.py
 
+import logging
 import os
 from waveshare_epd import epd3in52
-import time
 from PIL import Image, ImageFont, ImageDraw
-import requests
+import aiohttp
 import asyncio
 
-STATES_URL = 'https://hass.mareksmid.cz/api/states/'
-INTERVAL_SECS = 30
+WEBSOCKET_URL = 'wss://hass.mareksmid.cz/api/websocket'
 TOKEN = os.environ['HASS_TOKEN']
+# a burst of changes (e.g. all the PV sensors of one inverter poll) makes one redraw once no diff came for this long
+DEBOUNCE_SECS = 2
+# sensors changing every second would never go quiet, redraw after this long regardless
+DEBOUNCE_MAX_SECS = 10
+# a refresh of the e-paper takes seconds and wears it out, the power sensors change every few seconds
+MIN_REDRAW_SECS = 15
+RECONNECT_MIN_SECS = 1
+RECONNECT_MAX_SECS = 300
 
+_LOGGER = logging.getLogger(__name__)
 
-def get_state(entity_id: str, attribute: str = None, unit: str = None):
-    resp = requests.get(STATES_URL + entity_id, headers={"Authorization": f"Bearer {TOKEN}"})
-    if resp.status_code == 200:
-        data = resp.json()
-        if unit is None:
-            unit = data['attributes']['unit_of_measurement']
-        if attribute is None:
-            value = data['state']
-        else:
-            value = data['attributes'][attribute]
-        return f"{value} {unit}"
-    else:
+# label, entity, attribute (state when None), unit (unit_of_measurement when None)
+LAYOUT = [
+    ('Venkovni teplota', 'sensor.temperature_out_temperature', None, None),
+    ('Vnitrni teplota', 'sensor.temperature_in_temperature', None, None),
+    ('Termostat pro kotel', 'climate.dum', 'current_temperature', '°C'),  # icon: mdi:thermometer
+    ('Hladina', 'sensor.hladina', None, None),  # icon: mdi:water
+    ('Ele. vyroba', 'sensor.pv_power', None, None),
+    ('Ele. spotreba', 'sensor.house_consumption', None, None),
+    ('Ele. dnes vyrobeno', 'sensor.today_s_pv_generation', None, None),
+    ('Baterie', 'sensor.battery_state_of_charge', None, None),
+    ('Wallbox vykon', 'sensor.wallbox2_copper_business_sn_443968_nabijeci_vykon', None, None),
+]
+
+# entity_id -> {'s': state, 'a': attributes}, kept across reconnects so the display shows the last known values offline
+states: dict[str, dict] = {}
+changed = asyncio.Event()
+
+
+def format_value(entity_id: str, attribute: str = None, unit: str = None) -> str:
+    entity = states.get(entity_id)
+    if entity is None:
+        return '---'
+    attributes = entity.get('a', {})
+    if unit is None:
+        unit = attributes.get('unit_of_measurement', '')
+    value = entity.get('s') if attribute is None else attributes.get(attribute)
+    if value is None:
         return '---'
+    return f"{value} {unit}".strip()
+
+
+def render() -> dict[str, str]:
+    return {label: format_value(entity_id, attribute, unit) for label, entity_id, attribute, unit in LAYOUT}
+
+
+def apply_event(event: dict) -> None:
+    """Apply a subscribe_entities event: 'a' adds full states, 'c' carries diffs, 'r' removes entities."""
+    for entity_id, entity in event.get('a', {}).items():
+        states[entity_id] = {'s': entity.get('s'), 'a': entity.get('a', {})}
+    for entity_id, diff in event.get('c', {}).items():
+        entity = states.setdefault(entity_id, {'s': None, 'a': {}})
+        if '+' in diff:
+            entity['s'] = diff['+'].get('s', entity['s'])
+            entity['a'] = {**entity['a'], **diff['+'].get('a', {})}
+        if '-' in diff:
+            entity['a'] = {k: v for k, v in entity['a'].items() if k not in diff['-'].get('a', [])}
+    for entity_id in event.get('r', []):
+        states.pop(entity_id, None)
+    changed.set()
 
 
-def fetch():
-    return {
-        'Venkovni teplota': get_state('sensor.temperature_out_temperature'),
-        'Vnitrni teplota': get_state('sensor.temperature_in_temperature'),
-        'Termostat pro kotel':  get_state("climate.dum", "current_temperature", "°C"),  # icon: mdi:thermometer
-        'Hladina': get_state('sensor.hladina'), # icon: mdi:water
-        'Ele. vyroba': get_state('sensor.pv_power'),
-        'Ele. spotreba': get_state('sensor.house_consumption'),
-        'Ele. dnes vyrobeno': get_state('sensor.today_s_pv_generation'),
-        'Baterie': get_state('sensor.battery_state_of_charge'),
-        'Wallbox vykon': get_state('sensor.wallbox2_copper_business_sn_443968_nabijeci_vykon'),
-    }
-
-async def disp(epd, data: dict[str, str]) -> None:
+async def subscribe(session: aiohttp.ClientSession) -> None:
+    """One websocket connection, subscribed to the entities of the layout until it drops."""
+    async with session.ws_connect(WEBSOCKET_URL, heartbeat=30) as ws:
+        message = await ws.receive_json()
+        if message['type'] != 'auth_required':
+            raise ConnectionError(f"Unexpected message {message['type']}")
+        await ws.send_json({'type': 'auth', 'access_token': TOKEN})
+        message = await ws.receive_json()
+        if message['type'] != 'auth_ok':
+            raise ConnectionError(f"Authentication failed: {message.get('message')}")
+        entity_ids = sorted({entity_id for _, entity_id, _, _ in LAYOUT})
+        await ws.send_json({'id': 1, 'type': 'subscribe_entities', 'entity_ids': entity_ids})
+        _LOGGER.info(f"Subscribed to {len(entity_ids)} entities")
+        async for msg in ws:
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                break
+            message = msg.json()
+            if message['type'] == 'result' and not message['success']:
+                raise ConnectionError(f"Subscription failed: {message.get('error')}")
+            if message['type'] == 'event':
+                apply_event(message['event'])
+        raise ConnectionError(f"Connection closed: {ws.close_code}")
+
+
+async def listen() -> None:
+    delay = RECONNECT_MIN_SECS
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(connect=10)) as session:
+        while True:
+            connected = asyncio.get_running_loop().time()
+            try:
+                await subscribe(session)
+            except (aiohttp.ClientError, ConnectionError, asyncio.TimeoutError, ValueError) as e:
+                _LOGGER.warning(f"Websocket: {e!r}, reconnecting in {delay} s")
+            # a connection that lived for a while was fine, start backing off from the beginning
+            if asyncio.get_running_loop().time() - connected > RECONNECT_MAX_SECS:
+                delay = RECONNECT_MIN_SECS
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_SECS)
+
+
+def disp(epd, data: dict[str, str]) -> None:
     image = Image.new('1', (360, 240), 1) # 'RGB', (360, 240), (255, 255, 255)
     fnt = ImageFont.truetype("/usr/local/share/fonts/v/VCR_OSD_MONO_1.001.ttf", 21)
     d = ImageDraw.Draw(image)
@@ -57,16 +128,39 @@ async def disp(epd, data: dict[str, str]) -> None:
     epd.display(epd.getbuffer(image))
     epd.lut_GC()
     epd.refresh()
-    time.sleep(INTERVAL_SECS)
 
 
-async def work(epd):
+async def draw(epd) -> None:
+    """Redraw after a quiet period following a change, and only when a displayed value differs."""
+    shown = None
+    loop = asyncio.get_running_loop()
     while True:
-        data = fetch()
-        await disp(epd, data)
+        await changed.wait()
+        deadline = loop.time() + DEBOUNCE_MAX_SECS
+        # every diff restarts the quiet period
+        while changed.is_set() and loop.time() < deadline:
+            changed.clear()
+            try:
+                await asyncio.wait_for(changed.wait(), min(DEBOUNCE_SECS, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                pass
+        changed.clear()
+        data = render()
+        if data == shown:
+            continue
+        started = loop.time()
+        # the display blocks for seconds, keep receiving events meanwhile
+        await loop.run_in_executor(None, disp, epd, data)
+        shown = data
+        await asyncio.sleep(max(0, MIN_REDRAW_SECS - (loop.time() - started)))
+
+
+async def work(epd):
+    await asyncio.gather(listen(), draw(epd))
 
 
 if __name__ == '__main__':
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(message)s", level=logging.INFO)
     epd = epd3in52.EPD()
     epd.init()
     epd.display_NUM(epd.WHITE)
@@ -0,0 +1,87 @@
+import json
+import os
+import http_client
+
+# Date-keyed on-disk cache of scraped data. Published data of past days never changes and is served without
+# asking the server at all, everything else is revalidated with ETag / Last-Modified.
+
+CACHE_DIR = hass.config.path('pyscript_cache')
+
+
+@pyscript_compile
+def _read(path: str):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        # a torn write from before the atomic replace, or garbage, refetch it
+        os.remove(path)
+        return None
+
+
+@pyscript_compile
+def _write(path: str, data) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+@pyscript_compile
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _path(namespace: str, key: str) -> str:
+    return os.path.join(CACHE_DIR, namespace, f'{key}.json')
+
+
+def load_json(namespace: str, key: str):
+    return await hass.async_add_executor_job(_read, _path(namespace, key))
+
+
+def save_json(namespace: str, key: str, data) -> None:
+    await hass.async_add_executor_job(_write, _path(namespace, key), data)
+
+
+def forget(namespace: str, key: str) -> None:
+    """Drop an entry whose content turned out to be incomplete, e.g. prices fetched before they were published."""
+    await hass.async_add_executor_job(_remove, _path(namespace, key))
+
+
+def fetch(namespace: str, key: str, url: str, immutable: bool) -> str | None:
+    """Body of url, from the cache when immutable, otherwise revalidated. A stale body beats no body on errors."""
+    cached = load_json(namespace, key)
+    if cached is not None and immutable:
+        return cached['body']
+    headers = {}
+    if cached is not None and cached.get('etag'):
+        headers['If-None-Match'] = cached['etag']
+    if cached is not None and cached.get('last_modified'):
+        headers['If-Modified-Since'] = cached['last_modified']
+    try:
+        resp = http_client.get(url, headers=headers)
+    except Exception as e:
+        if cached is None:
+            raise
+        log.warning(f'Fetching {url} failed, using the cached copy: {e}')
+        return cached['body']
+    if resp.status_code == 304:
+        log.debug(f'{url} not modified')
+        return cached['body']
+    if resp.status_code != 200:
+        log.warning(f'Fetching {url} failed: {resp.status_code}')
+        return None if cached is None else cached['body']
+    save_json(namespace, key, {
+        'url': url,
+        'body': resp.text,
+        'etag': resp.headers.get('ETag'),
+        'last_modified': resp.headers.get('Last-Modified'),
+    })
+    return resp.text
@@ -0,0 +1,215 @@
+import socket
+from functools import partial
+from requests import Response
+
+# Shared HTTP client of the pyscript scrapers: one keep-alive pool for all of them, a DNS cache, and a per-host
+# address family policy instead of disabling IPv6 for the whole Home Assistant process.
+
+DNS_TTL = 300.0
+# how long a connection attempt gets before the next address is tried in parallel (RFC 8305)
+HAPPY_EYEBALLS_DELAY = 0.25
+TIMEOUT = (10.0, 60.0)
+RETRIES = 5
+BACKOFF_FACTOR = 2.0
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# hosts whose IPv6 is known to be broken, others start with the family that connected last
+FAMILY_PREFERENCE = {
+    'www.cnb.cz': socket.AF_INET,
+    'www.ote-cr.cz': socket.AF_INET,
+}
+
+
+@pyscript_compile
+def _create_client(family_preference: dict):
+    import errno
+    import selectors
+    import threading
+    from time import monotonic, perf_counter
+    from urllib.parse import urlsplit
+
+    from requests import Session
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+    from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+    from urllib3.util.retry import Retry
+
+    class Resolver:
+        """getaddrinfo with a TTL, serving the stale addresses when the lookup fails."""
+
+        def __init__(self):
+            self._lock = threading.Lock()
+            self._cache = {}
+            self.last_family = {}
+
+        def resolve(self, host, port):
+            key = (host, port)
+            with self._lock:
+                cached = self._cache.get(key)
+            if cached is not None and cached[0] > monotonic():
+                return cached[1]
+            try:
+                infos = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+            except OSError:
+                if cached is None:
+                    raise
+                return cached[1]
+            with self._lock:
+                self._cache[key] = (monotonic() + DNS_TTL, infos)
+            return infos
+
+        def ordered(self, host, infos):
+            """Preferred family first, then alternating between the families."""
+            preferred = family_preference.get(host) or self.last_family.get(host, socket.AF_INET6)
+            first = [info for info in infos if info[0] == preferred]
+            second = [info for info in infos if info[0] != preferred]
+            result = []
+            for i in range(max(len(first), len(second))):
+                result.extend(info[i] for info in (first, second) if i < len(info))
+            return result
+
+    resolver = Resolver()
+
+    def connect(host, port, timeout, socket_options):
+        """Happy eyeballs: start the next address whenever the previous ones did not connect within the delay."""
+        infos = resolver.ordered(host, resolver.resolve(host, port))
+        deadline = None if timeout is None else monotonic() + timeout
+        selector = selectors.DefaultSelector()
+        error = None
+        try:
+            while infos or selector.get_map():
+                if infos:
+                    family, type_, proto, _, address = infos.pop(0)
+                    sock = socket.socket(family, type_, proto)
+                    for option in socket_options or ():
+                        sock.setsockopt(*option)
+                    sock.setblocking(False)
+                    result = sock.connect_ex(address)
+                    if result not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+                        sock.close()
+                        error = OSError(result, f'{address[0]}: {errno.errorcode.get(result, result)}')
+                        continue
+                    selector.register(sock, selectors.EVENT_WRITE, family)
+                wait = HAPPY_EYEBALLS_DELAY if infos else None
+                if deadline is not None:
+                    remaining = deadline - monotonic()
+                    if remaining <= 0:
+                        raise socket.timeout(f'Connecting to {host} timed out')
+                    wait = remaining if wait is None else min(wait, remaining)
+                for key, _ in selector.select(wait):
+                    sock = key.fileobj
+                    selector.unregister(sock)
+                    result = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                    if result != 0:
+                        sock.close()
+                        error = OSError(result, errno.errorcode.get(result, str(result)))
+                        continue
+                    sock.setblocking(True)
+                    sock.settimeout(timeout)
+                    resolver.last_family[host] = key.data
+                    return sock
+            raise error or OSError(f'No address of {host} to connect to')
+        finally:
+            for key in list(selector.get_map().values()):
+                key.fileobj.close()
+            selector.close()
+
+    def new_conn(self):
+        timeout = self.timeout if isinstance(self.timeout, (int, float)) else None
+        try:
+            return connect(self._dns_host, self.port, timeout, self.socket_options)
+        except socket.timeout as e:
+            raise ConnectTimeoutError(self, f'Connection to {self.host} timed out. (connect timeout={timeout})') from e
+        except OSError as e:
+            raise NewConnectionError(self, f'Failed to establish a new connection: {e}') from e
+
+    class EyeballsHTTPConnection(HTTPConnection):
+        _new_conn = new_conn
+
+    class EyeballsHTTPSConnection(HTTPSConnection):
+        _new_conn = new_conn
+
+    class EyeballsHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = EyeballsHTTPConnection
+
+    class EyeballsHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = EyeballsHTTPSConnection
+
+    class EyeballsAdapter(HTTPAdapter):
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = {'http': EyeballsHTTPConnectionPool, 'https': EyeballsHTTPSConnectionPool}
+
+    class Client:
+        def __init__(self):
+            self._session = Session()
+            retry = Retry(total=RETRIES, backoff_factor=BACKOFF_FACTOR, status_forcelist=RETRY_STATUSES, raise_on_status=False)
+            adapter = EyeballsAdapter(max_retries=retry)
+            self._session.mount('http://', adapter)
+            self._session.mount('https://', adapter)
+            self._lock = threading.Lock()
+            self._stats = {}
+
+        def get(self, url, **kwargs):
+            kwargs.setdefault('timeout', TIMEOUT)
+            host = urlsplit(url).hostname
+            started = perf_counter()
+            resp = None
+            try:
+                resp = self._session.get(url, **kwargs)
+                return resp
+            finally:
+                self._record(host, perf_counter() - started, resp)
+
+        def _record(self, host, seconds, resp):
+            retries = getattr(resp.raw, 'retries', None) if resp is not None else None
+            with self._lock:
+                s = self._stats.setdefault(host, {'requests': 0, 'failures': 0, 'retries': 0, 'bytes': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+                s['requests'] += 1
+                s['seconds'] += seconds
+                s['max_seconds'] = max(s['max_seconds'], seconds)
+                if resp is None or resp.status_code >= 400:
+                    s['failures'] += 1
+                else:
+                    s['bytes'] += len(resp.content)
+                if retries is not None:
+                    s['retries'] += len(retries.history)
+
+        def stats(self):
+            with self._lock:
+                return {
+                    host: dict(s, family={socket.AF_INET: 'ipv4', socket.AF_INET6: 'ipv6'}.get(resolver.last_family.get(host)))
+                    for host, s in self._stats.items()
+                }
+
+        def close(self):
+            self._session.close()
+
+    return Client()
+
+
+_client = _create_client(FAMILY_PREFERENCE)
+
+
+def get(url: str, **kwargs) -> Response:
+    return await hass.async_add_executor_job(partial(_client.get, url, **kwargs))
+
+
+def stats() -> dict[str, dict]:
+    """Requests, failures, retries, bytes and seconds per host since the module was loaded."""
+    return _client.stats()
+
+
+def publish() -> None:
+    """Publish the stats as sensor.pyscript_http_<host>, the mean request latency with the counters as attributes."""
+    for host, s in stats().items():
+        slug = host.replace('.', '_').replace('-', '_')
+        state.set(f'sensor.pyscript_http_{slug}', round(s['seconds'] / s['requests'], 3), {
+            'friendly_name': f'{host} request duration',
+            'unit_of_measurement': 's',
+            'device_class': 'duration',
+            'state_class': 'measurement',
+            **s,
+            'seconds': round(s['seconds'], 3),
+            'max_seconds': round(s['max_seconds'], 3),
+        })
@@ -0,0 +1,89 @@
+from contextvars import ContextVar
+from time import perf_counter
+import http_client
+
+# Per trigger and per phase wall time, bytes, rows and failures of the pyscript triggers, published as sensors.
+# The sensors are measurements, so the recorder keeps long-term statistics of them as well.
+#
+#   run = instrumentation.start('scrape_electricity')
+#   phase = instrumentation.begin('cnb_fetch')
+#   ...
+#   instrumentation.end(phase, bytes=len(resp.content))
+#   instrumentation.finish(run)
+#
+# Phases are recorded into the run started last in the same task, anywhere down the call chain. Finishing a run
+# also refreshes the per host sensors of the shared HTTP client.
+
+SLOW_PHASE_SECONDS = 30.0
+
+_current_run = ContextVar('pyscript_instrumentation_run', default=None)
+# runs and failures of each trigger since the module was loaded
+_totals = {}
+
+
+@pyscript_compile
+def start(trigger: str) -> dict:
+    run = {'trigger': trigger, 'started': perf_counter(), 'phases': {}, 'failed': False}
+    _current_run.set(run)
+    return run
+
+
+@pyscript_compile
+def begin(phase: str) -> tuple:
+    return phase, perf_counter()
+
+
+@pyscript_compile
+def end(token: tuple, bytes: int = 0, rows_read: int = 0, rows_written: int = 0, failed: bool = False) -> float:
+    """Add the phase to the current run, a phase run several times in one run adds up."""
+    phase, started = token
+    seconds = perf_counter() - started
+    run = _current_run.get()
+    if run is None:
+        return seconds
+    p = run['phases'].setdefault(phase, {'seconds': 0.0, 'calls': 0, 'bytes': 0, 'rows_read': 0, 'rows_written': 0, 'failures': 0})
+    p['seconds'] += seconds
+    p['calls'] += 1
+    p['bytes'] += bytes
+    p['rows_read'] += rows_read
+    p['rows_written'] += rows_written
+    if failed:
+        p['failures'] += 1
+        run['failed'] = True
+    return seconds
+
+
+def finish(run: dict, error: Exception | None = None) -> None:
+    """Publish the run, sensor.pyscript_<trigger>_duration and one sensor per phase."""
+    seconds = perf_counter() - run['started']
+    trigger = run['trigger']
+    totals = _totals.setdefault(trigger, {'runs': 0, 'failures': 0, 'last_error': None})
+    totals['runs'] += 1
+    if error is not None or run['failed']:
+        totals['failures'] += 1
+        totals['last_error'] = str(error) if error is not None else 'phase failed'
+    phases = run['phases']
+    # the attributes stay small and mostly unchanged, the recorder keeps a new attributes row whenever they change
+    state.set(f'sensor.pyscript_{trigger}_duration', round(seconds, 3), {
+        'friendly_name': f'{trigger} duration',
+        'unit_of_measurement': 's',
+        'device_class': 'duration',
+        'state_class': 'measurement',
+        'bytes': sum(p['bytes'] for p in phases.values()),
+        'rows_read': sum(p['rows_read'] for p in phases.values()),
+        'rows_written': sum(p['rows_written'] for p in phases.values()),
+        **totals,
+    })
+    # the breakdown, one sensor per phase
+    for name, p in phases.items():
+        state.set(f'sensor.pyscript_{trigger}_{name}_duration', round(p['seconds'], 3), {
+            'friendly_name': f'{trigger} {name} duration',
+            'unit_of_measurement': 's',
+            'device_class': 'duration',
+            'state_class': 'measurement',
+            **{key: value for key, value in p.items() if key != 'seconds'},
+        })
+        if p['seconds'] > SLOW_PHASE_SECONDS:
+            log.warning(f'{trigger} spent {p["seconds"]:.1f} s in {name}')
+    http_client.publish()
+    _current_run.set(None)
@@ -1,20 +1,28 @@
-from requests import Session, Response
-from requests.adapters import HTTPAdapter, Retry
 from datetime import date, datetime, time, timedelta
 from homeassistant.components.recorder import get_instance
 from homeassistant.components.recorder.models import StatisticMetaData, StatisticData
-from homeassistant.components.recorder.statistics import async_add_external_statistics, get_last_statistics, statistics_during_period
+from homeassistant.components.recorder.statistics import async_add_external_statistics, async_adjust_statistics, get_last_statistics, statistics_during_period
 from homeassistant.components.recorder.history import get_significant_states
-from homeassistant.util.dt import now, as_utc, as_local, DEFAULT_TIME_ZONE
+from homeassistant.util.dt import now, as_local, as_utc, utc_from_timestamp, DEFAULT_TIME_ZONE
 from bisect import bisect_right
-from itertools import islice
+import json
+import numpy as np
+import http_cache
+import http_client
+import instrumentation
 
 # 'select.inverter_operation_mode'
 # 'number.goodwe_eco_mode_soc'
 # 'number.goodwe_eco_mode_power'
 
-CNB_EUR_PRICE_URL_PATTERN = 'https://www.cnb.cz/cs/financni-trhy/devizovy-trh/kurzy-devizoveho-trhu/kurzy-devizoveho-trhu/vybrane.txt?od={}&do={}&mena=EUR&format=txt'
-OTE_SPOT_ELE_PRICE_URL_PATTERN = 'https://www.ote-cr.cz/cs/kratkodobe-trhy/elektrina/denni-trh/@@chart-data?report_date={}'
+# the sources can be pointed elsewhere in the pyscript configuration, the benchmarks use local stand-ins:
+# pyscript:
+#   scrape_electricity:
+#     cnb_url: http://127.0.0.1:8098/vybrane.txt?od={}&do={}
+#     ote_url: http://127.0.0.1:8098/chart-data?report_date={}
+SCRAPE_CONFIG = pyscript.config.get('scrape_electricity', {})
+CNB_EUR_PRICE_URL_PATTERN = SCRAPE_CONFIG.get('cnb_url', 'https://www.cnb.cz/cs/financni-trhy/devizovy-trh/kurzy-devizoveho-trhu/kurzy-devizoveho-trhu/vybrane.txt?od={}&do={}&mena=EUR&format=txt')
+OTE_SPOT_ELE_PRICE_URL_PATTERN = SCRAPE_CONFIG.get('ote_url', 'https://www.ote-cr.cz/cs/kratkodobe-trhy/elektrina/denni-trh/@@chart-data?report_date={}')
 EXPORT_ENTITY_ID = 'sensor.meter_total_energy_export'
 ELE_PRICE_STAT_ID = 'ote:electricity_price'
 ELE_PRICE_SOURCE = 'ote'
@@ -26,30 +34,80 @@ EXPORT_LIMIT_ENTITY_ID = 'number.grid_export_limit'
 EXPORT_LIMIT_MAX = '6000.0'
 
 DAY_DELTA = timedelta(days=1)
-HTTP_ADAPTER = HTTPAdapter(max_retries=Retry(total=5, backoff_factor=2.0))
+# published prices by local day: start timestamp, prices, interval in seconds
+price_schedule = {}
+# precomputed windows of the same days, see build_price_index
+price_index = {}
+WINDOW_SENSOR_HOURS = (1, 2, 3, 4)
+# long enough to reach back over Easter
+CNB_RATE_LOOKBACK = timedelta(days=5)
+OTE_PRICE_LINE = 1
+# interval of the recorder's short-term statistics, also the finest price resolution accepted
+SHORT_TERM_STEP = 300
+INCOME_EPSILON = 1e-6
 
 
-def get_eur_rate(day: date) -> float|None:
-    from_day_str = (day - timedelta(days=2)).strftime('%d.%m.%Y')
-    day_str = day.strftime('%d.%m.%Y')
-    url = CNB_EUR_PRICE_URL_PATTERN.format(from_day_str, day_str)
-    resp = http_get(url)
-    if resp.status_code == 200:
-        line = resp.text.strip().split('\n')[-1].strip().split('|')
-        log.info(f'Read EUR rate from CNB of {line[1]} on {line[0]}')
-        return float(line[1].replace(',', '.'))
+def get_eur_rates(start: date, end: date) -> dict[date, float]:
+    """EUR rates published from start to end, both included. CNB publishes on working days only.
+
+    Rates of past days are cached as one contiguous span, a miss fetches what the span lacks in one request.
+    """
+    cached = http_cache.load_json('cnb', 'eur')
+    today = now().date()
+    if cached is None:
+        rates, cached_from, od, do = {}, start, start, end
     else:
-        log.warning(f'Failed to get EUR rate for URL={url}, status={resp.status_code}')
+        rates, cached_from, until = cached['rates'], date.fromisoformat(cached['from']), date.fromisoformat(cached['until'])
+        if cached_from <= start and end < until:
+            return {date.fromisoformat(d): r for d, r in rates.items() if start.isoformat() <= d <= end.isoformat()}
+        if start < cached_from:
+            cached_from, od, do = start, start, max(end, until - DAY_DELTA)
+        else:
+            od, do = until, end
+    url = CNB_EUR_PRICE_URL_PATTERN.format(od.strftime('%d.%m.%Y'), do.strftime('%d.%m.%Y'))
+    phase = instrumentation.begin('cnb_fetch')
+    try:
+        resp = http_client.get(url)
+    except Exception:
+        instrumentation.end(phase, failed=True)
+        raise
+    instrumentation.end(phase, bytes=len(resp.content), failed=resp.status_code != 200)
+    if resp.status_code != 200:
+        log.warning(f'Failed to get EUR rates for URL={url}, status={resp.status_code}')
+        return {date.fromisoformat(d): r for d, r in rates.items() if start.isoformat() <= d <= end.isoformat()}
+    for line in resp.text.strip().split('\n'):
+        parts = line.strip().split('|')
+        try:
+            day = datetime.strptime(parts[0], '%d.%m.%Y').date()
+        except ValueError:
+            # the currency and column headers
+            continue
+        rates[day.isoformat()] = float(parts[1].replace(',', '.'))
+    log.info(f'Read EUR rates from CNB from {od} to {do}')
+    # today's rate may still be published later
+    http_cache.save_json('cnb', 'eur', {'from': cached_from.isoformat(), 'until': min(do + DAY_DELTA, today).isoformat(), 'rates': rates})
+    return {date.fromisoformat(d): r for d, r in rates.items() if start.isoformat() <= d <= end.isoformat()}
+
+
+def get_eur_rate(day: date) -> float|None:
+    """The rate valid on day, i.e. the last one published on or before it."""
+    rates = get_eur_rates(day - CNB_RATE_LOOKBACK, day)
+    if not rates:
+        log.warning(f'No EUR rate found for {day}')
         return None
+    rate_day = max(rates)
+    log.info(f'Read EUR rate from CNB of {rates[rate_day]} on {rate_day}')
+    return rates[rate_day]
 
 
-def get_power(day: date, hours_overlap: int = 6) -> dict[datetime, float]:
-    dt = day_with_hour_utc(day, hour=0)
+def get_meter_series(start: datetime, end: datetime, hours_overlap: int = 6):
+    """Timestamps and readings of the export meter around start - end, as numpy arrays."""
+    phase = instrumentation.begin('significant_states')
     states = await get_instance(hass).async_add_executor_job(
         get_significant_states,
         hass,
-        dt - timedelta(hours=hours_overlap),
-        dt + timedelta(days=1, hours=hours_overlap),
+        start - timedelta(hours=hours_overlap),
+        end + timedelta(hours=hours_overlap),
         [EXPORT_ENTITY_ID],
         None,   # filters
         True,   # include_start_time_state
@@ -58,35 +116,160 @@ def get_power(day: date, hours_overlap: int = 6) -> dict[datetime, float]:
         True,   # no_attributes
         False,  # compressed_state_format
     )
-    points = {s.last_changed: float(s.state) for s in states[EXPORT_ENTITY_ID] if s.state != 'unavailable'}
-    log.info(f'Read {len(points)} power points from sensor')
-    return points
+    times, values = state_series(states.get(EXPORT_ENTITY_ID, []))
+    instrumentation.end(phase, rows_read=len(times))
+    log.info(f'Read {len(times)} power points from sensor')
+    return times, values
+
 
+def get_exported(start: datetime, end: datetime, step: int):
+    """Energy exported in each step-long interval from start to end, as exact as the recorder still has it.
 
-def get_prices(day: date) -> dict[int, float] | None:
+    Short-term statistics cover the last days in 5 minutes, long-term statistics are hourly and spread evenly over the
+    intervals of an hour. Raw states are only read for the span still missing, usually the last hour not compiled yet.
+    """
+    exported = np.full(int((end - start).total_seconds()) // step, np.nan)
+    if step < 3600:
+        rows = get_statistics_rows(EXPORT_ENTITY_ID, start, end, {'change'}, '5minute')
+        exported = regrid(align(start, end, SHORT_TERM_STEP, rows, 'change'), SHORT_TERM_STEP, step, 'sum')
+    if np.isnan(exported).any():
+        rows = get_statistics_rows(EXPORT_ENTITY_ID, start, end, {'change'})
+        hourly = regrid(align(start, end, 3600, rows, 'change'), 3600, step, 'sum')
+        exported = np.where(np.isnan(exported), hourly, exported)
+    missing = np.flatnonzero(np.isnan(exported))
+    log.info(f'Read {len(exported) - len(missing)} intervals of export from statistics')
+    if len(missing) > 0:
+        boundaries = start.timestamp() + step * np.arange(missing[0], missing[-1] + 2)
+        times, values = get_meter_series(utc_from_timestamp(boundaries[0]), utc_from_timestamp(boundaries[-1]))
+        from_states = np.diff(meter_at(boundaries, times, values))
+        exported[missing] = from_states[missing - missing[0]]
+    return exported
+
+
+def parse_prices(day: date, body: str):
+    """Prices of the day and their interval in seconds, whatever the resolution OTE publishes in."""
+    try:
+        data = json.loads(body)
+        points = [(int(d['x']), float(d['y'])) for d in data['data']['dataLine'][OTE_PRICE_LINE]['point']]
+    except (ValueError, KeyError, IndexError, TypeError):
+        points = []
+    if not points:
+        return None
+    day_seconds = int((day_with_hour_utc(day + DAY_DELTA, hour=0) - day_with_hour_utc(day, hour=0)).total_seconds())
+    count = max(x for x, _ in points)
+    step = day_seconds // count
+    if day_seconds % count != 0 or step % SHORT_TERM_STEP != 0 or (3600 % step != 0 and step % 3600 != 0):
+        log.warning(f'{count} electricity prices do not divide {day} into intervals')
+        return None
+    prices = np.full(count, np.nan)
+    for x, y in points:
+        prices[x - 1] = y
+    return prices, step
+
+
+def get_prices(day: date):
     url = OTE_SPOT_ELE_PRICE_URL_PATTERN.format(day.isoformat())
-    resp = http_get(url)
-    if resp.status_code != 200:
-        log.warning(f'Reading electricity prices for {url} failed: {resp.status_code}')
+    key = day.isoformat()
+    phase = instrumentation.begin('ote_fetch')
+    try:
+        body = http_cache.fetch('ote', key, url, immutable=day < now().date())
+    except Exception:
+        instrumentation.end(phase, failed=True)
+        raise
+    instrumentation.end(phase, bytes=0 if body is None else len(body), failed=body is None)
+    if body is None:
+        log.warning(f'Reading electricity prices for {url} failed')
         return None
-    else:
-        data = resp.json()
-        points = {(int(d['x']) - 1): float(d['y']) for d in data['data']['dataLine'][1]['point']}
-        log.info(f'Read {len(points)} electricity prices from OTE')
-        return points
+    prices = parse_prices(day, body)
+    if prices is None:
+        # not published yet, do not let the cache keep the empty day
+        http_cache.forget('ote', key)
+        log.warning(f'No electricity prices for {day} at OTE yet')
+        return None
+    log.info(f'Read {len(prices[0])} electricity prices from OTE')
+    return prices
+
+
+def get_cached_prices(day: date):
+    """Prices of the day as published, only when they are in the cache already."""
+    cached = http_cache.load_json('ote', day.isoformat())
+    return None if cached is None else parse_prices(day, cached['body'])
+
+
+def get_price_series(start: date, end: date):
+    """Prices of days start - end at the finest resolution any of them was published in, and that interval.
+
+    The hourly price statistics are the base, days whose OTE response is cached refine them.
+    """
+    range_start = day_with_hour_utc(start, hour=0)
+    range_end = day_with_hour_utc(end + DAY_DELTA, hour=0)
+    published = {}
+    day = start
+    while day <= end:
+        if (prices := get_cached_prices(day)) is not None:
+            published[day] = prices
+        day += DAY_DELTA
+    step = min([day_step for _, day_step in published.values()], default=3600)
+    rows = get_statistics_rows(ELE_PRICE_STAT_ID, range_start, range_end, {'mean'})
+    series = regrid(align(range_start, range_end, 3600, rows, 'mean'), 3600, step, 'mean')
+    for day, (prices, day_step) in published.items():
+        i = int((day_with_hour_utc(day, hour=0) - range_start).total_seconds()) // step
+        day_prices = regrid(prices, day_step, step, 'mean')
+        series[i:i + len(day_prices)] = day_prices
+    return series, step
 
 
 @event_trigger('scrape_electricity_price')
 def scrape_electricity_price() -> None:
-    tomorrow = now().date() + DAY_DELTA
-    prices = get_prices(tomorrow)
-    stats = [StatisticData(start=day_with_hour_utc(tomorrow, h), mean=p, min=p, max=p) for h, p in prices.items() if h < 24]
-    meta = StatisticMetaData(statistic_id=ELE_PRICE_STAT_ID, source=ELE_PRICE_SOURCE, name='Electricity price', has_sum=False, has_mean=True, unit_of_measurement='€/MWh')
+    run = instrumentation.start('scrape_electricity_price')
+    try:
+        tomorrow = now().date() + DAY_DELTA
+        prices = get_prices(tomorrow)
+        if prices is not None:
+            values, step = prices
+            start = day_with_hour_utc(tomorrow, hour=0)
+            stats = hourly_price_statistics(start.timestamp(), values, step)
+            meta = StatisticMetaData(statistic_id=ELE_PRICE_STAT_ID, source=ELE_PRICE_SOURCE, name='Electricity price', has_sum=False, has_mean=True, unit_of_measurement='€/MWh')
+            add_statistics(meta, stats)
+            log.info(f'Added {len(stats)} hourly electricity prices for {tomorrow} from {len(values)} published')
+            update_price_schedule(tomorrow, prices)
+    except Exception as e:
+        instrumentation.finish(run, e)
+        raise
+    instrumentation.finish(run)
+
+
+def add_statistics(meta: StatisticMetaData, stats: list[StatisticData]) -> None:
+    phase = instrumentation.begin('add_statistics')
     async_add_external_statistics(hass, meta, stats)
-    log.info(f'Added {len(stats)} electricity prices for {tomorrow}')
+    instrumentation.end(phase, rows_written=len(stats))
 
 
-def get_last_income_sum(yesterday: date) -> float:
+def get_statistics_rows(statistic_id: str, start: datetime, end: datetime | None, types: set[str], period: str = 'hour') -> list[dict]:
+    phase = instrumentation.begin('statistics_during_period')
+    stats = await get_instance(hass).async_add_executor_job(
+        statistics_during_period,
+        hass,
+        start,
+        end,
+        {statistic_id},
+        period,
+        None,
+        types,
+    )
+    rows = stats.get(statistic_id, [])
+    instrumentation.end(phase, rows_read=len(rows))
+    return rows
+
+
+def get_income_base(rows: list[dict], from_scratch: bool) -> float:
+    """Income sum before the first row of rows, i.e. before the recomputed range.
+
+    Zero only when rebuilding from the first day was asked for, a failed lookup must not restart the running sum.
+    """
+    if rows:
+        return rows[0]['sum'] - rows[0]['state']
+    # nothing from the range on, continue the last sum
     last_income_stats = await get_instance(hass).async_add_executor_job(
         get_last_statistics,
         hass,
@@ -95,107 +278,480 @@ def get_last_income_sum(yesterday: date) -> float:
         False,
         {"sum"},
     )
-    if len(last_income_stats) == 0:
+    if PV_INCOME_STAT_ID not in last_income_stats:
+        if from_scratch:
+            log.warning('No income stats yet, starting the sum from zero')
+            return 0.0
         log.error('Starting income from zero? Better not saving!!!')
         raise Exception("No last income!")
-    lis = last_income_stats[PV_INCOME_STAT_ID][0]
-    last_income_date = datetime.fromtimestamp(lis['end'])
-    assert last_income_date <= datetime.combine(yesterday, time.min), f"Last income sum is newer than what we are reading! last income date={last_income_date}, yesterday={yesterday}"
-    income_sum = lis['sum']
-    log.info(f'Read last income sum = {income_sum}')
-    return income_sum
+    return last_income_stats[PV_INCOME_STAT_ID][0]['sum']
 
 
-def get_prices_stats(start: datetime, end: datetime) -> dict[int, float] | None:
-    stats = await get_instance(hass).async_add_executor_job(
-        statistics_during_period,
-        hass,
-        start,
-        end,
-        {ELE_PRICE_STAT_ID},
-        "hour",
-        None,
-        {"mean"},
-    )
-    if ELE_PRICE_STAT_ID not in stats:
-        log.warning(f'No electricity price stat found from {start.isoformat()} - {end.isoformat()}')
-        return None
-    prices = {i: s['mean'] for i, s in enumerate(stats[ELE_PRICE_STAT_ID])}
-    log.debug(f'Read {len(prices)} prices stats from {start.isoformat()} - {end.isoformat()}')
-    return prices
+def recompute_pv_income(start: date, end: date, from_scratch: bool = False) -> None:
+    """Recompute the hourly PV export income of days start - end and rewrite the running sum from the first changed hour.
+
+    Prices, EUR rates and exported energy of the whole range are loaded at once and multiplied at the resolution of the
+    prices, only the income is summed up to hours. Later sums are shifted by the difference the range made.
+    """
+    range_start = day_with_hour_utc(start, hour=0)
+    range_end = day_with_hour_utc(end + DAY_DELTA, hour=0)
+    hours = interval_starts(range_start, range_end, 3600)
+
+    prices, step = get_price_series(start, end)
+
+    # the income of a day is converted with the rate published the day before
+    rates = get_eur_rates(start - DAY_DELTA - CNB_RATE_LOOKBACK, end - DAY_DELTA)
+    day_rates = rates_of_days(start, end, rates)
+    interval_rates = day_values(interval_starts(range_start, range_end, step), day_rates)
+
+    exported = get_exported(range_start, range_end, step)
+
+    income = regrid(prices * exported * interval_rates / 1000, step, 3600, 'sum')
+
+    rows = get_statistics_rows(PV_INCOME_STAT_ID, range_start, None, {'state', 'sum'})
+    base = get_income_base(rows, from_scratch)
+    in_range = [r for r in rows if r['start'] < range_end.timestamp()]
+    old_end_sum = in_range[-1]['sum'] if in_range else base
+    merged, first_changed = merge_income(income, align(range_start, range_end, 3600, in_range, 'state'))
+    if first_changed is None:
+        log.info(f'Income from {start} to {end} is unchanged')
+        return
+    sums = base + np.nancumsum(merged)
+    missing = int(np.count_nonzero(np.isnan(income)))
+    if missing:
+        log.warning(f'Income of {missing} hours from {start} to {end} cannot be computed, keeping what was there')
+
+    store_eur_rates(day_rates)
+    income_meta = StatisticMetaData(statistic_id=PV_INCOME_STAT_ID, source=PV_INCOME_SOURCE, name='PV export income', has_sum=True, has_mean=False, unit_of_measurement='Kč')
+    income_stats = income_statistics(hours, merged, sums, first_changed)
+    add_statistics(income_meta, income_stats)
+    log.info(f'Rewrote {len(income_stats)} income stats from {utc_from_timestamp(hours[first_changed])} to {end}')
+
+    delta = float(sums[-1]) - old_end_sum
+    if len(rows) > len(in_range) and abs(delta) > INCOME_EPSILON:
+        async_adjust_statistics(hass, PV_INCOME_STAT_ID, range_end, delta, 'Kč')
+        log.info(f'Shifted income sums after {end} by {delta}')
+
+
+@service('pyscript.recompute_pv_income')
+def recompute_pv_income_service(start=None, end=None, from_scratch=False):
+    """yaml
+name: Recompute PV income
+description: Recompute the hourly PV export income of a range of days and fix the running sum after it.
+fields:
+  start:
+    description: First day to recompute.
+    example: "2024-01-01"
+    required: true
+    selector:
+      date:
+  end:
+    description: Last day to recompute, yesterday when not given.
+    example: "2024-01-31"
+    selector:
+      date:
+  from_scratch:
+    description: Start the running sum from zero when there is no income yet, only when rebuilding from the first day.
+    default: false
+    selector:
+      boolean:
+"""
+    end = date.fromisoformat(str(end)) if end else now().date() - DAY_DELTA
+    run = instrumentation.start('recompute_pv_income')
+    try:
+        recompute_pv_income(date.fromisoformat(str(start)), end, bool(from_scratch))
+    except Exception as e:
+        instrumentation.finish(run, e)
+        raise
+    instrumentation.finish(run)
 
 
 @event_trigger('scrape_electricity')
 def scrape_electricity() -> None:
-    yesterday = now().date() - DAY_DELTA
+    run = instrumentation.start('scrape_electricity')
+    try:
+        yesterday = now().date() - DAY_DELTA
+        recompute_pv_income(yesterday, yesterday)
+    except Exception as e:
+        instrumentation.finish(run, e)
+        raise
+    instrumentation.finish(run)
 
-    yesterday_dt = day_with_hour_utc(yesterday, hour=0)
-    prices = get_prices_stats(yesterday_dt, yesterday_dt + DAY_DELTA)
-    if prices is None:
-        log.warning(f'No electricity price stat found for computing export income at {yesterday.isoformat()}')
+
+def schedule_prices(day: date, prices) -> None:
+    """Keep the prices of the day in memory and index them."""
+    values, step = prices
+    start = day_with_hour_utc(day, hour=0).timestamp()
+    price_schedule[day] = (start, values, step)
+    price_index[day] = build_price_index(start, values, step)
+    for old in [d for d in price_schedule if d < now().date()]:
+        del price_schedule[old]
+        del price_index[old]
+
+
+def update_price_schedule(day: date, prices) -> None:
+    """Schedule the prices of the day, publish their windows and re-arm the export controller on them."""
+    schedule_prices(day, prices)
+    publish_price_windows()
+    task.create(export_controller)
+
+
+def load_day_prices(day: date):
+    """Prices of the day from OTE or its on-disk cache, else from the stored hourly price statistics."""
+    try:
+        prices = get_prices(day)
+    except Exception as e:
+        log.warning(f'Fetching electricity prices for {day} failed: {e}')
+        prices = None
+    if prices is not None:
+        return prices
+    start = day_with_hour_utc(day, hour=0)
+    end = day_with_hour_utc(day + DAY_DELTA, hour=0)
+    rows = get_statistics_rows(ELE_PRICE_STAT_ID, start, end, {'mean'})
+    if not rows:
+        return None
+    log.warning(f'Using the hourly electricity price statistics for {day}')
+    return align(start, end, 3600, rows, 'mean'), 3600
+
+
+@time_trigger('cron(0 0 * * *)')
+def new_day() -> None:
+    """Tomorrow became today: publish its windows and re-arm the controller, which stops where the known prices end."""
+    publish_price_windows()
+    task.create(export_controller)
+
+
+@time_trigger('cron(*/15 * * * *)')
+def retry_price_schedule() -> None:
+    """Safety net of the export controller, keep loading today's prices while they are missing, e.g. OTE was down."""
+    today = now().date()
+    if today in price_schedule:
         return
+    if (prices := load_day_prices(today)) is not None:
+        update_price_schedule(today, prices)
 
-    day_bef_yesterday = yesterday - DAY_DELTA
-    eur_rate = get_eur_rate(day_bef_yesterday)
-    store_eur_rate(eur_rate, day_bef_yesterday)
-
-    power = get_power(yesterday)
-    i = 0
-    power_dates = [as_local(d) for d in power.keys()]
-    power_values = list(power.values())
-    powers = {}
-    for h in range(25):
-        i = bisect_right(power_dates, day_with_hour_utc(yesterday, hour=0) + timedelta(hours=h), lo=i)
-        if i == 0:
+
+def publish_price_windows() -> None:
+    """Sensors with the cheapest and most expensive windows of today and tomorrow, tomorrow becomes today at midnight."""
+    today = now().date()
+    for name, day in (('today', today), ('tomorrow', today + DAY_DELTA)):
+        index = price_index.get(day)
+        entity_id = f'sensor.electricity_price_windows_{name}'
+        if index is None:
+            state.set(entity_id, 'unknown', {'friendly_name': f'Electricity price windows {name}'})
             continue
-        if i >= len(power_dates):
-            break
-        powers[h] = power_values[i-1]
-    if len(powers) < 2:
-        log.warning(f'There is only {len(powers)} hourly powers, not enough to compute diffs!')
+        attributes = {'friendly_name': f'Electricity price windows {name}', 'unit_of_measurement': '€/MWh', 'interval_minutes': index['step'] // 60}
+        for hours in WINDOW_SENSOR_HOURS:
+            length = hours * 3600 // index['step']
+            if length <= len(index['prices']):
+                attributes[f'cheapest_{hours}h'] = price_window(index, length, 'cheapest')
+                attributes[f'most_expensive_{hours}h'] = price_window(index, length, 'most_expensive')
+        state.set(entity_id, round(float(np.nanmean(index['prices'])), 2), attributes)
+
+
+@service('pyscript.electricity_price_windows', supports_response='only')
+def electricity_price_windows(day=None, duration=60, kind='cheapest', contiguous=True):
+    """yaml
+name: Electricity price windows
+description: Cheapest or most expensive time of a day with published prices, answered from the precomputed index.
+fields:
+  day:
+    description: Day to look at, tomorrow when not given.
+    example: "2024-01-01"
+    selector:
+      date:
+  duration:
+    description: Minutes needed, rounded up to whole price intervals.
+    example: 180
+    default: 60
+    selector:
+      number:
+        min: 5
+        max: 1500
+        unit_of_measurement: min
+  kind:
+    description: Whether to look for the cheapest or the most expensive time.
+    default: cheapest
+    selector:
+      select:
+        options:
+          - cheapest
+          - most_expensive
+  contiguous:
+    description: One window of the whole duration, or the individual intervals wherever they are.
+    default: true
+    selector:
+      boolean:
+"""
+    day = date.fromisoformat(str(day)) if day else now().date() + DAY_DELTA
+    index = price_index.get(day)
+    if index is None:
+        raise ValueError(f'No electricity prices known for {day}')
+    if kind not in ('cheapest', 'most_expensive'):
+        raise ValueError(f'Unknown kind {kind}')
+    length = -(-int(duration) * 60 // index['step'])
+    if not 1 <= length <= len(index['prices']):
+        raise ValueError(f'Duration of {duration} minutes does not fit into {day}')
+    if contiguous:
+        if (window := price_window(index, length, kind)) is None:
+            raise ValueError(f'No {duration} minutes of {day} without a missing price')
+        return window
+    return {'slots': price_slots(index, length, kind)}
+
+
+@time_trigger('startup')
+def load_price_schedule() -> None:
+    today = now().date()
+    for day in (today, today + DAY_DELTA):
+        if (prices := load_day_prices(day)) is not None:
+            update_price_schedule(day, prices)
+
+
+def set_export_limit(negative: bool) -> None:
+    limit = '0.0' if negative else EXPORT_LIMIT_MAX
+    current = hass.states.get(EXPORT_LIMIT_ENTITY_ID)
+    if current is not None and current.state == limit:
         return
-    power_diffs = {h: (p2 - p1) for (h, p1), p2 in zip(powers.items(), islice(powers.values(), 1, None))}
-    log.info(f'Reduced power to {len(power_diffs)} hours')
+    log.info(f'Electricity price turned {"negative" if negative else "positive"}, setting export limit to {limit}')
+    phase = instrumentation.begin('set_limit')
+    hass.states.async_set(EXPORT_LIMIT_ENTITY_ID, limit)
+    instrumentation.end(phase, rows_written=1)
 
-    income_stats = []
-    income_sum = get_last_income_sum(yesterday)
-    for h in range(24):
-        if h in prices and h in power_diffs:
-            income = prices[h] * power_diffs[h] * eur_rate / 1000
-            income_sum += income
-            income_stats.append(StatisticData(start=day_with_hour_utc(yesterday, h), state=income, sum=income_sum))
 
-    income_meta = StatisticMetaData(statistic_id=PV_INCOME_STAT_ID, source=PV_INCOME_SOURCE, name='PV export income', has_sum=True, has_mean=False, unit_of_measurement='Kč')
-    async_add_external_statistics(hass, income_meta, income_stats)
-    log.info(f'Added {len(income_stats)} income stats for {yesterday}')
+def export_controller() -> None:
+    """Disable export exactly while the price is negative, waking up only when its sign changes."""
+    task.unique('export_controller')
+    while True:
+        starts, ends, negative = price_schedule_arrays(price_schedule)
+        current, transition = export_transition(starts, ends, negative, now().timestamp())
+        if current is None:
+            today = now().date()
+            if today not in price_schedule and (prices := load_day_prices(today)) is not None:
+                schedule_prices(today, prices)
+                publish_price_windows()
+                continue
+            log.warning('No electricity price known for now, leaving the export limit as it is until the prices are retried')
+            return
+        run = instrumentation.start('adjust_electricity_export')
+        try:
+            set_export_limit(current)
+        except Exception as e:
+            instrumentation.finish(run, e)
+            raise
+        instrumentation.finish(run)
+        task.sleep(transition - now().timestamp())
 
 
 @event_trigger('adjust_electricity_export')
 def adjust_electricity_export() -> None:
-    start = now().replace(minute=0, second=0, microsecond=0)
-    price = get_prices_stats(start, start + timedelta(hours=1))
-    if price is None:
-        log.warning(f'Cannot read current electricity price, not adjusting export at {start.isoformat()}')
-        return
-    if price[0] < 0:
-        log.info(f'Current electricity price is {price[0]}, disabling export')
-        hass.states.async_set(EXPORT_LIMIT_ENTITY_ID, '0.0')
-    else:
-        hass.states.async_set(EXPORT_LIMIT_ENTITY_ID, EXPORT_LIMIT_MAX)
+    task.create(export_controller)
 
 
-def store_eur_rate(eur_rate: float, day: date) -> None:
+def store_eur_rates(day_rates: dict[date, float]) -> None:
+    """Store the rate used for each day at the day before, the day it was published for."""
     eur_rate_meta = StatisticMetaData(statistic_id=EUR_RATE_STAT_ID, source=EUR_RATE_SOURCE, name='EUR/CZK rate', has_sum=False, has_mean=True, unit_of_measurement='Kč/€')
-    async_add_external_statistics(hass, eur_rate_meta, [StatisticData(start=day_with_hour_utc(day, hour=0), mean=eur_rate, min=eur_rate, max=eur_rate)])
-    log.info(f'Added eur rate {eur_rate} stat for {day}')
+    stats = [StatisticData(start=day_with_hour_utc(day - DAY_DELTA, hour=0), mean=r, min=r, max=r) for day, r in day_rates.items()]
+    add_statistics(eur_rate_meta, stats)
+    log.info(f'Added {len(stats)} eur rate stats')
 
 
 def day_with_hour_utc(day: date, hour: int) -> datetime:
     return as_utc(datetime.combine(day, time(hour, 0, 0), tzinfo=DEFAULT_TIME_ZONE))
 
 
-def http_get(url: str) -> Response:
-    s = Session()
-    s.mount('https://', HTTP_ADAPTER)
-    resp = await hass.async_add_executor_job(s.get, url)
-    return resp
+def interval_starts(start: datetime, end: datetime, step: int):
+    return start.timestamp() + step * np.arange(int((end - start).total_seconds()) // step)
+
+
+def rates_of_days(start: date, end: date, rates: dict[date, float]) -> dict[date, float]:
+    """Rate of each day from start to end, the last one published on or before the day before."""
+    published = sorted(rates)
+    day_rates = {}
+    day = start
+    while day <= end:
+        i = bisect_right(published, day - DAY_DELTA)
+        if i > 0:
+            day_rates[day] = rates[published[i - 1]]
+        day += DAY_DELTA
+    return day_rates
+
+
+@pyscript_compile
+def state_series(states):
+    times = []
+    values = []
+    for s in states:
+        try:
+            value = float(s.state)
+        except ValueError:
+            # unavailable / unknown
+            continue
+        times.append(s.last_changed.timestamp())
+        values.append(value)
+    return np.array(times), np.array(values)
+
+
+@pyscript_compile
+def align(start, end, step, rows, key):
+    """Values of statistic rows on the grid of step-long intervals from start to end, NaN where there is no row."""
+    t0 = start.timestamp()
+    out = np.full(int((end - start).total_seconds()) // step, np.nan)
+    for row in rows:
+        i = int(round((row['start'] - t0) / step))
+        if 0 <= i < len(out) and row[key] is not None:
+            out[i] = row[key]
+    return out
+
+
+@pyscript_compile
+def regrid(values, src_step, dst_step, how):
+    """Values of a grid of src_step-long intervals on a grid of dst_step-long ones over the same span.
+
+    Amounts ('sum') are spread evenly or summed up, levels ('mean') repeated or averaged. NaN spreads to every
+    interval it touches.
+    """
+    if src_step == dst_step:
+        return values
+    if src_step > dst_step:
+        ratio = src_step // dst_step
+        out = np.repeat(values, ratio)
+        return out / ratio if how == 'sum' else out
+    blocks = values.reshape(-1, dst_step // src_step)
+    return blocks.sum(axis=1) if how == 'sum' else blocks.mean(axis=1)
+
+
+@pyscript_compile
+def day_values(starts, values_by_day):
+    """Value of the local day of each interval, NaN for days without one."""
+    days = [datetime.fromtimestamp(t, DEFAULT_TIME_ZONE).date() for t in starts]
+    return np.array([values_by_day.get(day, np.nan) for day in days], dtype=float)
+
+
+@pyscript_compile
+def hourly_price_statistics(start, prices, step):
+    """Hourly mean, min and max of prices published for step-long intervals from start."""
+    if step > 3600:
+        prices = regrid(prices, step, 3600, 'mean')
+        step = 3600
+    blocks = prices.reshape(-1, 3600 // step)
+    return [
+        StatisticData(start=utc_from_timestamp(start + 3600 * i), mean=float(block.mean()), min=float(block.min()), max=float(block.max()))
+        for i, block in enumerate(blocks)
+        if not np.isnan(block).any()
+    ]
+
+
+@pyscript_compile
+def meter_at(boundaries, times, values):
+    """Meter reading at each boundary, NaN unless a later reading shows that the meter got past it."""
+    idx = np.searchsorted(times, boundaries, side='right')
+    valid = (idx > 0) & (idx < len(times))
+    out = np.full(len(boundaries), np.nan)
+    out[valid] = values[idx[valid] - 1]
+    return out
+
+
+@pyscript_compile
+def merge_income(income, old):
+    """New income where it could be computed, the old one elsewhere, and the first hour that differs."""
+    merged = np.where(np.isnan(income), old, income)
+    changed = ~np.isnan(merged) & (np.isnan(old) | (np.abs(merged - old) > INCOME_EPSILON))
+    first_changed = int(np.argmax(changed)) if changed.any() else None
+    return merged, first_changed
+
+
+@pyscript_compile
+def income_statistics(hours, merged, sums, first):
+    return [
+        StatisticData(start=utc_from_timestamp(hours[i]), state=float(merged[i]), sum=float(sums[i]))
+        for i in range(first, len(hours))
+        if not np.isnan(merged[i])
+    ]
+
+
+@pyscript_compile
+def price_schedule_arrays(schedule):
+    """Starts, ends and price signs of all scheduled intervals in time order."""
+    starts, ends, negative = [], [], []
+    for day in sorted(schedule):
+        start, prices, step = schedule[day]
+        day_starts = start + step * np.arange(len(prices))
+        starts.append(day_starts)
+        ends.append(day_starts + step)
+        # a missing price keeps export allowed: disabling it wrongly loses the whole production of the interval,
+        # missing a negative price costs only that price
+        negative.append(np.nan_to_num(prices, nan=0.0) < 0)
+    if not starts:
+        return np.array([]), np.array([]), np.array([], dtype=bool)
+    return np.concatenate(starts), np.concatenate(ends), np.concatenate(negative)
+
+
+@pyscript_compile
+def export_transition(starts, ends, negative, t):
+    """Sign of the price at t and when it changes, or the known prices end. None when no price covers t."""
+    i = int(np.searchsorted(starts, t, side='right')) - 1
+    if i < 0 or t >= ends[i]:
+        return None, None
+    changes = (negative[i + 1:] != negative[i]) | (starts[i + 1:] != ends[i:-1])
+    last = i + int(np.argmax(changes)) if changes.any() else len(ends) - 1
+    return bool(negative[i]), float(ends[last])
+
+
+@pyscript_compile
+def build_price_index(start, prices, step):
+    """Best window start of every length and the rank order of the intervals, for O(1) window queries.
+
+    Window sums come from the prefix sums, O(n^2) for the whole index, which is 10k operations for 96 intervals.
+    Windows with a missing price are never picked, a length without any complete window has start -1.
+    """
+    n = len(prices)
+    prefix = np.concatenate(([0.0], np.cumsum(np.nan_to_num(prices))))
+    missing = np.concatenate(([0], np.cumsum(np.isnan(prices))))
+    cheapest = np.full(n + 1, -1, dtype=int)
+    most_expensive = np.full(n + 1, -1, dtype=int)
+    for length in range(1, n + 1):
+        complete = (missing[length:] - missing[:-length]) == 0
+        if not complete.any():
+            continue
+        sums = prefix[length:] - prefix[:-length]
+        cheapest[length] = np.argmin(np.where(complete, sums, np.inf))
+        most_expensive[length] = np.argmax(np.where(complete, sums, -np.inf))
+    # NaN sorts last, price_slots skips it
+    order = np.argsort(prices, kind='stable')
+    return {
+        'start': start,
+        'step': step,
+        'prices': prices,
+        'prefix': prefix,
+        'cheapest': cheapest,
+        'most_expensive': most_expensive,
+        'order': order,
+    }
+
+
+@pyscript_compile
+def _interval_time(index, i):
+    return as_local(utc_from_timestamp(index['start'] + index['step'] * int(i))).isoformat()
+
+
+@pyscript_compile
+def price_window(index, length, kind):
+    i = int(index[kind][length])
+    if i < 0:
+        return None
+    return {
+        'start': _interval_time(index, i),
+        'end': _interval_time(index, i + length),
+        'mean': float((index['prefix'][i + length] - index['prefix'][i]) / length),
+    }
+
+
+@pyscript_compile
+def price_slots(index, count, kind):
+    order = index['order']
+    valid = order[~np.isnan(index['prices'][order])]
+    picked = valid[::-1][:count] if kind == 'most_expensive' else valid[:count]
+    return [
+        {'start': _interval_time(index, i), 'end': _interval_time(index, i + 1), 'price': float(index['prices'][i])}
+        for i in sorted(picked)
+    ]
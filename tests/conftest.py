@@ -0,0 +1,45 @@
+import ast
+import logging
+import sys
+from datetime import date, datetime, time, timedelta, timezone
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+REPO_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_DIR))
+
+PRAGUE = ZoneInfo("Europe/Prague")
+
+
+def load_pyscript(path: Path, names: set[str], constants: set[str]) -> dict:
+    """The named functions and constants of a pyscript file, for functions that do not await anything.
+
+    pyscript files cannot be imported outside of Home Assistant, so the definitions are taken from the source and
+    run against a namespace standing in for the pyscript globals they use.
+    """
+    namespace = {
+        "np": np,
+        "json": __import__("json"),
+        "date": date,
+        "datetime": datetime,
+        "time": time,
+        "timedelta": timedelta,
+        "log": logging.getLogger(path.stem),
+        "DEFAULT_TIME_ZONE": PRAGUE,
+        "as_utc": lambda dt: dt.astimezone(timezone.utc),
+        "as_local": lambda dt: dt.astimezone(PRAGUE),
+        "utc_from_timestamp": lambda ts: datetime.fromtimestamp(ts, timezone.utc),
+    }
+    nodes = []
+    for node in ast.parse(path.read_text(encoding="utf-8")).body:
+        if isinstance(node, ast.FunctionDef) and node.name in names:
+            node.decorator_list = []
+            nodes.append(node)
+        elif isinstance(node, ast.Assign) and any(getattr(t, "id", None) in constants for t in node.targets):
+            nodes.append(node)
+    found = {n.name if isinstance(n, ast.FunctionDef) else n.targets[0].id for n in nodes}
+    assert found == names | constants, f"missing in {path.name}: {names | constants - found}"
+    exec(compile(ast.Module(body=nodes, type_ignores=[]), str(path), "exec"), namespace)
+    return namespace
@@ -0,0 +1,150 @@
+import json
+import math
+from datetime import date, datetime, timezone
+
+import numpy as np
+import pytest
+
+from conftest import PRAGUE, REPO_DIR, load_pyscript
+
+scrape = load_pyscript(
+    REPO_DIR / "pyscript" / "scrape_electricity.py",
+    {
+        "day_with_hour_utc",
+        "parse_prices",
+        "price_schedule_arrays",
+        "export_transition",
+        "build_price_index",
+        "_interval_time",
+        "price_window",
+        "price_slots",
+    },
+    {"DAY_DELTA", "OTE_PRICE_LINE", "SHORT_TERM_STEP"},
+)
+parse_prices = scrape["parse_prices"]
+price_schedule_arrays = scrape["price_schedule_arrays"]
+export_transition = scrape["export_transition"]
+build_price_index = scrape["build_price_index"]
+price_window = scrape["price_window"]
+price_slots = scrape["price_slots"]
+
+
+def ote_body(prices: list[float | None]) -> str:
+    points = [{"x": str(i + 1), "y": price} for i, price in enumerate(prices) if price is not None]
+    return json.dumps({"data": {"dataLine": [{"point": []}, {"point": points}]}})
+
+
+def day_start(day: date) -> float:
+    return datetime.combine(day, datetime.min.time(), PRAGUE).timestamp()
+
+
+@pytest.mark.parametrize(
+    ("day", "count", "step"),
+    [
+        (date(2025, 3, 29), 24, 3600),
+        # spring forward, 23 hours
+        (date(2025, 3, 30), 23, 3600),
+        # fall back, 25 hours
+        (date(2025, 10, 26), 25, 3600),
+        (date(2025, 10, 27), 96, 900),
+        (date(2025, 10, 26), 100, 900),
+        (date(2026, 3, 29), 92, 900),
+    ],
+)
+def test_parse_prices_resolution(day, count, step):
+    prices, parsed_step = parse_prices(day, ote_body([float(i) for i in range(count)]))
+    assert parsed_step == step
+    assert len(prices) == count
+    assert prices[-1] == count - 1
+
+
+def test_parse_prices_missing_point_is_nan():
+    published = [10.0] * 24
+    published[5] = None
+    prices, _ = parse_prices(date(2025, 3, 29), ote_body(published))
+    assert np.isnan(prices[5])
+    assert np.count_nonzero(np.isnan(prices)) == 1
+
+
+@pytest.mark.parametrize("body", ["", "not json", json.dumps({"data": {"dataLine": [{"point": []}]}}), ote_body([])])
+def test_parse_prices_unpublished(body):
+    assert parse_prices(date(2025, 3, 29), body) is None
+
+
+def test_parse_prices_not_dividing_the_day():
+    # 24 hourly points on a 23 hour day
+    assert parse_prices(date(2025, 3, 30), ote_body([1.0] * 24)) is None
+
+
+def test_price_index_contiguous_window_and_slots_differ():
+    index = build_price_index(0, np.array([3.0, -1.0, 4.0, -2.0, 5.0]), 900)
+    window = price_window(index, 2, "cheapest")
+    assert window["start"] == datetime.fromtimestamp(0, timezone.utc).astimezone(PRAGUE).isoformat()
+    assert window["mean"] == pytest.approx(1.0)
+    assert [slot["price"] for slot in price_slots(index, 2, "cheapest")] == [-1.0, -2.0]
+    assert [slot["price"] for slot in price_slots(index, 2, "most_expensive")] == [4.0, 5.0]
+    assert price_window(index, 5, "most_expensive")["mean"] == pytest.approx(1.8)
+
+
+def test_price_index_skips_windows_with_a_missing_price():
+    index = build_price_index(0, np.array([5.0, 1.0, 2.0, np.nan, 0.0, 0.0]), 900)
+    assert index["cheapest"][1] == 4
+    assert index["most_expensive"][1] == 0
+    assert index["cheapest"][2] == 4
+    assert index["cheapest"][3] == 0
+    # every window of four or more covers the gap
+    for length in (4, 5, 6):
+        assert index["cheapest"][length] == -1
+        assert price_window(index, length, "cheapest") is None
+        assert price_window(index, length, "most_expensive") is None
+
+
+def test_price_slots_skip_missing_prices():
+    index = build_price_index(0, np.array([np.nan, 2.0, np.nan, 1.0]), 900)
+    assert [slot["price"] for slot in price_slots(index, 4, "cheapest")] == [2.0, 1.0]
+    assert [slot["price"] for slot in price_slots(index, 4, "most_expensive")] == [2.0, 1.0]
+
+
+def schedule(*days: tuple[date, list[float], int]) -> dict:
+    return {day: (day_start(day), np.array(prices), step) for day, prices, step in days}
+
+
+def test_export_transition_sign_change_within_the_day():
+    prices = [10.0] * 12 + [-5.0] * 3 + [10.0] * 9
+    starts, ends, negative = price_schedule_arrays(schedule((date(2025, 6, 1), prices, 3600)))
+    start = day_start(date(2025, 6, 1))
+    assert export_transition(starts, ends, negative, start + 3600) == (False, start + 12 * 3600)
+    assert export_transition(starts, ends, negative, start + 12.5 * 3600) == (True, start + 15 * 3600)
+    # the last run lasts until the known prices end
+    assert export_transition(starts, ends, negative, start + 20 * 3600) == (False, start + 24 * 3600)
+
+
+def test_export_transition_runs_across_days_of_different_resolution():
+    first, second = date(2025, 9, 30), date(2025, 10, 1)
+    starts, ends, negative = price_schedule_arrays(schedule((first, [-1.0] * 24, 3600), (second, [-1.0] * 4 + [1.0] * 92, 900)))
+    assert export_transition(starts, ends, negative, day_start(first) + 3600) == (True, day_start(second) + 3600)
+
+
+def test_export_transition_stops_at_a_gap():
+    first, third = date(2025, 6, 1), date(2025, 6, 3)
+    starts, ends, negative = price_schedule_arrays(schedule((first, [1.0] * 24, 3600), (third, [1.0] * 24, 3600)))
+    assert export_transition(starts, ends, negative, day_start(first)) == (False, day_start(date(2025, 6, 2)))
+    # no price covers the day in between, nor the time before the schedule
+    assert export_transition(starts, ends, negative, day_start(date(2025, 6, 2)) + 60) == (None, None)
+    assert export_transition(starts, ends, negative, day_start(first) - 1) == (None, None)
+
+
+def test_export_transition_over_dst_day():
+    day = date(2025, 10, 26)
+    starts, ends, negative = price_schedule_arrays(schedule((day, [1.0] * 25, 3600)))
+    assert export_transition(starts, ends, negative, day_start(day)) == (False, day_start(date(2025, 10, 27)))
+    assert day_start(date(2025, 10, 27)) - day_start(day) == 25 * 3600
+
+
+def test_missing_price_keeps_export_allowed():
+    day = date(2025, 6, 1)
+    prices = [-1.0] * 24
+    prices[3] = math.nan
+    starts, ends, negative = price_schedule_arrays(schedule((day, prices, 3600)))
+    assert export_transition(starts, ends, negative, day_start(day)) == (True, day_start(day) + 3 * 3600)
+    assert export_transition(starts, ends, negative, day_start(day) + 3 * 3600) == (False, day_start(day) + 4 * 3600)
@@ -0,0 +1,68 @@
+import importlib.util
+
+import numpy as np
+import pytest
+
+from conftest import REPO_DIR
+
+# pure numpy, loaded on its own so that the tests run without Home Assistant
+_spec = importlib.util.spec_from_file_location("wallbox2_energy", REPO_DIR / "custom_components" / "wallbox2" / "energy.py")
+energy = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(energy)
+
+HOUR = energy.HOUR
+T0 = 1_735_689_600  # 2025-01-01 00:00 UTC, an hour boundary
+
+
+def test_session_within_one_hour():
+    session, hour, e = energy.session_hours(np.array([T0 + 600]), np.array([T0 + 1800]), np.array([2.0]))
+    assert session.tolist() == [0]
+    assert hour.tolist() == [T0]
+    assert e.tolist() == [2.0]
+
+
+def test_session_spanning_hour_edges_is_split_by_time():
+    # 00:45 - 02:15, a quarter, a whole and a quarter hour
+    session, hour, e = energy.session_hours(np.array([T0 + 2700]), np.array([T0 + 2 * HOUR + 900]), np.array([6.0]))
+    assert hour.tolist() == [T0, T0 + HOUR, T0 + 2 * HOUR]
+    assert e == pytest.approx([1.0, 4.0, 1.0])
+    assert e.sum() == pytest.approx(6.0)
+
+
+def test_session_ending_on_an_hour_boundary_stays_in_its_hour():
+    _, hour, e = energy.session_hours(np.array([T0]), np.array([T0 + HOUR]), np.array([3.0]))
+    assert hour.tolist() == [T0]
+    assert e.tolist() == [3.0]
+
+
+@pytest.mark.parametrize("end", [T0 + 1200, T0 - 100], ids=["same", "before"])
+def test_session_without_a_known_end_counts_in_its_start_hour(end):
+    _, hour, e = energy.session_hours(np.array([T0 + HOUR + 1200]), np.array([end]), np.array([1.5]))
+    assert hour.tolist() == [T0 + HOUR]
+    assert e.tolist() == [1.5]
+
+
+def test_no_sessions():
+    session, hour, e = energy.session_hours(np.array([]), np.array([]), np.array([]))
+    assert len(session) == len(hour) == len(e) == 0
+    hours, per_hour = energy.hourly_energy(np.array([]), np.array([]), np.array([]))
+    assert len(hours) == len(per_hour) == 0
+
+
+def test_hourly_energy_sums_overlapping_sessions_and_skips_uncovered_hours():
+    start = np.array([T0, T0 + 1800, T0 + 5 * HOUR])
+    end = np.array([T0 + 1800, T0 + HOUR + 1800, T0 + 5 * HOUR + 600])
+    hours, per_hour = energy.hourly_energy(start, end, np.array([1.0, 2.0, 0.5]))
+    assert hours.tolist() == [T0, T0 + HOUR, T0 + 5 * HOUR]
+    assert per_hour == pytest.approx([2.0, 1.0, 0.5])
+
+
+def test_hourly_energy_keeps_the_total_for_long_sessions():
+    rng = np.random.default_rng(1)
+    start = T0 + rng.integers(0, 48 * HOUR, 200)
+    end = start + rng.integers(0, 14 * HOUR, 200)
+    e = rng.uniform(0, 40, 200)
+    hours, per_hour = energy.hourly_energy(start, end, e)
+    assert per_hour.sum() == pytest.approx(e.sum())
+    assert (np.diff(hours) > 0).all()
+    assert (hours % HOUR == 0).all()
@@ -0,0 +1,104 @@
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from custom_components.wallbox2.ledger import EnergyLedger  # noqa: E402
+
+HOUR = 3600
+T0 = 1_735_689_600  # 2025-01-01 00:00 UTC
+
+
+def ledger(**kwargs) -> EnergyLedger:
+    return EnergyLedger("sensor.bench_total_energy", kwargs.pop("start", T0), kwargs.pop("base_sum", 100.0), **kwargs)
+
+
+def assert_sums_consistent(led: EnergyLedger, rows: list[tuple[int, float, float]]) -> None:
+    total = led.base_sum + sum(energy for hour, energy in led.hours.items() if hour < rows[0][0])
+    for hour, energy, row_sum in rows:
+        total += energy
+        assert row_sum == pytest.approx(total)
+        assert led.hours[hour] == pytest.approx(energy)
+
+
+def test_new_session_writes_its_hours_and_everything_after():
+    led = ledger()
+    led.merge({"a": {T0 + 3 * HOUR: 1.0}})
+    rows = led.merge({"b": {T0 + HOUR: 2.0, T0 + 2 * HOUR: 0.5}})
+    assert [hour for hour, _, _ in rows] == [T0 + HOUR, T0 + 2 * HOUR, T0 + 3 * HOUR]
+    assert rows[-1][2] == pytest.approx(103.5)
+    assert_sums_consistent(led, rows)
+
+
+def test_unchanged_sessions_write_nothing():
+    led = ledger()
+    led.merge({"a": {T0: 1.0}, "b": {T0 + HOUR: 2.0}})
+    assert led.merge({"a": {T0: 1.0}, "b": {T0 + HOUR: 2.0}}) == []
+    # within the epsilon
+    assert led.merge({"a": {T0: 1.0 + 1e-9}}) == []
+
+
+def test_late_revision_of_an_in_progress_session():
+    led = ledger()
+    led.merge({"a": {T0: 1.0}, "later": {T0 + 4 * HOUR: 3.0}})
+    # the session went on charging: more energy, spread over one more hour
+    rows = led.merge({"a": {T0: 0.8, T0 + HOUR: 1.2}})
+    assert [hour for hour, _, _ in rows] == [T0, T0 + HOUR, T0 + 4 * HOUR]
+    assert led.hours[T0] == pytest.approx(0.8)
+    assert led.total == pytest.approx(105.0)
+    assert_sums_consistent(led, rows)
+
+
+def test_revision_moving_energy_out_of_an_hour():
+    led = ledger()
+    led.merge({"a": {T0: 1.0, T0 + HOUR: 1.0}})
+    rows = led.merge({"a": {T0 + HOUR: 2.0}})
+    assert rows[0][0] == T0
+    assert led.hours[T0] == pytest.approx(0.0)
+    assert led.total == pytest.approx(102.0)
+    assert_sums_consistent(led, rows)
+
+
+def test_revision_changing_only_a_later_hour_starts_there():
+    led = ledger()
+    led.merge({"a": {T0: 1.0, T0 + HOUR: 1.0}, "b": {T0 + 2 * HOUR: 1.0}})
+    rows = led.merge({"a": {T0: 1.0, T0 + HOUR: 1.5}})
+    assert [hour for hour, _, _ in rows] == [T0 + HOUR, T0 + 2 * HOUR]
+    assert_sums_consistent(led, rows)
+
+
+def test_prune_folds_final_hours_into_the_base():
+    led = ledger()
+    led.merge({"old": {T0: 1.0, T0 + HOUR: 1.0}, "new": {T0 + 2 * HOUR: 2.0}})
+    total = led.total
+    led.prune(T0 + 2 * HOUR)
+    assert led.start == T0 + 2 * HOUR
+    assert led.total == pytest.approx(total)
+    assert led.base_sum == pytest.approx(102.0)
+    assert set(led.hours) == {T0 + 2 * HOUR}
+    assert set(led.sessions) == {"new"}
+
+
+def test_prune_drops_a_session_started_before_the_new_start():
+    led = ledger()
+    led.merge({"spanning": {T0 + HOUR: 1.0, T0 + 2 * HOUR: 1.0}})
+    led.prune(T0 + 2 * HOUR)
+    # it started before the new start, its hours are final now and a revision would no longer be compared
+    assert "spanning" not in led.sessions
+    assert led.hours == {T0 + 2 * HOUR: 1.0}
+    assert led.total == pytest.approx(102.0)
+
+
+def test_prune_backwards_does_nothing():
+    led = ledger(start=T0 + HOUR)
+    led.merge({"a": {T0 + HOUR: 1.0}})
+    led.prune(T0)
+    assert led.start == T0 + HOUR
+    assert led.hours == {T0 + HOUR: 1.0}
+
+
+def test_round_trip():
+    led = ledger()
+    led.merge({"a": {T0: 1.0, T0 + HOUR: 0.5}})
+    restored = EnergyLedger.from_dict(led.as_dict())
+    assert restored == led
+    assert EnergyLedger.from_dict({}) is None